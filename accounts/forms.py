@@ -1,3 +1,5 @@
+import logging
+
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, UserChangeForm
 from .models import CustomUser, UserProfile
@@ -7,6 +9,8 @@ from persona.models import (
 )
 from allauth.account.forms import SignupForm
 
+logger = logging.getLogger(__name__)
+
 
 # ========== FORMULARIO PARA ALLAUTH ==========
 class CustomSignupForm(SignupForm):
@@ -258,9 +262,9 @@ class EstudiantePerfilForm(forms.ModelForm):
             self.fields['carrera'].queryset = Carrera.objects.filter(activa=True).order_by('nombre')
 
     def clean(self):
-        print(f"DEBUG: self.instance.pk = {self.instance.pk if self.instance else 'No instance'}")
+        logger.debug("instance.pk = %s", self.instance.pk if self.instance else 'No instance')
         if self.instance and self.instance.pk:
-            print(f"DEBUG: tiene persona? {hasattr(self.instance, 'persona')}")
+            logger.debug("tiene persona? %s", hasattr(self.instance, 'persona'))
 
         cleaned_data = super().clean()
         preferencia_menu = cleaned_data.get('preferencia_menu')
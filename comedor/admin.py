@@ -1,5 +1,11 @@
 from django.contrib import admin
-from .models import TipoMenu, ConfiguracionMenu, Ticket, CompraTickets, BeneficioComedor
+from django.db.models import Sum
+
+from rendimiento import cache
+
+from .models import TipoMenu, ConfiguracionMenu, Ticket, CompraTickets, BeneficioComedor, TurnoServicio, \
+    FranjaCupoTurno
+from .turnos import repartir_cupo
 
 
 @admin.register(BeneficioComedor)
@@ -81,4 +87,40 @@ class CompraTicketsAdmin(admin.ModelAdmin):
     list_display = ['id', 'usuario', 'cantidad_tickets', 'subtotal', 'total_descuentos', 'total_pagado', 'tickets_con_beneficio', 'fecha_compra']
     list_filter = ['fecha_compra']
     search_fields = ['usuario__username']
-    readonly_fields = ['fecha_compra', 'subtotal', 'total_descuentos', 'tickets_con_beneficio']
\ No newline at end of file
+    readonly_fields = ['fecha_compra', 'subtotal', 'total_descuentos', 'tickets_con_beneficio']
+
+
+class FranjaCupoTurnoInline(admin.TabularInline):
+    model = FranjaCupoTurno
+    fields = ['indice', 'cupo', 'reservados']
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(TurnoServicio)
+class TurnoServicioAdmin(admin.ModelAdmin):
+    list_display = ['fecha', 'sede', 'hora_inicio', 'hora_fin', 'cupo', 'reservados', 'activo']
+    list_filter = ['sede', 'activo', 'fecha']
+    date_hierarchy = 'fecha'
+    inlines = [FranjaCupoTurnoInline]
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(total_reservados=Sum('franjas__reservados'))
+
+    @admin.display(description='Reservados', ordering='total_reservados')
+    def reservados(self, obj):
+        return obj.total_reservados or 0
+
+    def get_readonly_fields(self, request, obj=None):
+        # El cupo ya está repartido en las franjas
+        return ['cupo'] if obj else []
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if not change:
+            repartir_cupo(obj)
+        cache.invalidar('comedor.turnos')
@@ -4,6 +4,10 @@ from django.apps import AppConfig
 class ComedorConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'comedor'
+    default = True  # en este módulo también está PersonaConfig
+
+    def ready(self):
+        import comedor.signals
 
 class PersonaConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
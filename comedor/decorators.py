@@ -1,10 +1,28 @@
 # decorators.py (crear este archivo en tu app comedor)
+from asgiref.sync import sync_to_async
 from django.contrib.auth.decorators import login_required
+from django.contrib.auth.views import redirect_to_login
 from django.shortcuts import redirect
 from django.contrib import messages
 from functools import wraps
 
 
+def login_required_async(view_func):
+    """
+    ``login_required`` para vistas ``async def`` (el de Django 4.2 no las
+    soporta). Resuelve ``request.user`` en un hilo: después la vista puede
+    leerlo sin tocar la base.
+    """
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        autenticado = await sync_to_async(lambda: request.user.is_authenticated)()
+        if not autenticado:
+            return redirect_to_login(request.get_full_path())
+        return await view_func(request, *args, **kwargs)
+
+    return wrapper
+
+
 def admin_comedor_required(view_func):
     @wraps(view_func)
     @login_required
@@ -22,6 +40,7 @@ def admin_comedor_required(view_func):
         messages.error(request, 'No tienes permisos para acceder a esta sección.')
         return redirect('home')  # Cambia 'home' por tu vista principal
 
+    wrapper.rol_requerido = 'admin_comedor'
     return wrapper
 
 # AUDITOR
@@ -43,4 +62,5 @@ def auditor_required(view_func):
         messages.error(request, 'No tienes permisos para acceder a esta sección.')
         return redirect('home')
 
+    wrapper.rol_requerido = 'auditor'
     return wrapper
\ No newline at end of file
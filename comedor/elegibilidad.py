@@ -0,0 +1,41 @@
+"""
+Becas con beneficio de comedor de un estudiante, para las vistas de compra.
+
+Las becas activas de cada estudiante se cachean por día en el espacio
+``persona.elegibilidad`` (se invalida al guardar o borrar una ``PersonaBeca``
+o una ``Beca``) y los beneficios en ``comedor.beneficios``.
+"""
+from django.utils import timezone
+
+from persona.models import PersonaBeca
+from rendimiento import cache
+
+from .models import BeneficioComedor
+
+TIMEOUT = 600
+
+
+def becas_activas(estudiante, hoy=None):
+    hoy = hoy or timezone.now().date()
+
+    def cargar():
+        return list(
+            PersonaBeca.objects.filter(
+                persona_estudiante=estudiante,
+                estado_beca='ACTIVA',
+                fecha_inicio__lte=hoy,
+                fecha_fin__gte=hoy
+            ).select_related('beca')
+        )
+
+    return cache.obtener('persona.elegibilidad', [estudiante.pk, hoy.isoformat()], cargar, timeout=TIMEOUT)
+
+
+def becas_con_beneficio(estudiante, hoy=None):
+    """[(persona_beca, beneficio)] de las becas activas hoy que tienen un beneficio de comedor activo"""
+    beneficios = BeneficioComedor.activos_por_beca()
+    return [
+        (persona_beca, beneficios[persona_beca.beca_id])
+        for persona_beca in becas_activas(estudiante, hoy)
+        if persona_beca.beca_id in beneficios
+    ]
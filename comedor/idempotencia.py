@@ -0,0 +1,99 @@
+"""
+Compras idempotentes.
+
+El formulario de compra lleva una clave oculta (``clave_idempotencia``) y un
+cliente puede mandarla en el encabezado ``Idempotency-Key``. La clave se
+inserta al empezar la transacción de la compra, con índice único por usuario:
+
+- si el mismo pedido llega otra vez, se devuelve la respuesta guardada sin
+  volver a ejecutar la compra;
+- si llega mientras la primera todavía corre, el INSERT espera a que termine
+  y falla, y también se devuelve la respuesta guardada;
+- si la compra falla, la clave se deshace con ella y el reintento compra.
+
+Las claves duran ``COMEDOR_IDEMPOTENCIA_TTL`` segundos; la tarea periódica
+``comedor.purgar_claves_idempotencia`` borra las vencidas.
+"""
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib import messages
+from django.db import IntegrityError, transaction
+from django.shortcuts import redirect
+from django.utils import timezone
+
+from .models import ClaveIdempotencia
+
+TTL = getattr(settings, 'COMEDOR_IDEMPOTENCIA_TTL', 3600)
+CAMPO = 'clave_idempotencia'
+ENCABEZADO = 'Idempotency-Key'
+LARGO = ClaveIdempotencia._meta.get_field('clave').max_length
+
+
+class ClaveEnUso(Exception):
+    """Otro pedido con la misma clave ya se procesó o se está procesando"""
+
+
+def nueva_clave():
+    return uuid.uuid4().hex
+
+
+def clave_de(request):
+    """Clave del pedido (encabezado o campo del formulario), o None si no trae"""
+    clave = (request.headers.get(ENCABEZADO) or request.POST.get(CAMPO) or '').strip()
+    return clave[:LARGO] or None
+
+
+def anterior(usuario, clave):
+    """Registro vigente de un pedido ya procesado con esta clave, o None"""
+    if not clave:
+        return None
+    return ClaveIdempotencia.objects.filter(usuario=usuario, clave=clave, vence__gt=timezone.now()).first()
+
+
+def tomar(usuario, clave, operacion):
+    """
+    Registra la clave dentro de la transacción de la compra; levanta
+    ``ClaveEnUso`` si otro pedido ya la tiene. Sin clave no hace nada.
+    """
+    if not clave:
+        return None
+    ahora = timezone.now()
+    # Una clave vencida que todavía no se purgó no cuenta
+    ClaveIdempotencia.objects.filter(usuario=usuario, clave=clave, vence__lte=ahora).delete()
+    try:
+        with transaction.atomic():
+            return ClaveIdempotencia.objects.create(
+                usuario=usuario, clave=clave, operacion=operacion, vence=ahora + timedelta(seconds=TTL),
+            )
+    except IntegrityError:
+        raise ClaveEnUso(clave)
+
+
+def guardar(registro, compra, url, mensaje):
+    """Respuesta que se va a repetir si el pedido vuelve a llegar"""
+    if registro is None:
+        return
+    registro.compra = compra
+    registro.respuesta = {'url': url, 'mensaje': mensaje}
+    registro.save(update_fields=['compra', 'respuesta'])
+
+
+def repetir(request, registro):
+    """La misma redirección y el mismo mensaje que recibió el pedido original"""
+    messages.success(request, registro.respuesta['mensaje'])
+    respuesta = redirect(registro.respuesta['url'])
+    respuesta['Idempotent-Replayed'] = 'true'
+    return respuesta
+
+
+def purgar_vencidas(lote=5000):
+    """Borra las claves vencidas en lotes de ``lote`` filas; devuelve la cantidad"""
+    vencidas = ClaveIdempotencia.objects.filter(vence__lte=timezone.now())
+    borradas = 0
+    while True:
+        ids = list(vencidas.values_list('id', flat=True)[:lote])
+        if not ids:
+            return borradas
+        borradas += ClaveIdempotencia.objects.filter(id__in=ids).delete()[0]
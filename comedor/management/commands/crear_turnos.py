@@ -0,0 +1,64 @@
+import argparse
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from comedor.models import TurnoServicio
+from comedor.turnos import FRANJAS, crear_turno
+from persona.models import Persona
+
+
+def _horario(valor):
+    try:
+        inicio, fin = (datetime.strptime(hora, '%H:%M').time() for hora in valor.split('-'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'horario inválido: {valor} (formato HH:MM-HH:MM)')
+    return inicio, fin
+
+
+class Command(BaseCommand):
+    help = 'Crea los turnos del comedor con su cupo para un rango de días (los que ya existen no se tocan)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', required=True, help='Primer día (AAAA-MM-DD)')
+        parser.add_argument('--hasta', help='Último día (por defecto, el mismo que --desde)')
+        parser.add_argument(
+            '--sede', action='append', choices=[codigo for codigo, _ in Persona.SEDES],
+            help='Sede (se puede repetir; por defecto todas)',
+        )
+        parser.add_argument(
+            '--horario', action='append', required=True, type=_horario,
+            help='Horario del turno, HH:MM-HH:MM (se puede repetir)',
+        )
+        parser.add_argument('--cupo', type=int, required=True, help='Lugares por turno')
+        parser.add_argument('--franjas', type=int, default=FRANJAS, help='Contadores en que se reparte el cupo')
+        parser.add_argument('--fines-de-semana', action='store_true', help='Crear también sábados y domingos')
+
+    def handle(self, *args, **options):
+        desde = parse_date(options['desde'])
+        hasta = parse_date(options['hasta']) if options['hasta'] else desde
+        if not desde or not hasta or hasta < desde:
+            raise CommandError('Rango de fechas inválido')
+        sedes = options['sede'] or [codigo for codigo, _ in Persona.SEDES]
+
+        existentes = set(
+            TurnoServicio.objects.filter(fecha__range=(desde, hasta), sede__in=sedes)
+            .values_list('fecha', 'sede', 'hora_inicio')
+        )
+        creados = omitidos = 0
+        dia = desde
+        while dia <= hasta:
+            if options['fines_de_semana'] or dia.weekday() < 5:
+                for sede in sedes:
+                    for inicio, fin in options['horario']:
+                        if (dia, sede, inicio) in existentes:
+                            omitidos += 1
+                            continue
+                        crear_turno(dia, sede, inicio, fin, options['cupo'], options['franjas'])
+                        creados += 1
+            dia += timedelta(days=1)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'  ✓ {creados} turnos creados ({omitidos} ya existían)'
+        ))
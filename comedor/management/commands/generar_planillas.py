@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from comedor.planillas import PROCESOS, guardar, tickets_a_imprimir
+from persona.models import Persona
+
+
+class Command(BaseCommand):
+    help = 'Genera un PDF con los tickets para imprimir (QR, número y datos del estudiante)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--desde', help='Fecha de compra desde (AAAA-MM-DD)')
+        parser.add_argument('--hasta', help='Fecha de compra hasta (AAAA-MM-DD)')
+        parser.add_argument('--sede', choices=[codigo for codigo, _ in Persona.SEDES])
+        parser.add_argument('--beneficio', type=int, help='Id del beneficio de comedor aplicado')
+        parser.add_argument('--estado', default='pagado')
+        parser.add_argument('--salida', help='Archivo PDF (por defecto en MEDIA_ROOT/comedor/planillas)')
+        parser.add_argument(
+            '--procesos', type=int, default=PROCESOS, help='Procesos que arman las páginas (0: en este proceso)',
+        )
+
+    def handle(self, *args, **options):
+        tickets = tickets_a_imprimir(
+            desde=options['desde'], hasta=options['hasta'], sede=options['sede'],
+            beneficio=options['beneficio'], estado=options['estado'],
+        )
+        cantidad = tickets.count()
+        inicio = time.perf_counter()
+        ruta = guardar(tickets, options['salida'], options['procesos'])
+        self.stdout.write(self.style.SUCCESS(
+            f'  ✓ {cantidad} tickets en {ruta} ({time.perf_counter() - inicio:.1f}s, {options["procesos"]} procesos)'
+        ))
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from comedor.models import CompraTickets
+
+
+class Command(BaseCommand):
+    help = 'Recalcula cantidad, subtotal, descuentos y total pagado de las compras a partir de sus tickets'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', help='Sólo las compras de este usuario (username)')
+
+    def handle(self, *args, **options):
+        compras = CompraTickets.objects.all()
+        if options['usuario']:
+            compras = compras.filter(usuario__username=options['usuario'])
+        inicio = time.perf_counter()
+        actualizadas = CompraTickets.recalcular_totales(compras)
+        self.stdout.write(self.style.SUCCESS(
+            f'  ✓ {actualizadas} compras recalculadas en {time.perf_counter() - inicio:.1f}s'
+        ))
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from comedor.resumenes import actualizar_resumenes, reconstruir_resumenes
+
+
+class Command(BaseCommand):
+    help = 'Suma al resumen diario de ventas los tickets nuevos (o lo reconstruye desde cero)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reconstruir', action='store_true',
+            help='Borrar el resumen y recalcularlo (después de corregir o borrar tickets)',
+        )
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        procesados = reconstruir_resumenes() if options['reconstruir'] else actualizar_resumenes()
+        self.stdout.write(self.style.SUCCESS(
+            f'  ✓ {procesados} tickets sumados al resumen en {time.perf_counter() - inicio:.1f}s'
+        ))
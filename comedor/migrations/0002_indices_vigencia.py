@@ -0,0 +1,17 @@
+# Generated by Django 4.2.5 on 2026-10-19 13:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comedor', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='certificadoceliaco',
+            index=models.Index(condition=models.Q(('activo', True)), fields=['fecha_vencimiento'], name='comedor_celiaco_activo_venc'),
+        ),
+    ]
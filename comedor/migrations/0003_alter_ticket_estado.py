@@ -0,0 +1,18 @@
+# Generated by Django 4.2.5 on 2026-10-19 13:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comedor', '0002_indices_vigencia'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ticket',
+            name='estado',
+            field=models.CharField(choices=[('pendiente', 'Pendiente de Pago'), ('pagado', 'Pagado'), ('usado', 'Usado'), ('vencido', 'Vencido')], default='pendiente', max_length=20),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 4.2.5 on 2026-10-19 14:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('persona', '0001_initial'),
+        ('comedor', '0003_alter_ticket_estado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MarcaResumenVentas',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ultimo_ticket', models.PositiveBigIntegerField(default=0)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Marca del resumen de ventas',
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumenDiarioVentas',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('sede', models.CharField(blank=True, max_length=25)),
+                ('rol', models.CharField(blank=True, max_length=20)),
+                ('cantidad', models.PositiveIntegerField(default=0)),
+                ('con_beneficio', models.PositiveIntegerField(default=0)),
+                ('subtotal', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('descuentos', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('pagado', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('beca', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='resumenes_ventas_comedor', to='persona.beca')),
+                ('tipo_menu', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='resumenes_ventas', to='comedor.tipomenu')),
+            ],
+            options={
+                'verbose_name': 'Resumen diario de ventas',
+                'verbose_name_plural': 'Resúmenes diarios de ventas',
+                'ordering': ['-dia'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='resumendiarioventas',
+            constraint=models.UniqueConstraint(fields=('dia', 'sede', 'tipo_menu', 'beca', 'rol'), name='comedor_resumen_ventas_clave'),
+        ),
+    ]
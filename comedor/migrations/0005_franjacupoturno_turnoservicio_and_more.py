@@ -0,0 +1,66 @@
+# Generated by Django 4.2.5 on 2026-10-19 14:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comedor', '0004_marcaresumenventas_resumendiarioventas_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FranjaCupoTurno',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('indice', models.PositiveSmallIntegerField()),
+                ('cupo', models.PositiveIntegerField()),
+                ('reservados', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Franja de cupo',
+                'verbose_name_plural': 'Franjas de cupo',
+            },
+        ),
+        migrations.CreateModel(
+            name='TurnoServicio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('sede', models.CharField(choices=[('central', 'Central'), ('san_rafael', 'San Rafael'), ('lujan_de_cuyo', 'Luján de Cuyo')], default='central', max_length=25)),
+                ('hora_inicio', models.TimeField()),
+                ('hora_fin', models.TimeField()),
+                ('cupo', models.PositiveIntegerField(verbose_name='Lugares')),
+                ('activo', models.BooleanField(default=True)),
+            ],
+            options={
+                'verbose_name': 'Turno del comedor',
+                'verbose_name_plural': 'Turnos del comedor',
+                'ordering': ['fecha', 'sede', 'hora_inicio'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='turnoservicio',
+            constraint=models.UniqueConstraint(fields=('fecha', 'sede', 'hora_inicio'), name='comedor_turno_unico'),
+        ),
+        migrations.AddField(
+            model_name='franjacupoturno',
+            name='turno',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='franjas', to='comedor.turnoservicio'),
+        ),
+        migrations.AddField(
+            model_name='ticket',
+            name='turno',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='tickets', to='comedor.turnoservicio', verbose_name='Turno reservado'),
+        ),
+        migrations.AddConstraint(
+            model_name='franjacupoturno',
+            constraint=models.UniqueConstraint(fields=('turno', 'indice'), name='comedor_franja_turno_unica'),
+        ),
+        migrations.AddConstraint(
+            model_name='franjacupoturno',
+            constraint=models.CheckConstraint(check=models.Q(('reservados__lte', models.F('cupo'))), name='comedor_franja_sin_sobreventa'),
+        ),
+    ]
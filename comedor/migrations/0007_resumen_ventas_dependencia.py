@@ -0,0 +1,35 @@
+# Generated by Django 4.2.5 on 2026-10-19 14:39
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def reiniciar_resumen(apps, schema_editor):
+    """Las filas existentes no tienen dependencia: la próxima corrida lo arma de nuevo"""
+    apps.get_model('comedor', 'ResumenDiarioVentas').objects.all().delete()
+    apps.get_model('comedor', 'MarcaResumenVentas').objects.update(ultimo_ticket=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('persona', '0001_initial'),
+        ('comedor', '0006_claveidempotencia_and_more'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='resumendiarioventas',
+            name='comedor_resumen_ventas_clave',
+        ),
+        migrations.AddField(
+            model_name='resumendiarioventas',
+            name='dependencia',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='resumenes_ventas_comedor', to='persona.dependencia'),
+        ),
+        migrations.RunPython(reiniciar_resumen, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='resumendiarioventas',
+            constraint=models.UniqueConstraint(fields=('dia', 'sede', 'tipo_menu', 'beca', 'rol', 'dependencia'), name='comedor_resumen_ventas_clave'),
+        ),
+    ]
@@ -1,14 +1,17 @@
 from django.db import models
+from django.db.models import ExpressionWrapper, Q
+from django.db.models.functions import Coalesce
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.core.validators import FileExtensionValidator, MinValueValidator, MaxValueValidator
 from django.core.exceptions import ValidationError
-import qrcode
 from io import BytesIO
 from django.core.files import File
+from django.utils import timezone
 import uuid
 from decimal import Decimal
-from persona.models import Beca
+from persona.models import Beca, Dependencia, Persona
+from rendimiento import cache
 
 
 class BeneficioComedor(models.Model):
@@ -70,6 +73,17 @@ class BeneficioComedor(models.Model):
             return precio_base * (self.porcentaje_descuento / 100)
         return Decimal('0.00')
 
+    @classmethod
+    def activos_por_beca(cls):
+        """{beca_id: beneficio activo} cacheado (espacio ``comedor.beneficios``)"""
+        def cargar():
+            beneficios = {}
+            for beneficio in cls.objects.filter(activo=True).order_by('pk'):
+                beneficios.setdefault(beneficio.tipo_beca_id, beneficio)
+            return beneficios
+
+        return cache.obtener('comedor.beneficios', ['activos'], cargar)
+
 
 class TipoMenu(models.Model):
     TIPO_CHOICES = [
@@ -139,9 +153,14 @@ class ConfiguracionMenu(models.Model):
 
     @classmethod
     def get_config(cls):
-        """Obtener o crear la configuración única"""
-        config, created = cls.objects.get_or_create(pk=1)
-        return config
+        """Obtener o crear la configuración única, con sus menús (cacheada en ``comedor.config``)"""
+        def cargar():
+            config = cls.objects.select_related(
+                'menu_comun', 'menu_vegetariano', 'menu_celiaco_comun', 'menu_celiaco_vegetariano',
+            ).filter(pk=1).first()
+            return config or cls.objects.get_or_create(pk=1)[0]
+
+        return cache.obtener('comedor.config', ['unica'], cargar)
 
 
 class Ticket(models.Model):
@@ -149,6 +168,7 @@ class Ticket(models.Model):
         ('pendiente', 'Pendiente de Pago'),
         ('pagado', 'Pagado'),
         ('usado', 'Usado'),
+        ('vencido', 'Vencido'),
     ]
 
     usuario = models.ForeignKey(
@@ -217,6 +237,14 @@ class Ticket(models.Model):
         null=True,
         blank=True
     )
+    turno = models.ForeignKey(
+        'TurnoServicio',
+        on_delete=models.PROTECT,
+        related_name='tickets',
+        null=True,
+        blank=True,
+        verbose_name="Turno reservado"
+    )
 
     # Celiaquía
     requiere_menu_celiaco = models.BooleanField(default=False)
@@ -254,10 +282,18 @@ class Ticket(models.Model):
 
         # Generar QR code si no existe
         if not self.qr_code:
-            self.generar_qr()
+            if getattr(settings, 'COMEDOR_QR_EN_SEGUNDO_PLANO', False):
+                # Lo genera `manage.py run_worker`; el detalle del ticket muestra el código mientras tanto
+                from .tareas import generar_qr
+                generar_qr.encolar(self.pk, clave=f'qr:{self.pk}')
+            else:
+                self.generar_qr()
 
     def generar_qr(self):
         """Genera el código QR para el ticket"""
+        # Import diferido: qrcode (y PIL) sólo se cargan en el proceso que emite tickets
+        import qrcode
+
         qr = qrcode.QRCode(
             version=1,
             error_correction=qrcode.constants.ERROR_CORRECT_L,
@@ -341,15 +377,41 @@ class CompraTickets(models.Model):
     def __str__(self):
         return f"Compra {self.id} - {self.usuario.username} - {self.cantidad_tickets} tickets"
 
+    # Totales de una compra a partir de sus tickets, calculados en la base
+    TOTALES = {
+        'cantidad_tickets': models.Count('id'),
+        'subtotal': models.Sum('precio_base'),
+        'total_descuentos': models.Sum('descuento_aplicado'),
+        'total_pagado': models.Sum('precio_pagado'),
+        'tickets_con_beneficio': models.Count('id', filter=Q(beneficio_aplicado__isnull=False)),
+    }
+
     def calcular_totales(self):
         """Calcula los totales basándose en los tickets asociados"""
-        tickets = self.tickets.all()
-        self.cantidad_tickets = tickets.count()
-        self.subtotal = sum(ticket.precio_base for ticket in tickets)
-        self.total_descuentos = sum(ticket.descuento_aplicado for ticket in tickets)
-        self.total_pagado = sum(ticket.precio_pagado for ticket in tickets)
-        self.tickets_con_beneficio = tickets.filter(beneficio_aplicado__isnull=False).count()
-        self.save()
+        totales = {
+            campo: valor or 0
+            for campo, valor in Ticket.objects.filter(compra=self).aggregate(**self.TOTALES).items()
+        }
+        CompraTickets.objects.filter(pk=self.pk).update(**totales)
+        for campo, valor in totales.items():
+            setattr(self, campo, valor)
+
+    @classmethod
+    def recalcular_totales(cls, compras=None):
+        """
+        Recalcula los totales de ``compras`` (por defecto todas) con un solo
+        UPDATE y una subconsulta por campo. Devuelve la cantidad de compras.
+        """
+        compras = cls.objects.all() if compras is None else compras
+        totales = {}
+        for campo, agregado in cls.TOTALES.items():
+            por_compra = (
+                Ticket.objects.filter(compra=models.OuterRef('pk'))
+                .order_by().values('compra').annotate(valor=agregado).values('valor')
+            )
+            salida = cls._meta.get_field(campo)
+            totales[campo] = Coalesce(models.Subquery(por_compra, output_field=salida), 0, output_field=salida)
+        return compras.update(**totales)
 
 def validar_tamano_imagen(image):
         file_size = image.size
@@ -402,6 +464,26 @@ class ImagenCarrusel(models.Model):
                         'La fecha de inicio no puede ser posterior a la fecha de fin'
                     )
 
+class CertificadoCeliacoQuerySet(models.QuerySet):
+    """Vigencia de certificados resuelta en SQL (misma regla que ``esta_vigente``)"""
+
+    @staticmethod
+    def condicion_vigente(on=None):
+        on = on or timezone.localdate()
+        return Q(activo=True) & (Q(fecha_vencimiento__isnull=True) | Q(fecha_vencimiento__gte=on))
+
+    def vigentes(self, on=None):
+        return self.filter(self.condicion_vigente(on))
+
+    def no_vigentes(self, on=None):
+        return self.exclude(self.condicion_vigente(on))
+
+    def con_vigencia(self, on=None):
+        return self.annotate(
+            vigente=ExpressionWrapper(self.condicion_vigente(on), output_field=models.BooleanField())
+        )
+
+
 class CertificadoCeliaco(models.Model):
     """Certificado médico de celiaquía para cualquier persona"""
     persona = models.OneToOneField(
@@ -437,10 +519,19 @@ class CertificadoCeliaco(models.Model):
         verbose_name="Cargado por"
     )
 
+    objects = CertificadoCeliacoQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Certificado de Celiaquía"
         verbose_name_plural = "Certificados de Celiaquía"
         ordering = ['-fecha_carga']
+        indexes = [
+            models.Index(
+                fields=['fecha_vencimiento'],
+                condition=Q(activo=True),
+                name='comedor_celiaco_activo_venc',
+            ),
+        ]
 
     def __str__(self):
         return f"Certificado celíaco - {self.persona.nombre_completo}"
@@ -448,11 +539,10 @@ class CertificadoCeliaco(models.Model):
     @property
     def esta_vigente(self):
         """Verifica si el certificado está vigente"""
-        from datetime import date
         if not self.activo:
             return False
         if self.fecha_vencimiento:
-            return date.today() <= self.fecha_vencimiento
+            return timezone.localdate() <= self.fecha_vencimiento
         return True
 
     def clean(self):
@@ -461,4 +551,124 @@ class CertificadoCeliaco(models.Model):
             if self.fecha_vencimiento < self.fecha_emision:
                 raise ValidationError(
                     'La fecha de vencimiento no puede ser anterior a la fecha de emisión'
-                )
\ No newline at end of file
+                )
+
+class ResumenDiarioVentas(models.Model):
+    """
+    Totales de tickets vendidos por día, sede, menú, beca, rol y dependencia, que mantiene
+    ``comedor.resumenes`` para que los reportes no recorran ``Ticket``.
+    """
+    dia = models.DateField()
+    sede = models.CharField(max_length=25, blank=True)
+    tipo_menu = models.ForeignKey(TipoMenu, on_delete=models.PROTECT, related_name='resumenes_ventas')
+    beca = models.ForeignKey(
+        Beca, on_delete=models.SET_NULL, null=True, blank=True, related_name='resumenes_ventas_comedor',
+    )
+    rol = models.CharField(max_length=20, blank=True)
+    dependencia = models.ForeignKey(
+        Dependencia, on_delete=models.SET_NULL, null=True, blank=True, related_name='resumenes_ventas_comedor',
+    )
+
+    cantidad = models.PositiveIntegerField(default=0)
+    con_beneficio = models.PositiveIntegerField(default=0)
+    subtotal = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    descuentos = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    pagado = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        verbose_name = "Resumen diario de ventas"
+        verbose_name_plural = "Resúmenes diarios de ventas"
+        ordering = ['-dia']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dia', 'sede', 'tipo_menu', 'beca', 'rol', 'dependencia'],
+                name='comedor_resumen_ventas_clave',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.dia} {self.sede} {self.tipo_menu_id}: {self.cantidad} tickets"
+
+
+class MarcaResumenVentas(models.Model):
+    """Último ticket sumado a ``ResumenDiarioVentas`` (fila única)"""
+    ultimo_ticket = models.PositiveBigIntegerField(default=0)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Marca del resumen de ventas"
+
+    @classmethod
+    def obtener(cls):
+        return cls.objects.get_or_create(pk=1)[0]
+
+
+class TurnoServicio(models.Model):
+    """
+    Turno del comedor en un día y una sede, con lugares limitados. El cupo
+    se reparte en ``FranjaCupoTurno`` para que las compras simultáneas no
+    esperen todas el lock de una misma fila (ver ``comedor.turnos``).
+    """
+    fecha = models.DateField()
+    sede = models.CharField(max_length=25, choices=Persona.SEDES, default='central')
+    hora_inicio = models.TimeField()
+    hora_fin = models.TimeField()
+    cupo = models.PositiveIntegerField(verbose_name="Lugares")
+    activo = models.BooleanField(default=True)
+
+    class Meta:
+        verbose_name = "Turno del comedor"
+        verbose_name_plural = "Turnos del comedor"
+        ordering = ['fecha', 'sede', 'hora_inicio']
+        constraints = [
+            models.UniqueConstraint(fields=['fecha', 'sede', 'hora_inicio'], name='comedor_turno_unico'),
+        ]
+
+    def __str__(self):
+        return f"{self.fecha:%d/%m} {self.hora_inicio:%H:%M}-{self.hora_fin:%H:%M} ({self.get_sede_display()})"
+
+
+class FranjaCupoTurno(models.Model):
+    """Parte del cupo de un turno, con su propio contador de reservas"""
+    turno = models.ForeignKey(TurnoServicio, on_delete=models.CASCADE, related_name='franjas')
+    indice = models.PositiveSmallIntegerField()
+    cupo = models.PositiveIntegerField()
+    reservados = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Franja de cupo"
+        verbose_name_plural = "Franjas de cupo"
+        constraints = [
+            models.UniqueConstraint(fields=['turno', 'indice'], name='comedor_franja_turno_unica'),
+            models.CheckConstraint(check=Q(reservados__lte=models.F('cupo')), name='comedor_franja_sin_sobreventa'),
+        ]
+
+    def __str__(self):
+        return f"{self.turno} #{self.indice}: {self.reservados}/{self.cupo}"
+
+
+class ClaveIdempotencia(models.Model):
+    """
+    Clave que manda el cliente con una compra; si el mismo pedido llega dos
+    veces (doble clic, reintento de la red) se devuelve la respuesta guardada
+    en vez de volver a comprar (ver ``comedor.idempotencia``).
+    """
+    usuario = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='claves_idempotencia_comedor',
+    )
+    clave = models.CharField(max_length=64)
+    operacion = models.CharField(max_length=30)
+    compra = models.ForeignKey(CompraTickets, on_delete=models.SET_NULL, null=True, blank=True)
+    respuesta = models.JSONField(default=dict, blank=True)
+    creada = models.DateTimeField(auto_now_add=True)
+    vence = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name = "Clave de idempotencia"
+        verbose_name_plural = "Claves de idempotencia"
+        constraints = [
+            models.UniqueConstraint(fields=['usuario', 'clave'], name='comedor_clave_idempotencia_unica'),
+        ]
+
+    def __str__(self):
+        return f"{self.operacion} {self.clave}"
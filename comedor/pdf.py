@@ -0,0 +1,185 @@
+"""
+Páginas de tickets en PDF con reportlab, para imprimir.
+
+Este módulo corre en los procesos del pool de ``comedor.planillas`` y por eso
+no importa Django: recibe cada ticket como un diccionario.
+
+``renderizar_lote`` arma un PDF con las páginas de un lote de tickets y
+``UnionPDF`` concatena esos PDFs en uno solo a medida que llegan. Cada objeto
+se devuelve apenas se renumera y sólo se guarda su posición; el árbol de
+páginas y la tabla xref se escriben al final. La memoria depende del tamaño
+de un lote, no de la cantidad de tickets.
+"""
+import re
+from io import BytesIO
+
+import qrcode
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import mm
+from reportlab.pdfgen.canvas import Canvas
+
+COLUMNAS, FILAS = 2, 5
+POR_PAGINA = COLUMNAS * FILAS
+MARGEN = 10 * mm
+LADO_QR = 34 * mm
+
+
+def _dibujar_qr(canvas, codigo, x, y):
+    """
+    QR vectorial: un solo path con un rectángulo por tramo de módulos negros
+    de cada fila (el widget de reportlab dibuja un nodo por módulo y codifica
+    dos veces, unas cinco veces más lento).
+    """
+    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_L, border=0)
+    qr.add_data(codigo)
+    qr.make(fit=True)
+    matriz = qr.get_matrix()
+    modulo = LADO_QR / len(matriz)
+    path = canvas.beginPath()
+    for fila, celdas in enumerate(matriz):
+        arriba = y + LADO_QR - (fila + 1) * modulo
+        columna = 0
+        while columna < len(celdas):
+            if not celdas[columna]:
+                columna += 1
+                continue
+            inicio = columna
+            while columna < len(celdas) and celdas[columna]:
+                columna += 1
+            path.rect(x + inicio * modulo, arriba, (columna - inicio) * modulo, modulo)
+    canvas.setFillGray(0)
+    canvas.drawPath(path, stroke=0, fill=1)
+
+
+def _dibujar_ticket(canvas, ticket, x, y, ancho, alto):
+    # Línea de corte
+    canvas.setDash(3, 3)
+    canvas.setStrokeGray(0.6)
+    canvas.rect(x, y, ancho, alto)
+    canvas.setDash()
+
+    _dibujar_qr(canvas, ticket['codigo'], x + 3 * mm, y + (alto - LADO_QR) / 2)
+
+    texto_x = x + LADO_QR + 6 * mm
+    linea = y + alto - 10 * mm
+    canvas.setFont('Helvetica-Bold', 12)
+    canvas.drawString(texto_x, linea, ticket['numero'])
+    canvas.setFont('Helvetica', 9)
+    renglones = [
+        ticket['nombre'][:36],
+        f'DNI {ticket["documento"]}' if ticket['documento'] else '',
+        ticket['menu'] + (' - Sin TACC' if ticket['celiaco'] else ''),
+        f'Válido hasta {ticket["valido_hasta"]}' if ticket['valido_hasta'] else '',
+        f'Beca: {ticket["beneficio"]}'[:40] if ticket['beneficio'] else '',
+    ]
+    for renglon in filter(None, renglones):
+        linea -= 5 * mm
+        canvas.drawString(texto_x, linea, renglon)
+
+
+def renderizar_lote(tickets):
+    """PDF (bytes) con ``POR_PAGINA`` tickets por hoja A4"""
+    buffer = BytesIO()
+    canvas = Canvas(buffer, pagesize=A4, pageCompression=1)
+    ancho = (A4[0] - 2 * MARGEN) / COLUMNAS
+    alto = (A4[1] - 2 * MARGEN) / FILAS
+    for inicio in range(0, len(tickets), POR_PAGINA):
+        for indice, ticket in enumerate(tickets[inicio:inicio + POR_PAGINA]):
+            fila, columna = divmod(indice, COLUMNAS)
+            _dibujar_ticket(
+                canvas, ticket, MARGEN + columna * ancho, A4[1] - MARGEN - (fila + 1) * alto, ancho, alto,
+            )
+        canvas.showPage()
+    canvas.save()
+    return buffer.getvalue()
+
+
+_REFERENCIA = re.compile(rb'(\d+) 0 R')
+
+
+def _objetos(pdf):
+    """({número: cuerpo entre 'obj' y 'endobj'}, trailer) de un PDF sin streams de objetos"""
+    inicio_xref = int(re.search(rb'startxref\s+(\d+)', pdf[-64:]).group(1))
+    lineas = pdf[inicio_xref:].split(b'\n')
+    primero, cantidad = (int(valor) for valor in lineas[1].split())
+    posiciones = {
+        primero + indice: int(linea[:10])
+        for indice, linea in enumerate(lineas[2:2 + cantidad])
+        if linea[17:18] == b'n'
+    }
+    # Cada objeto termina donde empieza el siguiente (o la tabla xref)
+    limites = sorted(posiciones.values()) + [inicio_xref]
+    fin = dict(zip(limites, limites[1:]))
+    objetos = {}
+    for numero, posicion in posiciones.items():
+        crudo = pdf[posicion:fin[posicion]]
+        objetos[numero] = crudo[crudo.index(b'obj') + 3:crudo.rindex(b'endobj')]
+    return objetos, pdf[inicio_xref:]
+
+
+class UnionPDF:
+    """
+    Une PDFs generados por reportlab. ``encabezado()``, ``agregar(pdf)`` y
+    ``cierre()`` devuelven los bytes a escribir, en ese orden.
+    """
+    CATALOGO, PAGINAS = 1, 2
+
+    def __init__(self):
+        self.posicion = 0
+        self.posiciones = {}
+        self.paginas = []
+        self.siguiente = 3
+
+    def _emitir(self, datos):
+        self.posicion += len(datos)
+        return datos
+
+    def _objeto(self, numero, cuerpo):
+        self.posiciones[numero] = self.posicion
+        return self._emitir(b'%d 0 obj' % numero + cuerpo + b'endobj\n')
+
+    def encabezado(self):
+        return self._emitir(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+
+    def agregar(self, pdf):
+        objetos, trailer = _objetos(pdf)
+        raiz = int(re.search(rb'/Root (\d+) 0 R', trailer).group(1))
+        info = re.search(rb'/Info (\d+) 0 R', trailer)
+        arbol = int(re.search(rb'/Pages (\d+) 0 R', objetos[raiz]).group(1))
+        kids = re.search(rb'/Kids \[(.*?)\]', objetos[arbol], re.S).group(1)
+
+        # El catálogo, el árbol de páginas y la info de cada parte se reemplazan por los del documento unido
+        propios = {raiz, arbol, int(info.group(1)) if info else None}
+        nuevos = {arbol: self.PAGINAS}
+        for numero in sorted(objetos):
+            if numero not in propios:
+                nuevos[numero] = self.siguiente
+                self.siguiente += 1
+
+        def renumerar(coincidencia):
+            return b'%d 0 R' % nuevos[int(coincidencia.group(1))]
+
+        partes = []
+        for numero in sorted(objetos):
+            if numero in propios:
+                continue
+            # Las referencias están en el diccionario; el contenido del stream se copia tal cual
+            diccionario, separador, stream = objetos[numero].partition(b'stream')
+            partes.append(self._objeto(nuevos[numero], _REFERENCIA.sub(renumerar, diccionario) + separador + stream))
+        self.paginas.extend(nuevos[int(numero)] for numero in _REFERENCIA.findall(kids))
+        return b''.join(partes)
+
+    def cierre(self):
+        kids = b' '.join(b'%d 0 R' % numero for numero in self.paginas)
+        partes = [
+            self._objeto(self.PAGINAS, b'\n<< /Type /Pages /Count %d /Kids [ %s ] >>\n' % (len(self.paginas), kids)),
+            self._objeto(self.CATALOGO, b'\n<< /Type /Catalog /Pages %d 0 R >>\n' % self.PAGINAS),
+        ]
+        inicio_xref = self.posicion
+        partes.append(b'xref\n0 %d\n0000000000 65535 f \n' % self.siguiente)
+        partes.extend(b'%010d 00000 n \n' % self.posiciones[numero] for numero in range(1, self.siguiente))
+        partes.append(
+            b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n'
+            % (self.siguiente, self.CATALOGO, inicio_xref)
+        )
+        return b''.join(partes)
@@ -0,0 +1,129 @@
+"""
+Planillas de tickets impresas, para becarios que no tienen el ticket en el celular.
+
+Los tickets se leen en tandas con ``iterator()`` y se reparten en lotes de
+``TICKETS_POR_LOTE`` entre ``COMEDOR_PLANILLAS_PROCESOS`` procesos, que arman
+cada lote con reportlab (``comedor.pdf``). El proceso principal une los lotes
+en orden en un solo PDF y lo va entregando; como mucho hay ``2 * procesos``
+lotes en vuelo, sea cual sea la cantidad de tickets.
+
+El pool usa ``spawn`` (nada de ``fork`` dentro de un servidor con hilos), así
+que cada proceso arranca un intérprete con ``sys.executable``. Bajo mod_wsgi,
+donde ese no es el intérprete de Python, conviene ``COMEDOR_PLANILLAS_PROCESOS=0``
+en el servidor web y generar las planillas grandes en segundo plano.
+"""
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from django.conf import settings
+
+from .models import Ticket
+from .pdf import UnionPDF, renderizar_lote
+
+PROCESOS = getattr(settings, 'COMEDOR_PLANILLAS_PROCESOS', 2)
+TICKETS_POR_LOTE = 200
+DIRECTORIO = 'comedor/planillas'
+
+CAMPOS = {
+    'numero': 'numero_ticket',
+    'codigo': 'codigo',
+    'apellido': 'usuario__persona__apellido',
+    'nombre': 'usuario__persona__nombre',
+    'documento': 'usuario__persona__documento',
+    'usuario': 'usuario__username',
+    'menu': 'tipo_menu__nombre',
+    'celiaco': 'requiere_menu_celiaco',
+    'valido_hasta': 'fecha_valido_hasta',
+    'beneficio': 'beneficio_aplicado__tipo_beca__tipo',
+}
+
+
+def tickets_a_imprimir(desde=None, hasta=None, sede=None, beneficio=None, estado='pagado'):
+    """Tickets por fecha de compra, sede de la persona y beneficio aplicado"""
+    tickets = Ticket.objects.filter(estado=estado)
+    if desde:
+        tickets = tickets.filter(fecha_compra__date__gte=desde)
+    if hasta:
+        tickets = tickets.filter(fecha_compra__date__lte=hasta)
+    if sede:
+        tickets = tickets.filter(usuario__persona__sede=sede)
+    if beneficio:
+        tickets = tickets.filter(beneficio_aplicado_id=beneficio)
+    return tickets.order_by('usuario__persona__apellido', 'usuario__persona__nombre', 'id')
+
+
+def _datos(fila):
+    ticket = dict(zip(CAMPOS, fila))
+    if ticket['apellido'] or ticket['nombre']:
+        ticket['nombre'] = f'{ticket["apellido"]}, {ticket["nombre"]}'
+    else:
+        ticket['nombre'] = ticket['usuario']
+    ticket['valido_hasta'] = ticket['valido_hasta'].strftime('%d/%m/%Y') if ticket['valido_hasta'] else ''
+    ticket['beneficio'] = ticket['beneficio'] or ''
+    ticket['documento'] = ticket['documento'] or ''
+    return ticket
+
+
+def _lotes(tickets):
+    lote = []
+    for fila in tickets.values_list(*CAMPOS.values()).iterator(chunk_size=2000):
+        lote.append(_datos(fila))
+        if len(lote) == TICKETS_POR_LOTE:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def _renderizados(tickets, procesos):
+    if procesos <= 1:
+        yield from map(renderizar_lote, _lotes(tickets))
+        return
+    with ProcessPoolExecutor(procesos, mp_context=multiprocessing.get_context('spawn')) as pool:
+        en_vuelo = deque()
+        try:
+            for lote in _lotes(tickets):
+                en_vuelo.append(pool.submit(renderizar_lote, lote))
+                if len(en_vuelo) >= 2 * procesos:
+                    yield en_vuelo.popleft().result()
+            while en_vuelo:
+                yield en_vuelo.popleft().result()
+        finally:
+            # Descarga cortada: no seguir armando lotes que nadie va a leer
+            for futuro in en_vuelo:
+                futuro.cancel()
+
+
+def generar(tickets, procesos=None):
+    """Bytes del PDF unido, de a un lote por vez (para StreamingHttpResponse o un archivo)"""
+    union = UnionPDF()
+    yield union.encabezado()
+    for pdf in _renderizados(tickets, PROCESOS if procesos is None else procesos):
+        yield union.agregar(pdf)
+    yield union.cierre()
+
+
+def guardar(tickets, ruta=None, procesos=None):
+    """Escribe la planilla en ``ruta`` (por defecto en MEDIA_ROOT) y devuelve la ruta"""
+    if ruta is None:
+        nombre = f'tickets-{datetime.now():%Y%m%d-%H%M%S}.pdf'
+        ruta = os.path.join(settings.MEDIA_ROOT, DIRECTORIO, nombre)
+    os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+    # Con otro nombre mientras se escribe, para no listar una planilla a medias
+    with open(f'{ruta}.parcial', 'wb') as archivo:
+        for parte in generar(tickets, procesos):
+            archivo.write(parte)
+    os.replace(f'{ruta}.parcial', ruta)
+    return ruta
+
+
+def generadas(cantidad=10):
+    """[(nombre, url)] de las últimas planillas guardadas en MEDIA_ROOT"""
+    directorio = os.path.join(settings.MEDIA_ROOT, DIRECTORIO)
+    if not os.path.isdir(directorio):
+        return []
+    nombres = sorted((nombre for nombre in os.listdir(directorio) if nombre.endswith('.pdf')), reverse=True)
+    return [(nombre, f'{settings.MEDIA_URL}{DIRECTORIO}/{nombre}') for nombre in nombres[:cantidad]]
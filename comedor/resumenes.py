@@ -0,0 +1,148 @@
+"""
+Resumen diario de ventas (``ResumenDiarioVentas``) mantenido en forma incremental.
+
+``actualizar_resumenes`` suma los tickets con id mayor a la marca
+(``MarcaResumenVentas``) agrupados por día, sede, menú, beca, rol y
+dependencia (la del estudiante o, si no, la del docente), y avanza
+la marca en la misma transacción: si se corta, la próxima corrida retoma sin
+contar dos veces. Sólo toma tickets con más de ``ESPERA`` segundos, para no
+saltear uno cuyo id es menor pero cuya transacción confirmó después.
+
+Los tickets ya sumados que después se modifican o se borran no se reflejan:
+para eso está ``reconstruir_resumenes``. Los reportes leen sólo el resumen.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate, TruncMonth
+from django.utils import timezone
+
+from persona.models import Persona
+
+from .models import MarcaResumenVentas, ResumenDiarioVentas, Ticket
+
+ESPERA = 300
+LOTE = 20000
+
+CLAVE = {
+    'dia': TruncDate('fecha_compra'),
+    'sede': F('usuario__persona__sede'),
+    'beca_id': F('beca_utilizada__beca_id'),
+    'rol': F('usuario__persona__rol'),
+    'dependencia_id': Coalesce('usuario__persona__estudiante__dependencia', 'usuario__persona__docente__dependencia'),
+}
+TOTALES = {
+    'cantidad': Count('id'),
+    'con_beneficio': Count('id', filter=Q(beneficio_aplicado__isnull=False)),
+    'subtotal': Sum('precio_base'),
+    'descuentos': Sum('descuento_aplicado'),
+    'pagado': Sum('precio_pagado'),
+}
+MONTOS = ('cantidad', 'con_beneficio', 'subtotal', 'descuentos', 'pagado')
+
+DIMENSIONES = {
+    'sede': 'sede',
+    'tipo_menu': 'tipo_menu__nombre',
+    'beca': 'beca__tipo',
+    'rol': 'rol',
+    'dependencia': 'dependencia__nombre',
+}
+ETIQUETAS = {'sede': dict(Persona.SEDES), 'rol': dict(Persona.ROLES)}
+SIN_GRUPO = {'beca': 'Sin beca', 'dependencia': 'Sin dependencia'}
+
+
+def _clave(fila):
+    return (
+        fila['dia'], fila['sede'] or '', fila['tipo_menu_id'], fila['beca_id'], fila['rol'] or '',
+        fila['dependencia_id'],
+    )
+
+
+def _sumar(desde, hasta):
+    """Suma al resumen los tickets con ``desde < id <= hasta``; devuelve cuántos eran"""
+    grupos = list(
+        Ticket.objects.filter(id__gt=desde, id__lte=hasta)
+        .values('tipo_menu_id', **CLAVE)
+        .annotate(**TOTALES)
+        .order_by()
+    )
+    if not grupos:
+        return 0
+
+    # Las filas de esos días se leen de una vez y se escriben con bulk_update/bulk_create
+    existentes = {
+        _clave(fila.__dict__): fila
+        for fila in ResumenDiarioVentas.objects.filter(dia__in={grupo['dia'] for grupo in grupos})
+    }
+    nuevas, modificadas = [], []
+    for grupo in grupos:
+        clave = _clave(grupo)
+        fila = existentes.get(clave)
+        if fila is None:
+            # Sin persona enlazada, sede y rol quedan vacíos
+            dia, sede, tipo_menu_id, beca_id, rol, dependencia_id = clave
+            nuevas.append(ResumenDiarioVentas(
+                dia=dia, sede=sede, tipo_menu_id=tipo_menu_id, beca_id=beca_id, rol=rol,
+                dependencia_id=dependencia_id,
+                **{campo: grupo[campo] for campo in MONTOS},
+            ))
+        else:
+            for campo in MONTOS:
+                setattr(fila, campo, getattr(fila, campo) + grupo[campo])
+            modificadas.append(fila)
+    ResumenDiarioVentas.objects.bulk_create(nuevas, batch_size=500)
+    ResumenDiarioVentas.objects.bulk_update(modificadas, MONTOS, batch_size=500)
+    return sum(grupo['cantidad'] for grupo in grupos)
+
+
+def actualizar_resumenes(lote=LOTE):
+    """Suma los tickets nuevos desde la marca; devuelve cuántos tickets procesó"""
+    marca = MarcaResumenVentas.obtener().ultimo_ticket
+    tope = Ticket.objects.filter(
+        id__gt=marca, fecha_compra__lt=timezone.now() - timedelta(seconds=ESPERA),
+    ).aggregate(tope=Max('id'))['tope']
+    if tope is None:
+        return 0
+
+    procesados = 0
+    while marca < tope:
+        hasta = min(marca + lote, tope)
+        with transaction.atomic():
+            # La fila de la marca hace de candado si dos procesos llegan a la vez
+            actual = MarcaResumenVentas.objects.select_for_update().get(pk=1)
+            if actual.ultimo_ticket != marca:
+                return procesados
+            procesados += _sumar(marca, hasta)
+            actual.ultimo_ticket = hasta
+            actual.save(update_fields=['ultimo_ticket', 'actualizado'])
+        marca = hasta
+    return procesados
+
+
+def reconstruir_resumenes():
+    """Borra el resumen y lo vuelve a calcular desde el primer ticket"""
+    with transaction.atomic():
+        ResumenDiarioVentas.objects.all().delete()
+        MarcaResumenVentas.objects.update_or_create(pk=1, defaults={'ultimo_ticket': 0})
+    return actualizar_resumenes()
+
+
+def reporte(desde, hasta, dimension=None, dependencia=None):
+    """Totales por mes (y por ``dimension``) entre dos fechas, leídos del resumen"""
+    agrupar = ['mes'] + ([DIMENSIONES[dimension]] if dimension else [])
+    resumen = ResumenDiarioVentas.objects.filter(dia__gte=desde, dia__lte=hasta)
+    if dependencia:
+        resumen = resumen.filter(dependencia_id=dependencia)
+    filas = (
+        resumen
+        .annotate(mes=TruncMonth('dia'))
+        .values(*agrupar)
+        .annotate(**{campo: Sum(campo) for campo in MONTOS})
+        .order_by(*agrupar)
+    )
+    etiquetas = ETIQUETAS.get(dimension, {})
+    for fila in filas:
+        grupo = fila[DIMENSIONES[dimension]] if dimension else ''
+        fila['grupo'] = etiquetas.get(grupo, grupo) or SIN_GRUPO.get(dimension, '-')
+        yield fila
@@ -0,0 +1,25 @@
+from django.db.models.signals import post_delete, post_save
+
+from persona.models import Beca, PersonaBeca
+from rendimiento import cache
+
+from .models import BeneficioComedor, ConfiguracionMenu, ImagenCarrusel, TipoMenu
+
+# Espacios de rendimiento.cache que dependen de cada modelo
+INVALIDACIONES = {
+    ConfiguracionMenu: ['comedor.config'],
+    TipoMenu: ['comedor.config', 'comedor.tablero'],
+    BeneficioComedor: ['comedor.beneficios', 'comedor.tablero'],
+    ImagenCarrusel: ['comedor.tablero'],
+    PersonaBeca: ['persona.elegibilidad'],
+    Beca: ['persona.elegibilidad', 'comedor.beneficios'],
+}
+
+
+def invalidar_cache(sender, **kwargs):
+    cache.invalidar(*INVALIDACIONES[sender])
+
+
+for modelo in INVALIDACIONES:
+    post_save.connect(invalidar_cache, sender=modelo, dispatch_uid=f'invalidar_cache_{modelo.__name__}')
+    post_delete.connect(invalidar_cache, sender=modelo, dispatch_uid=f'invalidar_cache_borrado_{modelo.__name__}')
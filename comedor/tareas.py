@@ -0,0 +1,65 @@
+import os
+
+from django.conf import settings
+from django.utils import timezone
+
+from rendimiento import cache
+from tareas.cola import tarea
+from tareas.periodicas import periodica
+
+from .models import BeneficioComedor, ConfiguracionMenu, Ticket
+from .idempotencia import purgar_vencidas
+from .planillas import guardar, tickets_a_imprimir
+from .resumenes import actualizar_resumenes
+
+
+@tarea(prioridad=10)
+def generar_qr(ticket_id):
+    """QR de un ticket recién emitido (con COMEDOR_QR_EN_SEGUNDO_PLANO)"""
+    ticket = Ticket.objects.filter(pk=ticket_id).first()
+    if ticket is None or ticket.qr_code:
+        return False
+    ticket.generar_qr()
+    return True
+
+
+@tarea
+def generar_planilla(desde=None, hasta=None, sede=None, beneficio=None):
+    """Planilla de tickets para imprimir, guardada en MEDIA_ROOT (devuelve la ruta relativa)"""
+    ruta = guardar(tickets_a_imprimir(desde=desde, hasta=hasta, sede=sede, beneficio=beneficio))
+    return os.path.relpath(ruta, settings.MEDIA_ROOT)
+
+
+@periodica('5 0 * * *')
+def vencer_tickets():
+    """Pasa a vencidos los tickets pagados sin usar después de su fecha de validez"""
+    return Ticket.objects.filter(
+        estado='pagado', fecha_valido_hasta__lt=timezone.now().date(),
+    ).update(estado='vencido')
+
+
+@periodica('*/10 * * * *')
+def actualizar_resumen_ventas():
+    """Suma al resumen diario de ventas los tickets nuevos"""
+    return actualizar_resumenes()
+
+
+@periodica('*/15 * * * *')
+def purgar_claves_idempotencia():
+    """Borra las claves de idempotencia de compras vencidas"""
+    return purgar_vencidas()
+
+
+@periodica('* * * * *')
+def calentar_cache():
+    """
+    Recalcula los contadores del panel antes de que venzan y carga la
+    configuración y los beneficios si se invalidaron.
+    """
+    from .views import TIMEOUT_TABLERO, _calcular_actividades, _contar_catalogo
+
+    ConfiguracionMenu.get_config()
+    BeneficioComedor.activos_por_beca()
+    # TTL de más: si el programador se detiene, los contadores siguen venciendo solos
+    cache.refrescar('comedor.tablero', ['actividades'], _calcular_actividades, timeout=TIMEOUT_TABLERO * 2)
+    cache.refrescar('comedor.tablero', ['catalogo'], _contar_catalogo, timeout=TIMEOUT_TABLERO * 2)
@@ -0,0 +1,145 @@
+"""
+Cupos por turno del comedor.
+
+Cada ``TurnoServicio`` reparte su cupo en ``COMEDOR_TURNOS_FRANJAS`` filas de
+``FranjaCupoTurno``. Reservar es un solo UPDATE condicional sobre una franja::
+
+    UPDATE ... SET reservados = reservados + n WHERE id = ... AND reservados + n <= cupo
+
+así que dos compras nunca venden el mismo lugar y no hace falta leer el
+contador antes. La fila queda bloqueada hasta que termina la transacción de la
+compra: con un solo contador por turno, las compras del mediodía harían fila
+detrás de ese lock. Con franjas, cada compra toma una franja con lugar que
+nadie tenga bloqueada (``SKIP LOCKED``) y sólo espera si están todas en uso.
+
+Una reserva de ``n`` lugares va a una sola franja si alguna tiene lugar; si
+no, junta lugares de varias, así alcanza mientras el turno tenga ``n`` libres.
+La disponibilidad que ven los usuarios sale de la caché por unos segundos
+(``COMEDOR_TURNOS_CACHE``); el que decide es el UPDATE.
+"""
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from rendimiento import cache
+from rendimiento.metricas import reservas_turnos
+
+from .models import FranjaCupoTurno, TurnoServicio
+
+FRANJAS = getattr(settings, 'COMEDOR_TURNOS_FRANJAS', 8)
+DIAS_A_LA_VENTA = getattr(settings, 'COMEDOR_TURNOS_DIAS', 7)
+TIMEOUT_DISPONIBILIDAD = getattr(settings, 'COMEDOR_TURNOS_CACHE', 5)
+
+
+class SinCupo(Exception):
+    """El turno no tiene lugar para la reserva"""
+
+
+def repartir_cupo(turno, franjas=None):
+    """Crea las franjas de un turno nuevo, con el cupo repartido lo más parejo posible"""
+    franjas = max(1, min(franjas or FRANJAS, turno.cupo))
+    base, resto = divmod(turno.cupo, franjas)
+    FranjaCupoTurno.objects.bulk_create(
+        FranjaCupoTurno(turno=turno, indice=indice, cupo=base + (indice < resto))
+        for indice in range(franjas)
+    )
+
+
+def crear_turno(fecha, sede, hora_inicio, hora_fin, cupo, franjas=None):
+    with transaction.atomic():
+        turno = TurnoServicio.objects.create(
+            fecha=fecha, sede=sede, hora_inicio=hora_inicio, hora_fin=hora_fin, cupo=cupo,
+        )
+        repartir_cupo(turno, franjas)
+    cache.invalidar('comedor.turnos')
+    return turno
+
+
+def reservar(turno_id, cantidad=1):
+    """
+    Toma ``cantidad`` lugares del turno o levanta ``SinCupo``. Va dentro de la
+    transacción de la compra: si la compra falla, la reserva se deshace.
+    """
+    franjas = FranjaCupoTurno.objects.filter(turno_id=turno_id)
+    con_lugar = franjas.filter(reservados__lte=F('cupo') - cantidad)
+
+    libre = con_lugar.select_for_update(skip_locked=True).order_by('?').values_list('pk', flat=True).first()
+    if libre is not None and con_lugar.filter(pk=libre).update(reservados=F('reservados') + cantidad):
+        reservas_turnos.inc(resultado='libre')
+        return
+    if cantidad == 1:
+        # Las franjas con lugar (si queda alguna) están bloqueadas por otras compras:
+        # esperar por una, que al liberarse vuelve a evaluar la condición
+        candidatas = list(con_lugar.values_list('pk', flat=True))
+        random.shuffle(candidatas)
+        for franja in candidatas:
+            if con_lugar.filter(pk=franja).update(reservados=F('reservados') + 1):
+                reservas_turnos.inc(resultado='espera')
+                return
+    else:
+        _reservar_en_varias(franjas, cantidad)
+        return
+    reservas_turnos.inc(resultado='sin_cupo')
+    raise SinCupo(f'El turno no tiene {cantidad} lugar(es) libre(s)')
+
+
+def _reservar_en_varias(franjas, cantidad):
+    """Ninguna franja tiene ``cantidad`` lugares: los junta de varias"""
+    con_algo = franjas.filter(reservados__lt=F('cupo')).order_by('pk').values_list('pk', 'cupo', 'reservados')
+    resultado, libres = 'varias', list(con_algo.select_for_update(skip_locked=True))
+    if sum(cupo - reservados for _, cupo, reservados in libres) < cantidad:
+        # Lo que falta está en franjas bloqueadas por otras compras: esperarlas
+        resultado, libres = 'espera', list(con_algo.select_for_update())
+
+    restante = cantidad
+    for franja, cupo, reservados in libres:
+        toma = min(cupo - reservados, restante)
+        if toma > 0 and franjas.filter(pk=franja, reservados__lte=F('cupo') - toma).update(
+            reservados=F('reservados') + toma
+        ):
+            restante -= toma
+        if not restante:
+            reservas_turnos.inc(resultado=resultado)
+            return
+    # Lo tomado hasta acá se deshace con la transacción de la compra
+    reservas_turnos.inc(resultado='sin_cupo')
+    raise SinCupo(f'El turno no tiene {cantidad} lugar(es) libre(s)')
+
+
+def _calcular_disponibilidad(sede, dia):
+    ahora = timezone.localtime()
+    turnos = (
+        TurnoServicio.objects
+        .filter(sede=sede, activo=True, fecha__gte=dia, fecha__lt=dia + timedelta(days=DIAS_A_LA_VENTA))
+        .exclude(fecha=ahora.date(), hora_fin__lte=ahora.time())
+        .annotate(reservados=Sum('franjas__reservados'))
+    )
+    return [
+        {
+            'id': turno.pk,
+            'fecha': turno.fecha,
+            'hora_inicio': turno.hora_inicio,
+            'hora_fin': turno.hora_fin,
+            'cupo': turno.cupo,
+            'libres': turno.cupo - (turno.reservados or 0),
+        }
+        for turno in turnos
+    ]
+
+
+def disponibilidad(sede):
+    """Turnos a la venta en la sede con sus lugares libres (de la caché, unos segundos)"""
+    dia = timezone.localdate()
+    return cache.obtener(
+        'comedor.turnos', [sede, dia.isoformat()], lambda: _calcular_disponibilidad(sede, dia),
+        timeout=TIMEOUT_DISPONIBILIDAD, timeout_local=TIMEOUT_DISPONIBILIDAD,
+    )
+
+
+def elegido(turnos, valor):
+    """El turno de ``turnos`` cuyo id vino en el formulario, o None"""
+    return next((turno for turno in turnos if str(turno['id']) == str(valor)), None)
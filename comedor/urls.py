@@ -8,6 +8,7 @@ urlpatterns = [
     path('ticket/<int:ticket_id>/', views.detalle_ticket, name='detalle_ticket'),
 
     path('actividades/', views.actividades_auditor, name='actividades_auditor'),
+    path('reportes/ventas/', views.reporte_ventas, name='reporte_ventas'),
 
     # Vista pública
     path('carrousel/', views.carrousel_view, name='carrousel'),
@@ -43,6 +44,7 @@ urlpatterns = [
     path('admin/becas/<int:beca_id>/editar/', views.editar_beca, name='editar_beca'),
     path('admin/becas/<int:beca_id>/eliminar/', views.eliminar_beca, name='eliminar_beca'),
     path('admin/buscar-estudiante/', views.buscar_estudiante, name='buscar_estudiante'),
+    path('admin/planillas/', views.planillas_tickets, name='planillas_tickets'),
 
     # Gestión de Becas
     path('admin/becas-catalogo/', views.listar_becas, name='listar_becas'),
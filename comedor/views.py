@@ -1,3 +1,8 @@
+import csv
+import logging
+
+from asgiref.sync import sync_to_async
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
@@ -8,9 +13,21 @@ from .models import Ticket, TipoMenu, CompraTickets, ConfiguracionMenu, Benefici
     CertificadoCeliaco
 from .forms import CompraTicketForm, TipoMenuForm, BeneficioComedorForm, ImagenCarruselForm, CertificadoCeliacoForm, \
     BecaForm, ValidacionEstudianteForm
-from .decorators import admin_comedor_required, auditor_required
-from persona.models import PersonaBeca, Beca, PersonaEstudiante, Persona
+from .decorators import admin_comedor_required, auditor_required, login_required_async
+from .elegibilidad import becas_con_beneficio
+from . import idempotencia, planillas
+from .resumenes import DIMENSIONES, reporte
+from .tareas import generar_planilla
+from .turnos import SinCupo, disponibilidad, elegido, reservar
+from persona.models import PersonaBeca, Beca, PersonaEstudiante, Persona, Dependencia
 from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rendimiento import cache
+
+logger = logging.getLogger(__name__)
+
+# Segundos que se reutilizan los contadores del panel y de actividades
+TIMEOUT_TABLERO = 60
 
 
 def carrousel(request):
@@ -31,35 +48,21 @@ def comprar_tickets(request):
     es_gratuito = False
     preferencia_usuario = None
 
+    # Turnos a la venta en la sede; si la sede no tiene, se compra sin turno
+    turnos = disponibilidad(request.user.persona.sede) if hasattr(request.user, 'persona') else []
+
     if hasattr(request.user, 'persona') and hasattr(request.user.persona, 'estudiante'):
         preferencia_usuario = request.user.persona.estudiante.preferencia_menu
 
-        hoy = timezone.now().date()
-
-        # Buscar becas activas del estudiante
-        becas_activas = PersonaBeca.objects.filter(
-            persona_estudiante=request.user.persona.estudiante,
-            estado_beca='ACTIVA',
-            fecha_inicio__lte=hoy,
-            fecha_fin__gte=hoy
-        ).select_related('beca')
-
-        # Buscar si alguna beca tiene beneficio de comedor
-        for persona_beca in becas_activas:
-            try:
-                beneficio = BeneficioComedor.objects.get(
-                    tipo_beca=persona_beca.beca,
-                    activo=True
-                )
-                beneficio_disponible = beneficio
-                beca_activa = persona_beca
+        # Primera beca activa del estudiante con beneficio de comedor
+        for persona_beca, beneficio in becas_con_beneficio(request.user.persona.estudiante):
+            beneficio_disponible = beneficio
+            beca_activa = persona_beca
 
-                # Verificar si es 100% gratuito
-                if beneficio.tipo_beneficio == 'gratuito' or beneficio.porcentaje_descuento == 100:
-                    es_gratuito = True
-                break
-            except BeneficioComedor.DoesNotExist:
-                continue
+            # Verificar si es 100% gratuito
+            if beneficio.tipo_beneficio == 'gratuito' or beneficio.porcentaje_descuento == 100:
+                es_gratuito = True
+            break
 
     # ============================================
     # CASO 1: BECA GRATUITA - GENERACIÓN DIRECTA
@@ -75,6 +78,12 @@ def comprar_tickets(request):
     # CASO 2: DESCUENTO PARCIAL O SIN BECA
     # ============================================
     if request.method == 'POST':
+        # Doble clic o reintento: la misma respuesta que la primera vez
+        clave = idempotencia.clave_de(request)
+        registro = idempotencia.anterior(request.user, clave)
+        if registro:
+            return idempotencia.repetir(request, registro)
+
         form = CompraTicketForm(
             request.POST,
             request.FILES,
@@ -82,12 +91,18 @@ def comprar_tickets(request):
             tiene_beneficio=beneficio_disponible is not None
         )
 
+        cantidad = 1
+
+        # El turno es para un solo ticket: los paquetes no llevan turno y valen 30 días
+        turno = elegido(turnos, request.POST.get('turno')) if cantidad == 1 else None
+        if turnos and cantidad == 1 and turno is None:
+            messages.error(request, 'Elegí el turno en el que vas a usar el ticket')
+            return redirect('comprar_tickets')
+
         if form.is_valid():
             try:
                 with transaction.atomic():
 
-                    cantidad = 1
-
                     if not preferencia_usuario:
                         messages.error(request, 'No tienes una preferencia de menú configurada')
                         return redirect('comprar_tickets')
@@ -119,6 +134,10 @@ def comprar_tickets(request):
                     total_descuentos = descuento * cantidad
                     total_pagado = precio_final * cantidad
 
+                    registro = idempotencia.tomar(request.user, clave, 'comprar_tickets')
+                    if turno:
+                        reservar(turno['id'])
+
                     # Crear la compra
                     compra = CompraTickets.objects.create(
                         usuario=request.user,
@@ -130,8 +149,8 @@ def comprar_tickets(request):
                         tickets_con_beneficio=cantidad if beneficio_disponible else 0
                     )
 
-                    # Crear tickets
-                    fecha_valido = datetime.now().date() + timedelta(days=30)
+                    # Crear tickets (con turno, valen para ese día)
+                    fecha_valido = turno['fecha'] if turno else datetime.now().date() + timedelta(days=30)
 
                     for i in range(cantidad):
                         Ticket.objects.create(
@@ -145,32 +164,36 @@ def comprar_tickets(request):
                             requiere_menu_celiaco=preferencia_usuario.startswith('celiaco'),
                             estado='pagado',
                             compra=compra,
+                            turno_id=turno['id'] if turno else None,
                             fecha_valido_hasta=fecha_valido
                         )
 
-                # Mensaje de éxito personalizado según el beneficio
-                if beneficio_disponible:
-                    if precio_final == 0:
-                        messages.success(
-                            request,
-                            f'¡Tickets generados exitosamente! Se crearon {cantidad} ticket(s) GRATUITOS '
-                            f'por tu beca {beca_activa.beca.tipo}. '
-                            f'Puedes ver tus códigos QR en "Mis Tickets".'
-                        )
+                    # Mensaje de éxito personalizado según el beneficio
+                    if beneficio_disponible:
+                        if precio_final == 0:
+                            mensaje = (
+                                f'¡Tickets generados exitosamente! Se crearon {cantidad} ticket(s) GRATUITOS '
+                                f'por tu beca {beca_activa.beca.tipo}. '
+                                f'Puedes ver tus códigos QR en "Mis Tickets".'
+                            )
+                        else:
+                            mensaje = (
+                                f'¡Compra exitosa! Se generaron {cantidad} ticket(s). '
+                                f'Descuento aplicado: ${total_descuentos:.2f} ({beneficio_disponible.porcentaje_descuento}%). '
+                                f'Total a pagar: ${total_pagado:.2f}'
+                            )
                     else:
-                        messages.success(
-                            request,
-                            f'¡Compra exitosa! Se generaron {cantidad} ticket(s). '
-                            f'Descuento aplicado: ${total_descuentos:.2f} ({beneficio_disponible.porcentaje_descuento}%). '
-                            f'Total a pagar: ${total_pagado:.2f}'
-                        )
-                else:
-                    messages.success(
-                        request,
-                        f'¡Compra exitosa! Se generaron {cantidad} ticket(s). Total: ${total_pagado:.2f}'
-                    )
+                        mensaje = f'¡Compra exitosa! Se generaron {cantidad} ticket(s). Total: ${total_pagado:.2f}'
+                    idempotencia.guardar(registro, compra, 'mis_tickets', mensaje)
+
+                messages.success(request, mensaje)
                 return redirect('mis_tickets')
 
+            except idempotencia.ClaveEnUso:
+                return _compra_repetida(request, clave)
+            except SinCupo:
+                messages.error(request, 'El turno elegido se quedó sin lugares. Elegí otro turno.')
+                return redirect('comprar_tickets')
             except Exception as e:
                 messages.error(request, f'Error al procesar la compra: {str(e)}')
                 return redirect('comprar_tickets')
@@ -201,11 +224,13 @@ def comprar_tickets(request):
         else:
             precio_final_menu = menu_a_mostrar.precio
 
-    print(f"DEBUG CONTEXT:")
-    print(f"  - preferencia_usuario: {preferencia_usuario}")
-    print(f"  - menu_a_mostrar: {menu_a_mostrar}")
-    print(f"  - menu activo: {menu_a_mostrar.activo if menu_a_mostrar else 'N/A'}")
-    print(f"  - precio_final_menu: {precio_final_menu}")
+    logger.debug(
+        "comprar_tickets: preferencia=%s menu=%s activo=%s precio_final=%s",
+        preferencia_usuario,
+        menu_a_mostrar,
+        menu_a_mostrar.activo if menu_a_mostrar else 'N/A',
+        precio_final_menu,
+    )
 
     context = {
         'form': form,
@@ -215,11 +240,22 @@ def comprar_tickets(request):
         'beneficio_disponible': beneficio_disponible,
         'beca_activa': beca_activa,
         'preferencia_usuario': preferencia_usuario,
+        'turnos': turnos,
+        'clave_idempotencia': idempotencia.nueva_clave(),
     }
 
     return render(request, 'comedor/comprar.html', context)
 
 
+def _compra_repetida(request, clave):
+    """El mismo pedido llegó mientras se procesaba: respuesta del que ganó"""
+    registro = idempotencia.anterior(request.user, clave)
+    if registro:
+        return idempotencia.repetir(request, registro)
+    messages.warning(request, 'Tu compra ya se está procesando.')
+    return redirect('mis_tickets')
+
+
 @login_required
 def generar_ticket_gratuito(request):
     """
@@ -235,29 +271,14 @@ def generar_ticket_gratuito(request):
     es_gratuito = False
 
     if hasattr(request.user, 'persona') and hasattr(request.user.persona, 'estudiante'):
-        hoy = timezone.now().date()
         estudiante = request.user.persona.estudiante
 
-        becas_activas = PersonaBeca.objects.filter(
-            persona_estudiante=estudiante,
-            estado_beca='ACTIVA',
-            fecha_inicio__lte=hoy,
-            fecha_fin__gte=hoy
-        ).select_related('beca')
-
-        for persona_beca in becas_activas:
-            try:
-                beneficio = BeneficioComedor.objects.get(
-                    tipo_beca=persona_beca.beca,
-                    activo=True
-                )
-                if beneficio.tipo_beneficio == 'gratuito' or beneficio.porcentaje_descuento == 100:
-                    beneficio_disponible = beneficio
-                    beca_activa = persona_beca
-                    es_gratuito = True
-                    break
-            except BeneficioComedor.DoesNotExist:
-                continue
+        for persona_beca, beneficio in becas_con_beneficio(estudiante):
+            if beneficio.tipo_beneficio == 'gratuito' or beneficio.porcentaje_descuento == 100:
+                beneficio_disponible = beneficio
+                beca_activa = persona_beca
+                es_gratuito = True
+                break
 
     if not es_gratuito:
         messages.warning(request, 'No tienes una beca con acceso gratuito al comedor.')
@@ -275,10 +296,23 @@ def generar_ticket_gratuito(request):
         messages.error(request, 'El menú configurado no está disponible. Por favor contacta al administrador.')
         return redirect('mis_tickets')
 
+    turnos = disponibilidad(request.user.persona.sede)
+
     if request.method == 'POST':
+        clave = idempotencia.clave_de(request)
+        registro = idempotencia.anterior(request.user, clave)
+        if registro:
+            return idempotencia.repetir(request, registro)
+
         cantidad = int(request.POST.get('cantidad', 1))
         requiere_celiaquia = request.POST.get('requiere_celiaquia') == 'on'
         formulario_celiaquia = request.FILES.get('formulario_celiaquia') if requiere_celiaquia else None
+        # El turno es para un solo ticket: los paquetes no llevan turno y valen 30 días
+        turno = elegido(turnos, request.POST.get('turno')) if cantidad == 1 else None
+
+        if turnos and cantidad == 1 and turno is None:
+            messages.error(request, 'Elegí el turno en el que vas a usar el ticket')
+            return redirect('generar_ticket_gratuito')
 
         # Validación: si requiere celiaquía, debe subir el formulario
         if requiere_celiaquia and config.requiere_formulario_celiaquia and not formulario_celiaquia:
@@ -288,6 +322,8 @@ def generar_ticket_gratuito(request):
                 'beneficio_disponible': beneficio_disponible,
                 'beca_activa': beca_activa,
                 'estudiante': estudiante,
+                'turnos': turnos,
+                'clave_idempotencia': idempotencia.nueva_clave(),
             })
 
         try:
@@ -296,6 +332,10 @@ def generar_ticket_gratuito(request):
                 precio_final = Decimal('0.00')
                 descuento = precio_base
 
+                registro = idempotencia.tomar(request.user, clave, 'generar_ticket_gratuito')
+                if turno:
+                    reservar(turno['id'])
+
                 # Crear la compra
                 compra = CompraTickets.objects.create(
                     usuario=request.user,
@@ -307,8 +347,8 @@ def generar_ticket_gratuito(request):
                     tickets_con_beneficio=cantidad
                 )
 
-                # Crear tickets
-                fecha_valido = datetime.now().date() + timedelta(days=30)
+                # Crear tickets (con turno, valen para ese día)
+                fecha_valido = turno['fecha'] if turno else datetime.now().date() + timedelta(days=30)
 
                 for i in range(cantidad):
                     Ticket.objects.create(
@@ -323,16 +363,22 @@ def generar_ticket_gratuito(request):
                         formulario_celiaquia=formulario_celiaquia if requiere_celiaquia else None,
                         estado='pagado',
                         compra=compra,
+                        turno_id=turno['id'] if turno else None,
                         fecha_valido_hasta=fecha_valido
                     )
 
-                messages.success(
-                    request,
+                mensaje = (
                     f'¡Tickets generados exitosamente! Se crearon {cantidad} ticket(s) GRATUITOS. '
                     f'Puedes ver tus códigos QR en "Mis Tickets".'
                 )
+                idempotencia.guardar(registro, compra, 'mis_tickets', mensaje)
+                messages.success(request, mensaje)
                 return redirect('mis_tickets')
 
+        except idempotencia.ClaveEnUso:
+            return _compra_repetida(request, clave)
+        except SinCupo:
+            messages.error(request, 'El turno elegido se quedó sin lugares. Elegí otro turno.')
         except Exception as e:
             messages.error(request, f'Error al generar tickets: {str(e)}')
 
@@ -342,48 +388,64 @@ def generar_ticket_gratuito(request):
         'beca_activa': beca_activa,
         'estudiante': estudiante,
         'config': config,
+        'turnos': turnos,
+        'clave_idempotencia': idempotencia.nueva_clave(),
     }
 
     return render(request, 'comedor/generar_gratuito.html', context)
 
 
-@login_required
-def mis_tickets(request):
-    tickets = Ticket.objects.filter(usuario=request.user).order_by('-fecha_compra')
+# Vistas de sólo lectura async: consultas con el ORM async y render en un hilo,
+# porque el layout lee user.persona y otras relaciones de forma perezosa
+@login_required_async
+async def mis_tickets(request):
+    tickets = [
+        ticket async for ticket in
+        Ticket.objects
+        .filter(usuario=request.user)
+        .select_related('tipo_menu')
+        .order_by('-fecha_compra')
+    ]
 
     context = {
         'tickets': tickets,
     }
 
-    return render(request, 'comedor/mis_tickets.html', context)
+    return await sync_to_async(render)(request, 'comedor/mis_tickets.html', context)
 
 
-@login_required
-def detalle_ticket(request, ticket_id):
-    ticket = get_object_or_404(Ticket, id=ticket_id, usuario=request.user)
+@login_required_async
+async def detalle_ticket(request, ticket_id):
+    try:
+        ticket = await Ticket.objects.select_related('tipo_menu', 'turno').aget(id=ticket_id, usuario=request.user)
+    except Ticket.DoesNotExist:
+        raise Http404('No Ticket matches the given query.')
 
     context = {
         'ticket': ticket,
     }
 
-    return render(request, 'comedor/detalle_ticket.html', context)
+    return await sync_to_async(render)(request, 'comedor/detalle_ticket.html', context)
 
 
 # Vista pública del carrusel
-def carrousel_view(request):
+async def carrousel_view(request):
     hoy = date.today()
-    imagenes = ImagenCarrusel.objects.filter(
-        activo=True
-    ).filter(
-        Q(fecha_desde__isnull=True) | Q(fecha_desde__lte=hoy)
-    ).filter(
-        Q(fecha_hasta__isnull=True) | Q(fecha_hasta__gte=hoy)
-    ).order_by('orden', 'dia_semana')
+    imagenes = [
+        imagen async for imagen in
+        ImagenCarrusel.objects.filter(
+            activo=True
+        ).filter(
+            Q(fecha_desde__isnull=True) | Q(fecha_desde__lte=hoy)
+        ).filter(
+            Q(fecha_hasta__isnull=True) | Q(fecha_hasta__gte=hoy)
+        ).order_by('orden', 'dia_semana')
+    ]
 
-    return render(request, 'comedor/carrousel.html', {'imagenes': imagenes})
+    return await sync_to_async(render)(request, 'comedor/carrousel.html', {'imagenes': imagenes})
 
 
-def _build_actividades_context():
+def _calcular_actividades():
     tickets_pagados = Ticket.objects.filter(estado='pagado')
 
     menus_comunes = tickets_pagados.filter(tipo_menu__tipo='comun').count()
@@ -415,66 +477,35 @@ def _build_actividades_context():
     }
 
 
-# Panel de administración - Dashboard
-@admin_comedor_required
-def panel_admin(request):
-    # Estadísticas de imágenes
-    total_imagenes = ImagenCarrusel.objects.count()
-    imagenes_activas = ImagenCarrusel.objects.filter(activo=True).count()
-    imagenes_inactivas = ImagenCarrusel.objects.filter(activo=False).count()
-
-    # Estadísticas de menús
-    total_menus = TipoMenu.objects.count()
-    menus_activos = TipoMenu.objects.filter(activo=True).count()
-    menus_inactivos = TipoMenu.objects.filter(activo=False).count()
-
-    total_beneficios = BeneficioComedor.objects.count()
-    beneficios_activos = BeneficioComedor.objects.filter(activo=True).count()
-    beneficios_inactivos = BeneficioComedor.objects.filter(activo=False).count()
-    beneficios_gratuitos = BeneficioComedor.objects.filter(
-        activo=True,
-        porcentaje_descuento=100
-    ).count()
-
-    # Actividades y compras
-    tickets_pagados = Ticket.objects.filter(estado='pagado')
+def _build_actividades_context():
+    # Los tickets cambian todo el tiempo: sólo TTL, sin invalidación
+    return cache.obtener('comedor.tablero', ['actividades'], _calcular_actividades, timeout=TIMEOUT_TABLERO)
 
-    menus_comunes = tickets_pagados.filter(tipo_menu__tipo='comun').count()
-    menus_vegetarianos = tickets_pagados.filter(tipo_menu__tipo='vegetariano').count()
-    menus_celiacos = tickets_pagados.filter(
-        Q(tipo_menu__tipo='celiaco') | Q(requiere_menu_celiaco=True)
-    ).count()
 
-    descuentos_aplicados = tickets_pagados.filter(descuento_aplicado__gt=0)
+def _contar_catalogo():
+    return {
+        'total_imagenes': ImagenCarrusel.objects.count(),
+        'imagenes_activas': ImagenCarrusel.objects.filter(activo=True).count(),
+        'imagenes_inactivas': ImagenCarrusel.objects.filter(activo=False).count(),
+        'total_menus': TipoMenu.objects.count(),
+        'menus_activos': TipoMenu.objects.filter(activo=True).count(),
+        'menus_inactivos': TipoMenu.objects.filter(activo=False).count(),
+        'total_beneficios': BeneficioComedor.objects.count(),
+        'beneficios_activos': BeneficioComedor.objects.filter(activo=True).count(),
+        'beneficios_inactivos': BeneficioComedor.objects.filter(activo=False).count(),
+        'beneficios_gratuitos': BeneficioComedor.objects.filter(
+            activo=True,
+            porcentaje_descuento=100
+        ).count(),
+    }
 
-    descuentos_becados = descuentos_aplicados.filter(
-        beneficio_aplicado__isnull=False
-    ).count()
-    descuentos_no_docente = descuentos_aplicados.filter(
-        usuario__persona__rol='no_docente'
-    ).count()
-    descuentos_estudiantes = descuentos_aplicados.filter(
-        usuario__persona__rol='estudiante',
-        beneficio_aplicado__isnull=True
-    ).count()
 
+# Panel de administración - Dashboard
+@admin_comedor_required
+def panel_admin(request):
     context = {
-        'total_imagenes': total_imagenes,
-        'imagenes_activas': imagenes_activas,
-        'imagenes_inactivas': imagenes_inactivas,
-        'total_menus': total_menus,
-        'menus_activos': menus_activos,
-        'menus_inactivos': menus_inactivos,
-        'total_beneficios': total_beneficios,
-        'beneficios_activos': beneficios_activos,
-        'beneficios_inactivos': beneficios_inactivos,
-        'beneficios_gratuitos': beneficios_gratuitos,
-        'menus_comunes': menus_comunes,
-        'menus_vegetarianos': menus_vegetarianos,
-        'menus_celiacos': menus_celiacos,
-        'descuentos_becados': descuentos_becados,
-        'descuentos_no_docente': descuentos_no_docente,
-        'descuentos_estudiantes': descuentos_estudiantes,
+        **cache.obtener('comedor.tablero', ['catalogo'], _contar_catalogo, timeout=TIMEOUT_TABLERO),
+        **_build_actividades_context(),
     }
     return render(request, 'comedor/admin/dashboard.html', context)
 
@@ -819,30 +850,28 @@ def detalle_beneficiario(request, estudiante_id):
     hoy = timezone.now().date()
     becas_activas_comedor = []
 
+    beneficios = BeneficioComedor.activos_por_beca()
     for beca in becas:
         if beca.estado_beca == 'ACTIVA' and beca.fecha_inicio <= hoy <= beca.fecha_fin:
-            try:
-                beneficio = BeneficioComedor.objects.get(
-                    tipo_beca=beca.beca,
-                    activo=True
-                )
+            if beca.beca_id in beneficios:
                 becas_activas_comedor.append({
                     'beca': beca,
-                    'beneficio': beneficio
+                    'beneficio': beneficios[beca.beca_id]
                 })
-            except BeneficioComedor.DoesNotExist:
-                pass
 
     # Tickets comprados
     tickets = Ticket.objects.filter(
         usuario=estudiante.persona.usuario
     ).select_related('tipo_menu', 'beneficio_aplicado').order_by('-fecha_compra')[:10]
 
+    certificado = CertificadoCeliaco.objects.con_vigencia().filter(persona=estudiante.persona).first()
+
     context = {
         'estudiante': estudiante,
         'becas': becas,
         'becas_activas_comedor': becas_activas_comedor,
         'tickets': tickets,
+        'certificado': certificado,
     }
 
     return render(request, 'comedor/admin/detalle_beneficiario.html', context)
@@ -1216,4 +1245,92 @@ def toggle_activo_beca(request, pk):
 
     estado = "activada" if beca.activa else "desactivada"
     messages.success(request, f'Beca "{beca.tipo}" {estado} exitosamente.')
-    return redirect('listar_becas')
\ No newline at end of file
+    return redirect('listar_becas')
+
+
+def _filtros_planilla(datos):
+    """Filtros válidos del formulario de planillas (texto, para poder encolarlos)"""
+    filtros = {}
+    for campo in ('desde', 'hasta'):
+        try:
+            fecha = parse_date(datos.get(campo, ''))
+        except ValueError:
+            fecha = None
+        filtros[campo] = fecha.isoformat() if fecha else None
+    sedes = dict(Persona.SEDES)
+    filtros['sede'] = datos.get('sede') if datos.get('sede') in sedes else None
+    filtros['beneficio'] = int(datos['beneficio']) if datos.get('beneficio', '').isdigit() else None
+    return filtros
+
+
+@admin_comedor_required
+def planillas_tickets(request):
+    """Tickets pagados en PDF para imprimir: descarga directa o generación en segundo plano"""
+    filtros = _filtros_planilla(request.POST if request.method == 'POST' else request.GET)
+
+    if request.method == 'POST':
+        tickets = planillas.tickets_a_imprimir(**filtros)
+        cantidad = tickets.count()
+        if not cantidad:
+            messages.warning(request, 'No hay tickets pagados con esos filtros.')
+        elif request.POST.get('accion') == 'encolar':
+            generar_planilla.encolar(**filtros)
+            messages.success(
+                request,
+                f'Se está generando la planilla de {cantidad} tickets. Va a aparecer en la lista cuando esté lista.'
+            )
+            return redirect('planillas_tickets')
+        else:
+            # Se arma y se envía de a un lote: no hace falta esperar a tener todo el PDF
+            respuesta = StreamingHttpResponse(planillas.generar(tickets), content_type='application/pdf')
+            respuesta['Content-Disposition'] = f'attachment; filename="tickets-{timezone.now():%Y%m%d-%H%M}.pdf"'
+            return respuesta
+
+    context = {
+        'filtros': filtros,
+        'sedes': Persona.SEDES,
+        'beneficios': BeneficioComedor.objects.select_related('tipo_beca').order_by('tipo_beca__tipo'),
+        'generadas': planillas.generadas(),
+    }
+    return render(request, 'comedor/admin/planillas.html', context)
+
+
+@auditor_required
+def reporte_ventas(request):
+    """Totales mensuales de ventas leídos del resumen diario; ``?formato=csv`` para exportar"""
+    hoy = timezone.now().date()
+    try:
+        desde = parse_date(request.GET.get('desde', '')) or hoy.replace(month=1, day=1)
+        hasta = parse_date(request.GET.get('hasta', '')) or hoy
+    except ValueError:
+        desde, hasta = hoy.replace(month=1, day=1), hoy
+    dimension = request.GET.get('por') if request.GET.get('por') in DIMENSIONES else None
+    dependencia = request.GET.get('dependencia', '')
+    dependencia = int(dependencia) if dependencia.isdigit() else None
+
+    filas = list(reporte(desde, hasta, dimension, dependencia))
+    campos = ['cantidad', 'con_beneficio', 'subtotal', 'descuentos', 'pagado']
+
+    if request.GET.get('formato') == 'csv':
+        respuesta = HttpResponse(content_type='text/csv; charset=utf-8')
+        respuesta['Content-Disposition'] = f'attachment; filename="ventas-{desde}-{hasta}.csv"'
+        escritor = csv.writer(respuesta)
+        escritor.writerow(['mes', dimension or ''] + campos)
+        for fila in filas:
+            escritor.writerow([fila['mes'].strftime('%Y-%m'), fila['grupo']] + [fila[campo] for campo in campos])
+        return respuesta
+
+    context = {
+        'filas': filas,
+        'totales': {campo: sum(fila[campo] for fila in filas) for campo in campos},
+        'desde': desde,
+        'hasta': hasta,
+        'dimension': dimension,
+        'dimensiones': [
+            ('sede', 'Sede'), ('tipo_menu', 'Tipo de menú'), ('beca', 'Beca'), ('rol', 'Rol'),
+            ('dependencia', 'Dependencia'),
+        ],
+        'dependencia': dependencia,
+        'dependencias': Dependencia.objects.order_by('nombre'),
+    }
+    return render(request, 'comedor/reporte_ventas.html', context)
@@ -177,6 +177,7 @@ class PersonaEstudianteAdmin(UnfoldModelAdmin):
         'get_es_celiaco',
         'get_ddjj_celiaco_estado'
     )
+    list_select_related = ('persona', 'carrera')
     list_filter = (
         'carrera',
         'estado_academico',
@@ -335,6 +336,7 @@ class PersonaBecaAdmin(UnfoldModelAdmin):
         'estado_beca',
         'monto_asignado',
     )
+    list_select_related = ('persona_estudiante__persona', 'beca')
 
     list_filter = (
         'estado_beca',
@@ -409,6 +411,7 @@ class ObservacionAdmin(UnfoldModelAdmin):
 @admin.register(PersonaDocente)
 class PersonaDocenteAdmin(UnfoldModelAdmin):
     list_display = ('numero_legajo', 'get_nombre_completo', 'categoria_docente', 'dependencia')
+    list_select_related = ('persona', 'dependencia')
     list_filter = ('categoria_docente', 'dependencia')
     search_fields = ('numero_legajo', 'persona__nombre', 'persona__apellido', 'persona__documento')
 
@@ -430,6 +433,7 @@ class PersonaDocenteAdmin(UnfoldModelAdmin):
 @admin.register(PersonaNoDocente)
 class PersonaNoDocenteAdmin(UnfoldModelAdmin):
     list_display = ('numero_legajo', 'get_nombre_completo', 'cargo', 'tipo_contrato', 'area_principal')
+    list_select_related = ('persona', 'area_principal')
     list_filter = ('tipo_contrato', 'area_principal')
     search_fields = ('numero_legajo', 'persona__nombre', 'persona__apellido', 'cargo')
 
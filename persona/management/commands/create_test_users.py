@@ -1,6 +1,8 @@
 # persona/management/commands/create_test_users.py
 
-from django.core.management.base import BaseCommand
+import time
+
+from django.core.management.base import BaseCommand, CommandError
 from django.contrib.auth import get_user_model
 from django.db import models
 from persona.models import (
@@ -14,6 +16,7 @@ from comedor.models import (
 from datetime import date, timedelta
 from django.core.files.base import ContentFile
 from decimal import Decimal
+from persona import poblacion
 
 User = get_user_model()
 
@@ -27,9 +30,24 @@ class Command(BaseCommand):
             action='store_true',
             help='Elimina los usuarios de prueba existentes antes de crearlos',
         )
+        parser.add_argument(
+            '--scale',
+            type=int,
+            default=0,
+            help='Genera además N personas sintéticas con inserts masivos (ej. 200000)',
+        )
+        parser.add_argument('--seed', type=int, default=42, help='Semilla de la población sintética')
+        parser.add_argument('--lote', type=int, default=2000, help='Personas por transacción con --scale')
+        parser.add_argument('--dias', type=int, default=120, help='Días de historia de tickets con --scale')
 
     def handle(self, *args, **kwargs):
         clean = kwargs.get('clean', False)
+        escala = kwargs.get('scale', 0)
+
+        if clean and escala:
+            self.stdout.write(self.style.WARNING('Eliminando población sintética...'))
+            borrados = poblacion.eliminar_poblacion()
+            self.stdout.write(self.style.SUCCESS(f'  ✓ {borrados} registros eliminados'))
 
         if clean:
             self.stdout.write(self.style.WARNING('Eliminando usuarios de prueba existentes...'))
@@ -247,6 +265,9 @@ class Command(BaseCommand):
             )
             self.stdout.write(f'  ✓ Beneficio: {benef_data["tipo"]}')
 
+        if escala:
+            self.crear_poblacion(escala, kwargs['seed'], kwargs['lote'], kwargs['dias'])
+
         # ==================== USUARIOS ====================
         self.stdout.write(self.style.SUCCESS('\nCreando usuarios de prueba...'))
 
@@ -725,4 +746,21 @@ class Command(BaseCommand):
 
         self.stdout.write(self.style.SUCCESS('\n' + '=' * 70))
         self.stdout.write(self.style.SUCCESS('✅ Proceso completado exitosamente'))
-        self.stdout.write(self.style.SUCCESS('=' * 70))
\ No newline at end of file
+        self.stdout.write(self.style.SUCCESS('=' * 70))
+
+    def crear_poblacion(self, escala, semilla, lote, dias):
+        generador = poblacion.GeneradorPoblacion(
+            escala, semilla=semilla, lote=lote, dias=dias, salida=self.stdout.write,
+        )
+        if generador.existe():
+            raise CommandError('Ya existe una población sintética: usar --clean para regenerarla')
+
+        self.stdout.write(self.style.SUCCESS(f'\nGenerando {escala} personas sintéticas (semilla {semilla})...'))
+        inicio = time.monotonic()
+        totales = generador.ejecutar()
+        for nombre, cantidad in totales.items():
+            self.stdout.write(f'  • {nombre}: {cantidad}')
+        self.stdout.write(self.style.SUCCESS(
+            f'  ✓ Población generada en {time.monotonic() - inicio:.0f}s '
+            f'(usuarios sint0000000.. / {poblacion.CONTRASENA})'
+        ))
@@ -0,0 +1,492 @@
+"""
+Población sintética a gran escala para pruebas de rendimiento
+(``create_test_users --scale N``).
+
+Todo se inserta con ``bulk_create`` por bloques de personas, sin pasar por
+``save()`` ni por las señales de ``accounts.models`` (perfil y persona
+automáticos) ni de ``persona.signals``: el generador crea explícitamente lo
+que esas señales crearían. Con la misma semilla se obtiene la misma población.
+
+Los usuarios sintéticos comparten una contraseña (un único hash calculado de
+antemano) y se identifican por el dominio ``DOMINIO`` del correo.
+"""
+import random
+import uuid
+from contextlib import contextmanager
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.db.models import IntegerField, Max
+from django.db.models.functions import Cast, Substr
+from django.utils import timezone
+
+from accounts.models import UserProfile
+from comedor.models import BeneficioComedor, CertificadoCeliaco, CompraTickets, Ticket, TipoMenu
+from persona.models import (
+    Area, Beca, Carrera, Dependencia, Observacion, Persona, PersonaBeca, PersonaDocente,
+    PersonaEgresado, PersonaEstudiante, PersonaIngresante, PersonaNoDocente,
+)
+from rendimiento import cache
+from salud.models import (
+    AtencionSalud, CoberturaSalud, PagoSalud, PlanSalud, PrestadorSalud, TurnoSalud,
+)
+
+User = get_user_model()
+
+DOMINIO = 'sintetico.comedor.uncu.edu.ar'
+CONTRASENA = 'sintetico123'
+DOCUMENTO_BASE = 50_000_000
+
+ROLES = [('estudiante', 70), ('ingresante', 8), ('egresado', 5), ('docente', 10), ('no_docente', 7)]
+SEDES = [('central', 75), ('san_rafael', 15), ('lujan_de_cuyo', 10)]
+PREFERENCIAS = [('comun', 70), ('vegetariano', 20), ('celiaco_comun', 6), ('celiaco_vegetariano', 4)]
+GENEROS = [('femenino', 48), ('masculino', 46), ('no_binario', 2), ('prefiero_no_decir', 4)]
+
+NOMBRES = ['Juan', 'María', 'Lucas', 'Ana', 'Sofía', 'Mateo', 'Valentina', 'Tomás', 'Camila', 'Martín',
+           'Lucía', 'Joaquín', 'Julieta', 'Agustín', 'Martina', 'Facundo', 'Florencia', 'Nicolás']
+APELLIDOS = ['González', 'Rodríguez', 'Gómez', 'Fernández', 'López', 'Díaz', 'Martínez', 'Pérez',
+             'García', 'Sánchez', 'Romero', 'Sosa', 'Torres', 'Álvarez', 'Ruiz', 'Ramírez', 'Flores']
+ESPECIALIDADES = ['Clínica Médica', 'Odontología', 'Oftalmología', 'Psicología', 'Nutrición']
+
+
+def _elegir(rnd, pesos):
+    return rnd.choices([valor for valor, _ in pesos], weights=[peso for _, peso in pesos])[0]
+
+
+@contextmanager
+def _sin_auto_now(*campos):
+    """Permite fijar fechas históricas en campos ``auto_now_add``/``auto_now`` durante el bulk"""
+    previos = [(campo, campo.auto_now, campo.auto_now_add) for campo in campos]
+    for campo in campos:
+        campo.auto_now = campo.auto_now_add = False
+    try:
+        yield
+    finally:
+        for campo, auto_now, auto_now_add in previos:
+            campo.auto_now, campo.auto_now_add = auto_now, auto_now_add
+
+
+def _campo(modelo, nombre):
+    return modelo._meta.get_field(nombre)
+
+
+COLUMNAS_TICKET = [
+    'usuario', 'tipo_menu', 'codigo', 'numero_ticket', 'estado', 'precio_base', 'descuento_aplicado',
+    'precio_pagado', 'beneficio_aplicado', 'beca_utilizada', 'fecha_compra', 'fecha_uso',
+    'fecha_valido_hasta', 'requiere_menu_celiaco', 'compra',
+]
+
+
+def _insertar(modelo, campos, filas, lote):
+    """INSERT con ``executemany`` de filas ya adaptadas a la base, en el orden de ``campos``"""
+    quote = connection.ops.quote_name
+    columnas = ', '.join(quote(_campo(modelo, campo).column) for campo in campos)
+    sql = (
+        f'INSERT INTO {quote(modelo._meta.db_table)} ({columnas}) '
+        f'VALUES ({", ".join(["%s"] * len(campos))})'
+    )
+    with connection.cursor() as cursor:
+        for inicio in range(0, len(filas), lote):
+            cursor.executemany(sql, filas[inicio:inicio + lote])
+
+
+class GeneradorPoblacion:
+    def __init__(self, cantidad, semilla=42, lote=2000, dias=120, tickets_por_semana=1, salida=None):
+        self.cantidad = cantidad
+        self.semilla = semilla
+        self.lote = lote
+        self.dias = dias
+        self.tickets_por_semana = tickets_por_semana
+        self.salida = salida or (lambda mensaje: None)
+        self.hoy = date.today()
+        self.totales = {}
+
+    def existe(self):
+        return Persona.objects.filter(correo__endswith=f'@{DOMINIO}').exists()
+
+    def _contar(self, nombre, cantidad):
+        self.totales[nombre] = self.totales.get(nombre, 0) + cantidad
+
+    def _catalogos(self):
+        self.carreras = list(Carrera.objects.select_related('dependencia'))
+        self.dependencias = list(Dependencia.objects.all())
+        self.areas = list(Area.objects.all())
+        if not (self.carreras and self.dependencias and self.areas):
+            raise ValueError('Faltan dependencias, carreras o áreas: crear primero la estructura base')
+
+        self.menus = {menu.tipo: menu for menu in TipoMenu.objects.filter(activo=True)}
+        self.becas = list(Beca.objects.filter(activa=True, permite_comedor=True))
+        self.beneficios = {b.tipo_beca_id: b for b in BeneficioComedor.objects.filter(activo=True)}
+
+        prestadores = []
+        for codigo, nombre in [('OSEP', 'Obra Social de Empleados Públicos'), ('DAMSU', 'DAMSU')]:
+            prestador, _ = PrestadorSalud.objects.get_or_create(codigo=codigo, defaults={'nombre': nombre})
+            prestadores.append(prestador)
+        self.planes = []
+        for prestador in prestadores:
+            plan, _ = PlanSalud.objects.get_or_create(
+                nombre='Plan Estudiantil',
+                prestador=prestador,
+                defaults={'precio_mensual': Decimal('8000.00'), 'precio_anual': Decimal('90000.00')},
+            )
+            self.planes.append(plan)
+
+        # Con borrados, count() repetiría números ya usados
+        ultimo = (
+            Ticket.objects
+            .filter(numero_ticket__startswith='TCK-')
+            .aggregate(ultimo=Max(Cast(Substr('numero_ticket', 5), IntegerField())))['ultimo']
+        )
+        self.numero_ticket = (ultimo or 0) + 1
+
+    def ejecutar(self):
+        self._catalogos()
+        self.hash_contrasena = make_password(CONTRASENA)
+
+        for inicio in range(0, self.cantidad, self.lote):
+            fin = min(inicio + self.lote, self.cantidad)
+            # Semilla por bloque: el resultado no depende del tamaño de los bloques anteriores
+            rnd = random.Random(f'{self.semilla}:{inicio}')
+            with transaction.atomic():
+                self._bloque(rnd, inicio, fin)
+            self.salida(f'  ✓ {fin}/{self.cantidad} personas')
+        # bulk_create no emite post_save: las becas nuevas no invalidan la caché solas
+        cache.invalidar('persona.elegibilidad')
+        return self.totales
+
+    def _bloque(self, rnd, inicio, fin):
+        ahora = timezone.now()
+        usuarios = []
+        personas = []
+        for i in range(inicio, fin):
+            nombre, apellido = rnd.choice(NOMBRES), rnd.choice(APELLIDOS)
+            usuarios.append(User(
+                username=f'sint{i:07d}',
+                email=f'sint{i:07d}@{DOMINIO}',
+                first_name=nombre,
+                last_name=apellido,
+                password=self.hash_contrasena,
+                date_joined=ahora,
+            ))
+            personas.append(Persona(
+                nombre=nombre,
+                apellido=apellido,
+                documento=str(DOCUMENTO_BASE + i),
+                genero=_elegir(rnd, GENEROS),
+                nacionalidad='Argentina',
+                sede=_elegir(rnd, SEDES),
+                correo=f'sint{i:07d}@{DOMINIO}',
+                rol=_elegir(rnd, ROLES),
+            ))
+
+        User.objects.bulk_create(usuarios, batch_size=self.lote)
+        UserProfile.objects.bulk_create([UserProfile(user=u) for u in usuarios], batch_size=self.lote)
+        for usuario, persona in zip(usuarios, personas):
+            persona.usuario = usuario
+        Persona.objects.bulk_create(personas, batch_size=self.lote)
+        self._contar('usuarios', len(usuarios))
+        self._contar('personas', len(personas))
+
+        estudiantes = self._roles(rnd, personas, inicio)
+        becas = self._becas(rnd, estudiantes)
+        self._tickets(rnd, personas, estudiantes, becas)
+        self._observaciones(rnd, personas, usuarios)
+        self._salud(rnd, personas)
+
+    def _roles(self, rnd, personas, inicio):
+        estudiantes, ingresantes, egresados, docentes, no_docentes, certificados = [], [], [], [], [], []
+        for n, persona in enumerate(personas, start=inicio):
+            if persona.rol == 'estudiante':
+                carrera = rnd.choice(self.carreras)
+                estudiantes.append(PersonaEstudiante(
+                    persona=persona,
+                    dependencia=carrera.dependencia,
+                    carrera=carrera,
+                    anio_ingreso=rnd.randint(self.hoy.year - 7, self.hoy.year),
+                    numero_legajo=f'S{n:07d}',
+                    estado_academico=rnd.choices(['R', 'C', 'L'], weights=[85, 10, 5])[0],
+                    preferencia_menu=_elegir(rnd, PREFERENCIAS),
+                ))
+            elif persona.rol == 'ingresante':
+                ingresantes.append(PersonaIngresante(
+                    persona=persona, fecha_vencimiento=self.hoy + timedelta(days=rnd.randint(30, 240)),
+                ))
+            elif persona.rol == 'egresado':
+                egresados.append(PersonaEgresado(persona=persona))
+            elif persona.rol == 'docente':
+                docentes.append(PersonaDocente(
+                    persona=persona,
+                    numero_legajo=f'D{n:07d}',
+                    categoria_docente=rnd.choice(['TITULAR', 'ASOCIADO', 'ADJUNTO', 'JTP', 'AYUDANTE_1']),
+                    fecha_ingreso_docencia=self.hoy - timedelta(days=rnd.randint(365, 365 * 30)),
+                    dependencia=rnd.choice(self.dependencias),
+                ))
+            elif persona.rol == 'no_docente':
+                ingreso = self.hoy - timedelta(days=rnd.randint(365, 365 * 25))
+                no_docentes.append(PersonaNoDocente(
+                    persona=persona,
+                    numero_legajo=f'N{n:07d}',
+                    cargo=rnd.choice(['Administrativo', 'Técnico', 'Bibliotecario', 'Mantenimiento']),
+                    fecha_ingreso_laboral=ingreso,
+                    fecha_finalizacion_laboral=ingreso + timedelta(days=365 * 35),
+                    tipo_contrato=rnd.choice(['PLANTA_PERMANENTE', 'CONTRATADO', 'BECARIO']),
+                    area_principal=rnd.choice(self.areas),
+                ))
+
+        PersonaEstudiante.objects.bulk_create(estudiantes, batch_size=self.lote)
+        PersonaIngresante.objects.bulk_create(ingresantes, batch_size=self.lote)
+        PersonaEgresado.objects.bulk_create(egresados, batch_size=self.lote)
+        PersonaDocente.objects.bulk_create(docentes, batch_size=self.lote)
+        PersonaNoDocente.objects.bulk_create(no_docentes, batch_size=self.lote)
+
+        for estudiante in estudiantes:
+            if estudiante.preferencia_menu.startswith('celiaco'):
+                certificados.append(CertificadoCeliaco(
+                    persona=estudiante.persona,
+                    archivo_certificado='comedor/certificados_celiacos/sintetico.pdf',
+                    fecha_emision=self.hoy - timedelta(days=rnd.randint(30, 400)),
+                    fecha_vencimiento=self.hoy + timedelta(days=rnd.randint(-60, 365)),
+                    activo=True,
+                ))
+        CertificadoCeliaco.objects.bulk_create(certificados, batch_size=self.lote)
+
+        self._contar('estudiantes', len(estudiantes))
+        self._contar('ingresantes', len(ingresantes))
+        self._contar('egresados', len(egresados))
+        self._contar('docentes', len(docentes))
+        self._contar('no_docentes', len(no_docentes))
+        self._contar('certificados_celiacos', len(certificados))
+        return estudiantes
+
+    def _becas(self, rnd, estudiantes):
+        """Becas de ~30% de los estudiantes; algunas con períodos superpuestos"""
+        becas = []
+        if not self.becas:
+            return {}
+        for estudiante in estudiantes:
+            if rnd.random() >= 0.3:
+                continue
+            inicio = self.hoy - timedelta(days=rnd.randint(0, self.dias + 180))
+            periodos = [(rnd.choice(self.becas), inicio)]
+            if rnd.random() < 0.2:
+                # Segunda beca que se superpone con la primera
+                periodos.append((rnd.choice(self.becas), inicio + timedelta(days=rnd.randint(30, 150))))
+            for beca, desde in periodos:
+                hasta = desde + timedelta(days=rnd.choice([180, 365]))
+                estado = 'ACTIVA' if hasta >= self.hoy else 'VENCIDA'
+                becas.append(PersonaBeca(
+                    persona_estudiante=estudiante,
+                    beca=beca,
+                    fecha_inicio=desde,
+                    fecha_fin=hasta,
+                    estado_beca=rnd.choices([estado, 'SUSPENDIDA'], weights=[95, 5])[0],
+                    fecha_aprobacion=timezone.make_aware(datetime.combine(desde, time(10))),
+                    monto_asignado=beca.monto_sugerido if beca.tiene_monto else None,
+                ))
+        PersonaBeca.objects.bulk_create(becas, batch_size=self.lote)
+        self._contar('becas', len(becas))
+
+        por_estudiante = {}
+        for beca in becas:
+            por_estudiante.setdefault(beca.persona_estudiante_id, []).append(beca)
+        return por_estudiante
+
+    def _tickets(self, rnd, personas, estudiantes, becas):
+        """
+        Compras con ``bulk_create`` (hacen falta sus ids) y tickets como filas
+        planas con ``executemany``: son la tabla más grande y construir una
+        instancia de ``Ticket`` por fila es lo que más tiempo llevaba.
+        """
+        ops = connection.ops
+        preferencias = {e.persona_id: e.preferencia_menu for e in estudiantes}
+        estudiante_de = {e.persona_id: e.pk for e in estudiantes}
+        semanas = max(self.dias / 7, 1)
+
+        compras, filas_por_compra = [], []
+        for persona in personas:
+            if persona.rol not in ('estudiante', 'ingresante', 'docente', 'no_docente'):
+                continue
+            frecuencia = self.tickets_por_semana if persona.rol == 'estudiante' else self.tickets_por_semana / 3
+            menu = self.menus.get(preferencias.get(persona.pk, 'comun')) or self.menus.get('comun')
+            if menu is None:
+                continue
+            becas_persona = becas.get(estudiante_de.get(persona.pk), [])
+
+            # Compras de 1 a 5 tickets (3 en promedio) distribuidas en la ventana de días
+            for _ in range(int(rnd.expovariate(3 / (frecuencia * semanas)))):
+                dia = self.hoy - timedelta(days=rnd.randint(0, self.dias))
+                momento = timezone.make_aware(datetime.combine(dia, time(rnd.randint(8, 14), rnd.randint(0, 59))))
+                vigente = next(
+                    (b for b in becas_persona
+                     if b.estado_beca == 'ACTIVA' and b.fecha_inicio <= dia <= b.fecha_fin),
+                    None,
+                )
+                beneficio = self.beneficios.get(vigente.beca_id) if vigente else None
+                precio = beneficio.calcular_precio_final(menu.precio) if beneficio else menu.precio
+                cantidad = 1 if beneficio else rnd.randint(1, 5)
+
+                filas = []
+                for _ in range(cantidad):
+                    valido_hasta = dia + timedelta(days=rnd.randint(0, 7))
+                    usado = valido_hasta < self.hoy or rnd.random() < 0.5
+                    uso = momento + timedelta(days=(valido_hasta - dia).days, hours=1) if usado else None
+                    filas.append([
+                        persona.usuario_id,
+                        menu.pk,
+                        str(uuid.UUID(int=rnd.getrandbits(128), version=4)),
+                        f'TCK-{self.numero_ticket:06d}',
+                        'usado' if usado else rnd.choices(['pagado', 'pendiente'], weights=[90, 10])[0],
+                        ops.adapt_decimalfield_value(menu.precio, 10, 2),
+                        ops.adapt_decimalfield_value(menu.precio - precio, 10, 2),
+                        ops.adapt_decimalfield_value(precio, 10, 2),
+                        beneficio.pk if beneficio else None,
+                        vigente.pk if beneficio else None,
+                        ops.adapt_datetimefield_value(momento),
+                        ops.adapt_datetimefield_value(uso),
+                        ops.adapt_datefield_value(valido_hasta),
+                        menu.tipo.startswith('celiaco'),
+                    ])
+                    self.numero_ticket += 1
+
+                compras.append(CompraTickets(
+                    usuario_id=persona.usuario_id,
+                    fecha_compra=momento,
+                    cantidad_tickets=cantidad,
+                    subtotal=menu.precio * cantidad,
+                    total_descuentos=(menu.precio - precio) * cantidad,
+                    total_pagado=precio * cantidad,
+                    metodo_pago='beca' if beneficio else rnd.choice(['efectivo', 'tarjeta', 'transferencia']),
+                    tickets_con_beneficio=cantidad if beneficio else 0,
+                ))
+                filas_por_compra.append(filas)
+
+        with _sin_auto_now(_campo(CompraTickets, 'fecha_compra')):
+            CompraTickets.objects.bulk_create(compras, batch_size=self.lote)
+
+        filas = []
+        for compra, filas_compra in zip(compras, filas_por_compra):
+            for fila in filas_compra:
+                fila.append(compra.pk)
+            filas.extend(filas_compra)
+        _insertar(Ticket, COLUMNAS_TICKET, filas, self.lote)
+
+        self._contar('compras', len(compras))
+        self._contar('tickets', len(filas))
+
+    def _observaciones(self, rnd, personas, usuarios):
+        observaciones = []
+        for persona, usuario in zip(personas, usuarios):
+            for _ in range(rnd.choices([0, 1, 2, 3], weights=[85, 10, 4, 1])[0]):
+                observaciones.append(Observacion(
+                    persona=persona,
+                    observacion=rnd.choice([
+                        'Documentación revisada.',
+                        'Cambio de preferencia de menú.',
+                        'Se solicitó certificado de alumno regular actualizado.',
+                    ]),
+                    usuario=usuario,
+                    fecha=timezone.make_aware(datetime.combine(
+                        self.hoy - timedelta(days=rnd.randint(0, self.dias)), time(11),
+                    )),
+                ))
+        with _sin_auto_now(_campo(Observacion, 'fecha')):
+            Observacion.objects.bulk_create(observaciones, batch_size=self.lote)
+        self._contar('observaciones', len(observaciones))
+
+    def _salud(self, rnd, personas):
+        coberturas = []
+        for persona in personas:
+            if rnd.random() < 0.4:
+                coberturas.append(CoberturaSalud(
+                    persona=persona,
+                    plan=rnd.choice(self.planes),
+                    fecha_inicio=self.hoy - timedelta(days=rnd.randint(30, 720)),
+                    fecha_fin=rnd.choice([None, None, self.hoy + timedelta(days=rnd.randint(-90, 365))]),
+                    activa=rnd.random() < 0.9,
+                    numero_afiliado_externo=f'{rnd.randint(10 ** 7, 10 ** 8 - 1)}',
+                ))
+        CoberturaSalud.objects.bulk_create(coberturas, batch_size=self.lote)
+
+        pagos, turnos, atenciones = [], [], []
+        for cobertura in coberturas:
+            for mes in range(rnd.randint(1, 6)):
+                creado = self.hoy - timedelta(days=30 * mes)
+                pagado = mes > 0 or rnd.random() < 0.7
+                pagos.append(PagoSalud(
+                    cobertura=cobertura,
+                    monto=cobertura.plan.precio_mensual,
+                    tipo='mensual',
+                    estado='pagado' if pagado else 'pendiente',
+                    referencia_pago=f'PS-{cobertura.persona.documento}-{creado:%Y%m}',
+                    fecha_creacion=timezone.make_aware(datetime.combine(creado, time(9))),
+                    fecha_pago=timezone.make_aware(datetime.combine(creado, time(15))) if pagado else None,
+                ))
+            for n in range(rnd.choices([0, 1, 2, 3], weights=[50, 30, 15, 5])[0]):
+                dia = self.hoy + timedelta(days=rnd.randint(-90, 60))
+                turno = TurnoSalud(
+                    persona=cobertura.persona,
+                    prestador=cobertura.plan.prestador,
+                    cobertura=cobertura,
+                    fecha_hora=timezone.make_aware(datetime.combine(dia, time(rnd.randint(8, 18), 0))),
+                    especialidad=rnd.choice(ESPECIALIDADES),
+                    estado='atendido' if dia < self.hoy else 'confirmado',
+                    fuente='manual',
+                    id_externo=f'S-{cobertura.persona.documento}-{n}',
+                )
+                turnos.append(turno)
+
+        with _sin_auto_now(_campo(PagoSalud, 'fecha_creacion')):
+            PagoSalud.objects.bulk_create(pagos, batch_size=self.lote)
+        TurnoSalud.objects.bulk_create(turnos, batch_size=self.lote)
+
+        for turno in turnos:
+            if turno.estado == 'atendido':
+                atenciones.append(AtencionSalud(
+                    persona=turno.persona,
+                    prestador=turno.prestador,
+                    cobertura=turno.cobertura,
+                    turno=turno,
+                    fecha=turno.fecha_hora.date(),
+                    especialidad=turno.especialidad,
+                    diagnostico='Control sin particularidades',
+                    fuente='manual',
+                    id_externo=f'A-{turno.id_externo}',
+                ))
+        AtencionSalud.objects.bulk_create(atenciones, batch_size=self.lote)
+
+        self._contar('coberturas_salud', len(coberturas))
+        self._contar('pagos_salud', len(pagos))
+        self._contar('turnos_salud', len(turnos))
+        self._contar('atenciones_salud', len(atenciones))
+
+
+def eliminar_poblacion():
+    """Borra la población sintética, de las hojas hacia arriba para que cada borrado sea un DELETE directo"""
+    personas = Persona.objects.filter(correo__endswith=f'@{DOMINIO}')
+    usuarios = User.objects.filter(email__endswith=f'@{DOMINIO}')
+    consultas = [
+        AtencionSalud.objects.filter(persona__in=personas),
+        TurnoSalud.objects.filter(persona__in=personas),
+        PagoSalud.objects.filter(cobertura__persona__in=personas),
+        CoberturaSalud.objects.filter(persona__in=personas),
+        Ticket.objects.filter(usuario__in=usuarios),
+        CompraTickets.objects.filter(usuario__in=usuarios),
+        Observacion.objects.filter(persona__in=personas),
+        CertificadoCeliaco.objects.filter(persona__in=personas),
+        PersonaBeca.objects.filter(persona_estudiante__persona__in=personas),
+        PersonaEstudiante.objects.filter(persona__in=personas),
+        PersonaIngresante.objects.filter(persona__in=personas),
+        PersonaEgresado.objects.filter(persona__in=personas),
+        PersonaDocente.objects.filter(persona__in=personas),
+        PersonaNoDocente.objects.filter(persona__in=personas),
+        personas,
+        UserProfile.objects.filter(user__in=usuarios),
+        usuarios,
+    ]
+    borrados = 0
+    for consulta in consultas:
+        borrados += consulta.delete()[0]
+    return borrados
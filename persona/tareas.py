@@ -0,0 +1,24 @@
+from django.db.models import Q
+from django.utils import timezone
+
+from rendimiento import cache
+from tareas.periodicas import periodica
+
+from .models import PersonaBeca
+
+
+@periodica('10 0 * * *')
+def actualizar_estado_becas():
+    """Activa las becas aprobadas que ya empezaron y vence las que terminaron"""
+    hoy = timezone.now().date()
+    vencidas = PersonaBeca.objects.filter(
+        estado_beca__in=['APROBADA', 'ACTIVA'], fecha_fin__lt=hoy,
+    ).update(estado_beca='VENCIDA')
+    activadas = PersonaBeca.objects.filter(
+        estado_beca='APROBADA', fecha_inicio__lte=hoy,
+    ).filter(Q(fecha_fin__isnull=True) | Q(fecha_fin__gte=hoy)).update(estado_beca='ACTIVA')
+
+    # update() no dispara las señales que invalidan la caché
+    if vencidas or activadas:
+        cache.invalidar('persona.elegibilidad')
+    return {'vencidas': vencidas, 'activadas': activadas}
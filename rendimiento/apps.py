@@ -0,0 +1,13 @@
+from django.apps import AppConfig
+
+
+class RendimientoConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'rendimiento'
+
+    def ready(self):
+        from .medicion import instrumentar_templates
+        from .signals import instrumentar_qr
+
+        instrumentar_templates()
+        instrumentar_qr()
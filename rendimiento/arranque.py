@@ -0,0 +1,91 @@
+"""
+Perfil del arranque de un proceso con ``python -X importtime``.
+
+Cada corrida es un intérprete nuevo, como un proceso de mod_wsgi reciclado
+o un comando de cron. El objetivo ``wsgi`` carga Django, las apps y el
+URLconf, que es lo que paga un worker antes de su primer request. También
+se puede perfilar un comando de ``manage.py``. Se informa la mediana del
+tiempo total de las corridas y, de la última, el tiempo de import por
+módulo y por paquete de primer nivel.
+"""
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+
+from django.conf import settings
+
+OBJETIVOS = {
+    'setup': 'import django; django.setup()',
+    'wsgi': (
+        'import django; django.setup(); '
+        'from django.urls import get_resolver; get_resolver().url_patterns'
+    ),
+}
+
+_LINEA = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def parsear(salida):
+    """[(módulo, propio_ms, acumulado_ms)] de la salida de ``-X importtime``"""
+    modulos = []
+    for linea in salida.splitlines():
+        encontrado = _LINEA.match(linea)
+        if encontrado:
+            propio, acumulado, _, nombre = encontrado.groups()
+            modulos.append((nombre, int(propio) / 1000, int(acumulado) / 1000))
+    return modulos
+
+
+def por_paquete(modulos):
+    paquetes = Counter()
+    for nombre, propio, _ in modulos:
+        paquetes[nombre.split('.')[0]] += propio
+    return paquetes
+
+
+def _argumentos(objetivo, comando):
+    if comando:
+        return [sys.executable, '-X', 'importtime', 'manage.py', *comando]
+    return [sys.executable, '-X', 'importtime', '-c', OBJETIVOS[objetivo]]
+
+
+def perfilar(objetivo='wsgi', comando=None, repeticiones=5):
+    argumentos = _argumentos(objetivo, comando)
+    entorno = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'src.settings')}
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        proceso = subprocess.run(
+            argumentos, cwd=settings.BASE_DIR, env=entorno, capture_output=True, text=True,
+        )
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+        if proceso.returncode:
+            raise RuntimeError(f'{" ".join(argumentos[3:])} terminó con código {proceso.returncode}:\n{proceso.stderr[-2000:]}')
+
+    modulos = parsear(proceso.stderr)
+    return {
+        'objetivo': ' '.join(comando) if comando else objetivo,
+        'total_ms': round(statistics.median(tiempos), 1),
+        'imports_ms': round(sum(propio for _, propio, _ in modulos), 1),
+        'modulos': len(modulos),
+        'paquetes': {nombre: round(ms, 2) for nombre, ms in por_paquete(modulos).most_common()},
+        'lentos': [
+            {'modulo': nombre, 'propio_ms': round(propio, 2), 'acumulado_ms': round(acumulado, 2)}
+            for nombre, propio, acumulado in sorted(modulos, key=lambda m: m[2], reverse=True)[:50]
+        ],
+    }
+
+
+def guardar(ruta, perfil):
+    with open(ruta, 'w', encoding='utf-8') as archivo:
+        json.dump(perfil, archivo, indent=2, ensure_ascii=False)
+
+
+def leer(ruta):
+    with open(ruta, encoding='utf-8') as archivo:
+        return json.load(archivo)
@@ -0,0 +1,227 @@
+"""
+Benchmark de todas las rutas del proyecto con el cliente de pruebas de Django.
+
+Cada ruta se pide con GET como el rol que le corresponde: el de los decoradores
+de ``comedor.decorators`` (``rol_requerido``), estudiante si la vista pide
+login y anónimo si no. Por ruta se mide latencia (p50/p95), cantidad de
+consultas y memoria asignada (con ``tracemalloc``, en una pasada aparte para
+no inflar los tiempos), y se compara contra una línea base en JSON.
+"""
+import json
+import math
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Count
+from django.shortcuts import resolve_url
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+
+User = get_user_model()
+
+APPS = ('accounts', 'comedor', 'persona', 'salud', 'rendimiento')
+ROLES = ('estudiante', 'admin_comedor', 'auditor', 'anonimo')
+# Vistas que modifican datos con GET o cierran la sesión
+EXCLUIDAS = ('toggle', 'logout')
+
+
+def _valor_por_defecto(modelo, **filtros):
+    return modelo.objects.filter(**filtros).order_by('pk').values_list('pk', flat=True).first()
+
+
+def _parametros(nombre, argumento, usuarios):
+    """Valor de ejemplo para un argumento de la URL, o None si no hay datos"""
+    from comedor.models import BeneficioComedor, ImagenCarrusel, Ticket, TipoMenu
+    from persona.models import Beca, Persona, PersonaBeca, PersonaEstudiante
+    from salud.calendario import token_calendario
+    from salud.models import PrestadorSalud, TurnoSalud
+
+    if argumento == 'ticket_id':
+        return _valor_por_defecto(Ticket, usuario=usuarios['estudiante'])
+    if argumento == 'persona_id':
+        return _valor_por_defecto(Persona, observacion__isnull=False) or _valor_por_defecto(Persona)
+    if argumento == 'estudiante_id':
+        return _valor_por_defecto(PersonaEstudiante, becas__isnull=False)
+    if argumento == 'beca_id':
+        return _valor_por_defecto(PersonaBeca)
+    if argumento == 'username':
+        return usuarios['estudiante'].username
+    if argumento == 'token':
+        if nombre == 'calendario_prestador':
+            pk = _valor_por_defecto(PrestadorSalud, turnos__isnull=False)
+            return token_calendario('prestador', pk) if pk else None
+        pk = TurnoSalud.objects.order_by('pk').values_list('persona_id', flat=True).first()
+        return token_calendario('persona', pk) if pk else None
+    if argumento == 'pk':
+        for prefijo, modelo in [
+            ('imagen', ImagenCarrusel), ('menu', TipoMenu), ('beneficio', BeneficioComedor), ('beca', Beca),
+        ]:
+            if prefijo in nombre:
+                return _valor_por_defecto(modelo)
+    return None
+
+
+def rutas(apps=APPS):
+    """(nombre, patrón) de las rutas con nombre de las apps del proyecto"""
+    encontradas = []
+
+    def recorrer(resolver, espacio=None):
+        for patron in resolver.url_patterns:
+            if isinstance(patron, URLResolver):
+                nombre = ':'.join(n for n in [espacio, patron.namespace] if n) or None
+                recorrer(patron, nombre)
+            elif isinstance(patron, URLPattern) and patron.name:
+                modulo = patron.callback.__module__.split('.')[0]
+                if modulo in apps:
+                    nombre = f'{espacio}:{patron.name}' if espacio else patron.name
+                    encontradas.append((nombre, patron))
+
+    recorrer(get_resolver())
+    return encontradas
+
+
+def usuario_para(rol):
+    """Usuario existente con el rol (para estudiante, el que más tickets tiene); si no hay, se crea uno"""
+    if rol == 'estudiante':
+        usuario = (
+            User.objects.filter(persona__rol='estudiante', persona__estudiante__isnull=False)
+            .annotate(cantidad=Count('tickets_comedor'))
+            .order_by('-cantidad', 'pk')
+            .first()
+        )
+    else:
+        usuario = User.objects.filter(persona__rol=rol, is_active=True).order_by('pk').first()
+    if usuario:
+        return usuario
+
+    # La señal de accounts crea la Persona; sólo falta asignarle el rol
+    usuario = User.objects.create_user(f'benchmark_{rol}', f'benchmark_{rol}@example.com')
+    usuario.persona.rol = rol
+    usuario.persona.save(update_fields=['rol'])
+    return usuario
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[max(math.ceil(p * len(ordenados)) - 1, 0)]
+
+
+class Benchmark:
+    def __init__(self, repeticiones=20, filtro=None, salida=None):
+        self.repeticiones = repeticiones
+        self.filtro = filtro
+        self.salida = salida or (lambda mensaje: None)
+        self.omitidas = {}
+
+    def clientes(self):
+        usuarios = {rol: usuario_para(rol) for rol in ROLES if rol != 'anonimo'}
+        clientes = {'anonimo': Client(raise_request_exception=False, HTTP_HOST=self._host())}
+        for rol, usuario in usuarios.items():
+            cliente = Client(raise_request_exception=False, HTTP_HOST=self._host())
+            cliente.force_login(usuario)
+            clientes[rol] = cliente
+        return usuarios, clientes
+
+    def _host(self):
+        hosts = [h for h in settings.ALLOWED_HOSTS if h != '*' and not h.startswith('.')]
+        return hosts[0] if hosts else 'localhost'
+
+    def _rol(self, patron, url, clientes):
+        rol = getattr(patron.callback, 'rol_requerido', None)
+        if rol:
+            return rol
+        respuesta = clientes['anonimo'].get(url)
+        if respuesta.status_code == 302 and respuesta.url.startswith(resolve_url(settings.LOGIN_URL)):
+            return 'estudiante'
+        return 'anonimo'
+
+    def _url(self, nombre, patron, usuarios):
+        argumentos = {}
+        for argumento in patron.pattern.regex.groupindex:
+            valor = _parametros(nombre.split(':')[-1], argumento, usuarios)
+            if valor is None:
+                return None
+            argumentos[argumento] = valor
+        return reverse(nombre, kwargs=argumentos)
+
+    def medir(self, cliente, url):
+        cliente.get(url)  # calentamiento: caché de templates, conexiones, imports
+        tiempos = []
+        with CaptureQueriesContext(connection) as capturadas:
+            for _ in range(self.repeticiones):
+                inicio = time.perf_counter()
+                respuesta = cliente.get(url)
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+        consultas = len(capturadas) / self.repeticiones
+
+        tracemalloc.start()
+        try:
+            cliente.get(url)
+            _, pico = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'estado': respuesta.status_code,
+            'p50_ms': round(_percentil(tiempos, 0.5), 2),
+            'p95_ms': round(_percentil(tiempos, 0.95), 2),
+            'consultas': round(consultas, 1),
+            'memoria_kb': round(pico / 1024, 1),
+        }
+
+    def ejecutar(self):
+        usuarios, clientes = self.clientes()
+        resultados = {}
+        for nombre, patron in rutas():
+            if self.filtro and self.filtro not in nombre:
+                continue
+            if any(excluida in nombre for excluida in EXCLUIDAS):
+                self.omitidas[nombre] = 'modifica datos con GET'
+                continue
+            url = self._url(nombre, patron, usuarios)
+            if url is None:
+                self.omitidas[nombre] = 'sin datos para los parámetros'
+                continue
+            rol = self._rol(patron, url, clientes)
+            resultado = self.medir(clientes[rol], url)
+            resultado['rol'] = rol
+            resultados[nombre] = resultado
+            self.salida(
+                f'  {nombre:<40} {rol:<14} {resultado["estado"]} '
+                f'p50 {resultado["p50_ms"]:>8.1f} ms  p95 {resultado["p95_ms"]:>8.1f} ms  '
+                f'{resultado["consultas"]:>6.1f} consultas  {resultado["memoria_kb"]:>9.1f} KB'
+            )
+        return resultados
+
+
+def comparar(resultados, base, umbral):
+    """
+    Regresiones respecto de la línea base: p95 o memoria que crecen más que
+    ``umbral`` (fracción) y cualquier aumento en la cantidad de consultas.
+    """
+    regresiones = []
+    for nombre, actual in resultados.items():
+        previo = base.get(nombre)
+        if previo is None:
+            continue
+        for metrica, tolerancia in [('p95_ms', umbral), ('memoria_kb', umbral), ('consultas', 0)]:
+            antes, ahora = previo.get(metrica), actual.get(metrica)
+            if antes is None or ahora is None:
+                continue
+            if ahora > antes * (1 + tolerancia) and ahora - antes >= 1:
+                regresiones.append((nombre, metrica, antes, ahora))
+    return regresiones
+
+
+def leer_base(ruta):
+    with open(ruta, encoding='utf-8') as archivo:
+        return json.load(archivo)['rutas']
+
+
+def guardar_base(ruta, resultados, **meta):
+    with open(ruta, 'w', encoding='utf-8') as archivo:
+        json.dump({'meta': meta, 'rutas': resultados}, archivo, indent=2, sort_keys=True, ensure_ascii=False)
@@ -0,0 +1,105 @@
+"""
+Caché en dos niveles para los caminos calientes de las apps.
+
+- L1: ``caches['local']``, LocMem del proceso, chica y con TTL corto.
+- L2: ``caches['default']``, compartida entre procesos (archivos, base o Redis
+  según ``CACHE_L2``).
+
+Las claves van por espacio (``'comedor.config'``, ``'persona.elegibilidad'``,
+...) y llevan la versión del espacio: ``invalidar(espacio)`` incrementa la
+versión en L2 y todas las claves anteriores dejan de leerse. Los demás
+procesos ven la versión nueva cuando vence su copia en L1, así que una
+invalidación tarda a lo sumo ``CACHE_L1_TIMEOUT`` segundos en propagarse.
+Si L2 expulsa la clave de versión, la nueva arranca en el reloj (en
+milisegundos) y no en 1: las entradas escritas con versiones anteriores pueden
+seguir en L2 y no tienen que volver a leerse.
+Aciertos y fallos de cada nivel se cuentan en ``comedor_cache_consultas_total``.
+"""
+import time
+
+from django.core.cache import caches
+
+from .metricas import registrar_cache
+
+_FALTA = object()
+
+
+def _niveles():
+    return caches['local'], caches['default']
+
+
+def _clave_version(espacio):
+    return f'{espacio}:version'
+
+
+def _version_nueva(anterior=None):
+    # Mayor que cualquier versión ya usada mientras no haya más de mil invalidaciones por segundo
+    return max(int(time.time() * 1000), (anterior or 0) + 1)
+
+
+def version(espacio):
+    """Versión vigente del espacio"""
+    l1, l2 = _niveles()
+    clave = _clave_version(espacio)
+    actual = l1.get(clave)
+    if actual is None:
+        actual = l2.get(clave)
+        if actual is None:
+            nueva = _version_nueva()
+            # add: si otro proceso la creó recién, vale la suya
+            l2.add(clave, nueva, timeout=None)
+            actual = l2.get(clave) or nueva
+        l1.set(clave, actual)
+    return actual
+
+
+def clave(espacio, *partes):
+    return ':'.join([espacio, f'v{version(espacio)}', *(str(parte) for parte in partes)])
+
+
+def obtener(espacio, partes, calcular, timeout=300, timeout_local=None):
+    """
+    Valor cacheado bajo ``espacio`` y ``partes``; si no está en ningún nivel
+    se calcula con ``calcular()`` y se guarda en los dos. ``None`` también se
+    cachea. ``timeout_local`` es el TTL en L1 (por defecto el de ``caches['local']``).
+    """
+    l1, l2 = _niveles()
+    completa = clave(espacio, *partes)
+    opciones_l1 = {} if timeout_local is None else {'timeout': timeout_local}
+
+    valor = l1.get(completa, _FALTA)
+    registrar_cache(f'{espacio}:l1', valor is not _FALTA)
+    if valor is not _FALTA:
+        return valor
+
+    valor = l2.get(completa, _FALTA)
+    registrar_cache(f'{espacio}:l2', valor is not _FALTA)
+    if valor is _FALTA:
+        valor = calcular()
+        l2.set(completa, valor, timeout=timeout)
+    l1.set(completa, valor, **opciones_l1)
+    return valor
+
+
+def refrescar(espacio, partes, calcular, timeout=300):
+    """Recalcula y guarda el valor aunque siga cacheado (para calentar la caché)"""
+    l1, l2 = _niveles()
+    completa = clave(espacio, *partes)
+    valor = calcular()
+    l2.set(completa, valor, timeout=timeout)
+    l1.set(completa, valor)
+    return valor
+
+
+def invalidar(*espacios):
+    """Descarta todo lo cacheado en los espacios (en este proceso, al instante)"""
+    l1, l2 = _niveles()
+    for espacio in espacios:
+        clave_version = _clave_version(espacio)
+        try:
+            nueva = l2.incr(clave_version)
+        except ValueError:
+            # Versión todavía no creada (o expulsada de L2)
+            nueva = _version_nueva(l1.get(clave_version))
+            l2.set(clave_version, nueva, timeout=None)
+        l1.set(clave_version, nueva)
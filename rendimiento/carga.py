@@ -0,0 +1,510 @@
+"""
+Simulador de carga del horario pico del comedor (compra y uso de tickets).
+
+Cada usuario virtual es un hilo que repite un flujo según su rol (compra
+paga, ticket gratuito por beca, consulta de tickets) con tiempos de espera
+exponenciales entre pasos. Los requests pueden ir por:
+
+- el cliente de pruebas de Django (en proceso, sin HTTP),
+- un servidor WSGI local con hilos levantado por el propio comando,
+- una URL externa (por ejemplo el Apache/mod_wsgi de staging).
+
+En los dos primeros modos un ``execute_wrapper`` cuenta en la base las
+colisiones de claves únicas, los errores por bloqueo y el tiempo de las
+escrituras; las vistas de compra capturan esas excepciones y sólo devuelven
+un mensaje, así que no se verían desde HTTP. En PostgreSQL además se muestrea
+``pg_locks`` para ver cuántas sesiones esperan un lock.
+"""
+import http.cookiejar
+import json
+import math
+import random
+import re
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import namedtuple
+from contextlib import nullcontext
+from importlib import import_module
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+from django.db import DatabaseError, IntegrityError, OperationalError, close_old_connections, connection, connections
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+User = get_user_model()
+
+PERFILES = ('pago', 'becado', 'consulta')
+ESCRITURAS = ('INSERT', 'UPDATE', 'DELETE')
+# SQLSTATE de PostgreSQL: deadlock, lock no disponible, falla de serialización
+CODIGOS_BLOQUEO = ('40P01', '55P03', '40001')
+# Mensaje de las vistas de compra cuando el turno elegido se llenó (SinCupo)
+MENSAJE_SIN_CUPO = 'se quedó sin lugares'
+
+# repetida: la vista devolvió la respuesta guardada de un pedido con la misma clave de idempotencia
+Respuesta = namedtuple('Respuesta', 'estado destino cuerpo repetida')
+
+
+def _percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[max(math.ceil(p * len(ordenados)) - 1, 0)]
+
+
+def clasificar_error(error):
+    """'colision', 'idempotencia', 'bloqueo' u otro tipo de error de base"""
+    if isinstance(error, IntegrityError):
+        mensaje = str(error).lower()
+        if 'claveidempotencia' in mensaje or 'clave_idempotencia' in mensaje:
+            # Un pedido repetido que la vista resuelve devolviendo la respuesta guardada
+            return 'idempotencia'
+        return 'colision' if 'unique' in mensaje or 'duplicate' in mensaje else 'integridad'
+    codigo = getattr(getattr(error, '__cause__', None), 'pgcode', None)
+    if codigo in CODIGOS_BLOQUEO or (isinstance(error, OperationalError) and 'locked' in str(error)):
+        return 'bloqueo'
+    return 'base'
+
+
+class Estadisticas:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencias = {}
+        self.errores = {}
+        self.resultados = {}
+        self.base = {}
+        self.escrituras = []
+        self.esperando_locks = None  # sólo se muestrea en PostgreSQL
+
+    def request(self, accion, duracion, error=None):
+        with self.lock:
+            self.latencias.setdefault(accion, []).append(duracion)
+            if error:
+                por_tipo = self.errores.setdefault(accion, {})
+                por_tipo[error] = por_tipo.get(error, 0) + 1
+
+    def resultado(self, nombre):
+        with self.lock:
+            self.resultados[nombre] = self.resultados.get(nombre, 0) + 1
+
+    def error_base(self, tipo):
+        with self.lock:
+            self.base[tipo] = self.base.get(tipo, 0) + 1
+
+    def escritura(self, duracion):
+        with self.lock:
+            self.escrituras.append(duracion)
+
+    def resumen(self, segundos):
+        total = sum(len(v) for v in self.latencias.values())
+        errores = sum(sum(v.values()) for v in self.errores.values())
+        return {
+            'segundos': round(segundos, 1),
+            'requests': total,
+            'requests_por_segundo': round(total / segundos, 1) if segundos else 0,
+            'tasa_error': round(errores / total, 4) if total else 0,
+            'acciones': {
+                accion: {
+                    'requests': len(valores),
+                    'p50_ms': round(_percentil(valores, 0.5) * 1000, 1),
+                    'p95_ms': round(_percentil(valores, 0.95) * 1000, 1),
+                    'errores': self.errores.get(accion, {}),
+                }
+                for accion, valores in sorted(self.latencias.items())
+            },
+            'resultados': dict(sorted(self.resultados.items())),
+            'base': {
+                'colisiones_unicas': self.base.get('colision', 0),
+                'errores_bloqueo': self.base.get('bloqueo', 0),
+                'colisiones_idempotencia': self.base.get('idempotencia', 0),
+                'otros_errores': {
+                    k: v for k, v in self.base.items() if k not in ('colision', 'bloqueo', 'idempotencia')
+                },
+                'escrituras': len(self.escrituras),
+                'escritura_p95_ms': round(_percentil(self.escrituras, 0.95) * 1000, 1),
+                'escritura_max_ms': round(max(self.escrituras, default=0) * 1000, 1),
+                'max_esperando_locks': self.esperando_locks,
+            },
+        }
+
+
+class ContadorBase:
+    """``execute_wrapper`` que mide escrituras y clasifica errores antes de que la vista los capture"""
+
+    def __init__(self, estadisticas):
+        self.estadisticas = estadisticas
+
+    def __call__(self, execute, sql, params, many, context):
+        escritura = sql.lstrip()[:6].upper() in ESCRITURAS
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        except DatabaseError as error:
+            self.estadisticas.error_base(clasificar_error(error))
+            raise
+        finally:
+            if escritura:
+                self.estadisticas.escritura(time.perf_counter() - inicio)
+
+
+# Clientes
+
+class ClienteDjango:
+    """Cliente de pruebas de Django: sin red, misma base y mismo proceso"""
+
+    def __init__(self, usuario):
+        self.cliente = Client(raise_request_exception=False, HTTP_HOST=_host())
+        self.cliente.force_login(usuario)
+
+    def _respuesta(self, respuesta):
+        return Respuesta(
+            respuesta.status_code, respuesta.get('Location', ''), respuesta.content.decode(),
+            respuesta.has_header('Idempotent-Replayed'),
+        )
+
+    def get(self, url):
+        return self._respuesta(self.cliente.get(url))
+
+    def post(self, url, datos):
+        return self._respuesta(self.cliente.post(url, datos))
+
+
+class _SinRedirecciones(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class ClienteHTTP:
+    """Cliente HTTP con la sesión del usuario creada directamente en la base"""
+
+    def __init__(self, usuario, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(self.cookies), _SinRedirecciones,
+        )
+        sesion = import_module(settings.SESSION_ENGINE).SessionStore()
+        sesion[SESSION_KEY] = str(usuario.pk)
+        sesion[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+        sesion[HASH_SESSION_KEY] = usuario.get_session_auth_hash()
+        sesion.create()
+        host = urllib.parse.urlsplit(self.base_url).hostname
+        self.cookies.set_cookie(http.cookiejar.Cookie(
+            0, settings.SESSION_COOKIE_NAME, sesion.session_key, None, False, host, False, False,
+            '/', True, False, None, False, None, None, {},
+        ))
+
+    def _csrf(self):
+        for cookie in self.cookies:
+            if cookie.name == settings.CSRF_COOKIE_NAME:
+                return cookie.value
+        return ''
+
+    def _abrir(self, pedido):
+        try:
+            with self.opener.open(pedido, timeout=60) as respuesta:
+                cuerpo = respuesta.read().decode(errors='replace')
+                encabezados = respuesta.headers
+                estado = respuesta.status
+        except urllib.error.HTTPError as error:
+            cuerpo, encabezados, estado = error.read().decode(errors='replace'), error.headers, error.code
+        return Respuesta(
+            estado, encabezados.get('Location', ''), cuerpo, encabezados.get('Idempotent-Replayed') is not None,
+        )
+
+    def get(self, url):
+        return self._abrir(urllib.request.Request(self.base_url + url))
+
+    def post(self, url, datos):
+        token = self._csrf()
+        cuerpo = urllib.parse.urlencode({**datos, 'csrfmiddlewaretoken': token}).encode()
+        pedido = urllib.request.Request(
+            self.base_url + url, data=cuerpo,
+            headers={'X-CSRFToken': token, 'Referer': self.base_url + url},
+        )
+        return self._abrir(pedido)
+
+
+def _host():
+    hosts = [h for h in settings.ALLOWED_HOSTS if h != '*' and not h.startswith('.')]
+    return hosts[0] if hosts else 'localhost'
+
+
+# Usuarios virtuales
+
+def usuarios_por_perfil(cantidad):
+    """Estudiantes para cada perfil: con beca gratuita vigente, sin beca y con tickets"""
+    from comedor.models import BeneficioComedor
+    from persona.models import PersonaBeca
+
+    hoy = timezone.localdate()
+    gratuitas = BeneficioComedor.objects.filter(activo=True, tipo_beneficio='gratuito').values('tipo_beca')
+    con_beca = PersonaBeca.objects.filter(estado_beca='ACTIVA', fecha_inicio__lte=hoy, fecha_fin__gte=hoy)
+    estudiantes = User.objects.filter(is_active=True, persona__estudiante__isnull=False).order_by('pk')
+    return {
+        'becado': list(estudiantes.filter(
+            persona__estudiante__becas__in=con_beca.filter(beca__in=gratuitas)).distinct()[:cantidad]),
+        'pago': list(estudiantes.exclude(
+            persona__estudiante__becas__in=con_beca.values('pk'))[:cantidad]),
+        'consulta': list(estudiantes.filter(tickets_comedor__isnull=False).distinct()[:cantidad]),
+    }
+
+
+class UsuarioVirtual(threading.Thread):
+    def __init__(self, perfil, usuario, simulacion, semilla):
+        super().__init__(daemon=True)
+        self.perfil = perfil
+        self.usuario = usuario
+        self.simulacion = simulacion
+        self.rnd = random.Random(semilla)
+
+    def pedir(self, accion, metodo, url, datos=None):
+        inicio = time.perf_counter()
+        try:
+            respuesta = self.cliente.get(url) if metodo == 'GET' else self.cliente.post(url, datos)
+        except Exception as error:
+            self.simulacion.estadisticas.request(accion, time.perf_counter() - inicio, type(error).__name__)
+            return Respuesta(None, '', '', False)
+        duracion = time.perf_counter() - inicio
+        estado = respuesta.estado
+        self.simulacion.estadisticas.request(accion, duracion, f'http_{estado}' if estado >= 500 else None)
+        return respuesta
+
+    def pensar(self):
+        if self.simulacion.pensar:
+            time.sleep(min(self.rnd.expovariate(1 / self.simulacion.pensar), self.simulacion.pensar * 5))
+
+    def elegir_turno(self, formulario):
+        """Un turno con lugar del formulario (None si la sede vende sin turnos o están completos)"""
+        select = re.search(r'<select name="turno".*?</select>', formulario, re.S)
+        if not select:
+            return None
+        libres = re.findall(r'<option value="(\d+)">', select.group(0))
+        return self.rnd.choice(libres) if libres else None
+
+    def duplicar(self, accion, url, datos):
+        """
+        Doble clic o reintento de la red: el mismo POST con la misma clave
+        desde otro hilo, casi a la vez. Devuelve la respuesta del primero.
+        """
+        from comedor.models import CompraTickets
+
+        compras = CompraTickets.objects.filter(usuario=self.usuario)
+        antes = compras.count()
+        demora = self.rnd.uniform(0, 0.05)
+        segunda = []
+
+        def repetir():
+            time.sleep(demora)
+            try:
+                with self.simulacion.envoltorio():
+                    segunda.append(self.pedir(f'{accion}_repetida', 'POST', url, datos))
+            finally:
+                connection.close()
+
+        hilo = threading.Thread(target=repetir)
+        hilo.start()
+        respuesta = self.pedir(accion, 'POST', url, datos)
+        hilo.join()
+
+        if compras.count() - antes > 1:
+            self.simulacion.estadisticas.resultado(f'{accion}_duplicada')
+        elif respuesta.repetida or (segunda and segunda[0].repetida):
+            self.simulacion.estadisticas.resultado(f'{accion}_repetida')
+        return respuesta
+
+    def comprar(self, accion, url, datos):
+        formulario = self.pedir(f'{accion}_form', 'GET', url).cuerpo
+        turno = self.elegir_turno(formulario)
+        if turno:
+            datos = {**datos, 'turno': turno}
+        clave = re.search(r'name="clave_idempotencia" value="(\w+)"', formulario)
+        if clave:
+            datos = {**datos, 'clave_idempotencia': clave.group(1)}
+        self.pensar()
+        if clave and self.rnd.random() < self.simulacion.duplicados:
+            respuesta = self.duplicar(accion, url, datos)
+        else:
+            respuesta = self.pedir(accion, 'POST', url, datos)
+        if respuesta.estado == 302 and respuesta.destino.endswith(reverse('mis_tickets')):
+            self.simulacion.estadisticas.resultado(f'{accion}_ok')
+        else:
+            # La vista captura el error y vuelve al formulario con un mensaje, como lo vería el navegador
+            cuerpo = respuesta.cuerpo
+            if respuesta.estado == 302:
+                cuerpo = self.pedir(f'{accion}_form', 'GET', urllib.parse.urlsplit(respuesta.destino).path).cuerpo
+            sin_cupo = MENSAJE_SIN_CUPO in cuerpo
+            self.simulacion.estadisticas.resultado(f'{accion}_sin_cupo' if sin_cupo else f'{accion}_rechazada')
+        self.pensar()
+        self.ver_tickets()
+
+    def ver_tickets(self):
+        from comedor.models import Ticket
+
+        self.pedir('mis_tickets', 'GET', reverse('mis_tickets'))
+        ticket = Ticket.objects.filter(usuario=self.usuario).order_by('-pk').values_list('pk', flat=True).first()
+        if ticket:
+            # Sin endpoint de escaneo: el uso del ticket es mostrar su QR en el detalle
+            self.pensar()
+            self.pedir('detalle_ticket', 'GET', reverse('detalle_ticket', args=[ticket]))
+
+    def run(self):
+        simulacion = self.simulacion
+        time.sleep(self.rnd.uniform(0, simulacion.rampa))
+        try:
+            with simulacion.envoltorio():
+                self.cliente = simulacion.nuevo_cliente(self.usuario)
+                while time.monotonic() < simulacion.fin:
+                    if self.perfil == 'pago':
+                        self.comprar('compra', reverse('comprar_tickets'), {})
+                    elif self.perfil == 'becado':
+                        self.comprar('gratuito', reverse('generar_ticket_gratuito'), {'cantidad': 1})
+                    else:
+                        self.ver_tickets()
+                    self.pensar()
+        finally:
+            connection.close()
+
+
+class _ServidorConHilos(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+class _SinLog(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class Simulacion:
+    def __init__(
+        self, usuarios, mezcla, duracion, pensar=1.0, rampa=5.0, modo='cliente', url=None, semilla=42,
+        duplicados=0.0,
+    ):
+        self.cantidad = usuarios
+        self.mezcla = mezcla
+        self.duracion = duracion
+        self.pensar = pensar
+        self.rampa = rampa
+        self.modo = modo
+        self.url = url
+        self.semilla = semilla
+        self.duplicados = duplicados
+        self.estadisticas = Estadisticas()
+        self.contador = ContadorBase(self.estadisticas) if modo != 'url' else None
+        self.servidor = None
+        self.virtuales = []
+        self.fin = 0.0
+
+    def envoltorio(self):
+        """Contadores de base para las consultas de este hilo (en modo servidor cuentan los hilos del servidor)"""
+        if self.modo == 'cliente':
+            return connections['default'].execute_wrapper(self.contador)
+        return nullcontext()
+
+    def nuevo_cliente(self, usuario):
+        if self.modo == 'cliente':
+            return ClienteDjango(usuario)
+        return ClienteHTTP(usuario, self.url)
+
+    def _levantar_servidor(self):
+        from django.core.handlers.wsgi import WSGIHandler
+
+        # Django ya está configurado: get_wsgi_application() volvería a configurar el logging
+        aplicacion = WSGIHandler()
+        contador = self.contador
+
+        def instrumentada(environ, start_response):
+            with connections['default'].execute_wrapper(contador):
+                try:
+                    return aplicacion(environ, start_response)
+                finally:
+                    close_old_connections()
+
+        self.servidor = make_server(
+            '127.0.0.1', 0, instrumentada, server_class=_ServidorConHilos, handler_class=_SinLog,
+        )
+        self.url = f'http://127.0.0.1:{self.servidor.server_port}'
+        threading.Thread(target=self.servidor.serve_forever, daemon=True).start()
+
+    def _muestrear_locks(self):
+        """Máximo de sesiones esperando un lock (sólo PostgreSQL)"""
+        try:
+            while time.monotonic() < self.fin:
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT count(*) FROM pg_locks WHERE NOT granted')
+                    esperando = cursor.fetchone()[0]
+                with self.estadisticas.lock:
+                    self.estadisticas.esperando_locks = max(self.estadisticas.esperando_locks or 0, esperando)
+                time.sleep(0.1)
+        finally:
+            connection.close()
+
+    def repartir(self):
+        """Usuarios virtuales según la mezcla de perfiles (la proporción se respeta aunque falten usuarios)"""
+        disponibles = usuarios_por_perfil(self.cantidad)
+        total = sum(self.mezcla.values())
+        virtuales = []
+        for perfil, peso in self.mezcla.items():
+            cantidad = round(self.cantidad * peso / total)
+            candidatos = disponibles.get(perfil, [])
+            if cantidad and not candidatos:
+                raise ValueError(f'No hay usuarios para el perfil {perfil}')
+            for n in range(cantidad):
+                virtuales.append(UsuarioVirtual(
+                    perfil, candidatos[n % len(candidatos)], self, f'{self.semilla}:{perfil}:{n}',
+                ))
+        return virtuales
+
+    def ejecutar(self):
+        self.virtuales = self.repartir()
+        if self.modo == 'servidor':
+            self._levantar_servidor()
+
+        inicio = time.monotonic()
+        self.fin = inicio + self.rampa + self.duracion
+        hilos = list(self.virtuales)
+        if connection.vendor == 'postgresql':
+            hilos.append(threading.Thread(target=self._muestrear_locks, daemon=True))
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+        segundos = time.monotonic() - inicio
+
+        if self.servidor:
+            self.servidor.shutdown()
+            self.servidor.server_close()
+        return self.estadisticas.resumen(segundos)
+
+
+def limpiar(usuarios, desde):
+    """Borra compras y tickets (con su QR) creados por la simulación"""
+    from comedor.models import CompraTickets, Ticket
+
+    tickets = Ticket.objects.filter(usuario__in=usuarios, fecha_compra__gte=desde)
+    for ticket in tickets.exclude(qr_code='').exclude(qr_code__isnull=True).only('qr_code'):
+        ticket.qr_code.delete(save=False)
+    borrados = tickets.delete()[0]
+    return borrados + CompraTickets.objects.filter(usuario__in=usuarios, fecha_compra__gte=desde).delete()[0]
+
+
+def parsear_mezcla(texto):
+    """``'pago=60,becado=25,consulta=15'`` → dict"""
+    mezcla = {}
+    for parte in filter(None, re.split(r'\s*,\s*', texto.strip())):
+        perfil, _, peso = parte.partition('=')
+        if perfil not in PERFILES:
+            raise ValueError(f'Perfil desconocido: {perfil} (válidos: {", ".join(PERFILES)})')
+        mezcla[perfil] = float(peso or 1)
+    return mezcla
+
+
+def guardar(ruta, resumen):
+    with open(ruta, 'w', encoding='utf-8') as archivo:
+        json.dump(resumen, archivo, indent=2, ensure_ascii=False)
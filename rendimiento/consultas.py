@@ -0,0 +1,85 @@
+"""
+Detección de N+1 y presupuestos de consultas por vista.
+
+Con ``RENDIMIENTO_DETECTAR_NMAS1`` (por defecto en DEBUG) cada consulta se
+normaliza a una huella (sin literales ni largo de las listas ``IN``). Si la
+misma huella se repite ``RENDIMIENTO_NMAS1_UMBRAL`` veces en un request, se
+informa con el template y la línea que la dispararon.
+
+``PRESUPUESTO_CONSULTAS`` fija el máximo de consultas por ``view_name``
+(sesión y usuario incluidos). Con ``RENDIMIENTO_ESTRICTO`` (activo en
+``src.settings_test``) excederlo levanta ``PresupuestoConsultasExcedido``,
+así el test falla.
+"""
+import re
+import sys
+
+from django.conf import settings
+
+from .medicion import origen
+
+DETECTAR = getattr(settings, 'RENDIMIENTO_DETECTAR_NMAS1', settings.DEBUG)
+UMBRAL = getattr(settings, 'RENDIMIENTO_NMAS1_UMBRAL', 5)
+PRESUPUESTOS = getattr(settings, 'PRESUPUESTO_CONSULTAS', {})
+ESTRICTO = getattr(settings, 'RENDIMIENTO_ESTRICTO', False)
+
+_IN = re.compile(r'\bIN \((?:%s, )*%s\)')
+_NUMEROS = re.compile(r'\b\d+\b')
+_TEXTOS = re.compile(r"'(?:[^']|'')*'")
+
+
+class PresupuestoConsultasExcedido(Exception):
+    pass
+
+
+def huella(sql):
+    sql = _TEXTOS.sub('?', sql)
+    sql = _NUMEROS.sub('?', sql)
+    return _IN.sub('IN (...)', sql)
+
+
+def origen_template(profundidad=0):
+    """``template:línea`` del nodo de template que se está renderizando, si lo hay"""
+    from django.template.base import Node
+
+    frame = sys._getframe(profundidad + 1)
+    while frame:
+        nodo = frame.f_locals.get('self')
+        if isinstance(nodo, Node) and getattr(nodo, 'token', None) is not None:
+            nombre = getattr(nodo.origin, 'template_name', None) or nodo.origin.name
+            return f'{nombre}:{nodo.token.lineno}'
+        frame = frame.f_back
+    return ''
+
+
+class Huellas:
+    """Conteo de consultas repetidas de un request"""
+
+    def __init__(self):
+        self.conteos = {}
+        self.origenes = {}
+
+    def registrar(self, sql):
+        clave = huella(sql)
+        conteo = self.conteos.get(clave, 0) + 1
+        self.conteos[clave] = conteo
+        if conteo == 2:
+            # La primera repetición ya está dentro del loop que genera el N+1
+            self.origenes[clave] = (origen_template(2), origen(2))
+
+    def repetidas(self, umbral=None):
+        umbral = umbral or UMBRAL
+        return [
+            {
+                'veces': conteo,
+                'sql': clave,
+                'template': self.origenes[clave][0],
+                'origen': self.origenes[clave][1],
+            }
+            for clave, conteo in sorted(self.conteos.items(), key=lambda item: -item[1])
+            if conteo >= umbral
+        ]
+
+
+def presupuesto(vista):
+    return PRESUPUESTOS.get(vista)
@@ -0,0 +1,77 @@
+import statistics
+import time
+
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.signals import connection_created
+
+# (nombre, CONN_MAX_AGE, CONN_HEALTH_CHECKS)
+MODOS = [
+    ('una conexión por request', 0, False),
+    ('persistente', 600, False),
+    ('persistente + health checks', 600, True),
+]
+
+
+class Command(BaseCommand):
+    help = 'Mide el costo de abrir la conexión a la base en cada request frente a reutilizarla'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requests simulados por modo')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--consulta', default='SELECT 1', help='SQL que ejecuta cada request')
+
+    def handle(self, *args, **options):
+        conexion = connections[options['database']]
+        original = (conexion.settings_dict['CONN_MAX_AGE'], conexion.settings_dict['CONN_HEALTH_CHECKS'])
+        abiertas = []
+
+        def contar(sender, connection, **kwargs):
+            if connection.alias == conexion.alias:
+                abiertas.append(1)
+
+        connection_created.connect(contar)
+        self.stdout.write(self.style.SUCCESS(
+            f'\n{conexion.vendor} ({conexion.settings_dict["NAME"]}), {options["requests"]} requests por modo'
+        ))
+        resultados = {}
+        try:
+            for nombre, max_age, health_checks in MODOS:
+                # CONN_MAX_AGE y CONN_HEALTH_CHECKS se leen al conectar: cerrar antes de cambiar de modo
+                conexion.close()
+                conexion.settings_dict['CONN_MAX_AGE'] = max_age
+                conexion.settings_dict['CONN_HEALTH_CHECKS'] = health_checks
+                abiertas.clear()
+                tiempos = self.medir(conexion, options['requests'], options['consulta'])
+                resultados[nombre] = statistics.mean(tiempos)
+                self.stdout.write(
+                    f'  {nombre:<30} media {statistics.mean(tiempos):>7.3f} ms  '
+                    f'p50 {statistics.median(tiempos):>7.3f} ms  '
+                    f'p95 {sorted(tiempos)[int(len(tiempos) * 0.95) - 1]:>7.3f} ms  '
+                    f'{len(abiertas)} conexiones abiertas'
+                )
+        finally:
+            connection_created.disconnect(contar)
+            conexion.close()
+            conexion.settings_dict['CONN_MAX_AGE'], conexion.settings_dict['CONN_HEALTH_CHECKS'] = original
+
+        sobrecarga = resultados[MODOS[0][0]] - resultados[MODOS[1][0]]
+        self.stdout.write(self.style.SUCCESS(
+            f'  ✓ Abrir la conexión agrega {sobrecarga:.3f} ms por request; '
+            f'el health check, {resultados[MODOS[2][0]] - resultados[MODOS[1][0]]:.3f} ms'
+        ))
+
+    def medir(self, conexion, cantidad, consulta):
+        """Ciclo de un request tal como lo ve la base: señales de inicio y fin más una consulta"""
+        tiempos = []
+        for _ in range(cantidad):
+            inicio = time.perf_counter()
+            request_started.send(sender=WSGIHandler, environ={})
+            with conexion.cursor() as cursor:
+                cursor.execute(consulta)
+                cursor.fetchall()
+            request_finished.send(sender=WSGIHandler)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+        return tiempos
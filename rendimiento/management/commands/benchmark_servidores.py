@@ -0,0 +1,80 @@
+import logging
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from rendimiento.carga import guardar, parsear_mezcla
+from rendimiento.servidores import SERVIDORES, comparar_servidores, disponibles
+
+
+class Command(BaseCommand):
+    help = 'Compara mod_wsgi (procesos x hilos) contra uvicorn (workers ASGI) con la misma carga de simular_carga'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--servidores', nargs='+', choices=list(SERVIDORES), default=list(SERVIDORES),
+            help='Servidores a comparar (se omiten los que no están instalados)',
+        )
+        parser.add_argument('--procesos', type=int, default=2, help='Procesos de mod_wsgi y workers de uvicorn')
+        parser.add_argument('--hilos', type=int, default=5, help='Hilos por proceso de mod_wsgi')
+        parser.add_argument('--puerto', type=int, default=8760, help='Puerto del primer servidor')
+        parser.add_argument('--usuarios', type=int, default=50, help='Usuarios virtuales concurrentes')
+        parser.add_argument('--mezcla', default='consulta=70,pago=30')
+        parser.add_argument('--duracion', type=float, default=30)
+        parser.add_argument('--rampa', type=float, default=5)
+        parser.add_argument('--pensar', type=float, default=0.5)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--json', help='Guardar los resúmenes de cada servidor en este archivo')
+
+    def handle(self, *args, **options):
+        try:
+            mezcla = parsear_mezcla(options['mezcla'])
+        except ValueError as error:
+            raise CommandError(error)
+
+        nombres = disponibles(options['servidores'])
+        for faltante in sorted(set(options['servidores']) - set(nombres)):
+            self.stdout.write(self.style.WARNING(f'  - {faltante}: no instalado ({SERVIDORES[faltante][0]})'))
+        if not nombres:
+            raise CommandError('No hay servidores instalados para comparar')
+
+        if options['verbosity'] < 2:
+            logging.getLogger('rendimiento').setLevel(logging.ERROR)
+        self.stdout.write(self.style.SUCCESS(
+            f'\n{options["usuarios"]} usuarios ({options["mezcla"]}) durante '
+            f'{options["rampa"] + options["duracion"]:.0f}s contra {", ".join(nombres)} '
+            f'({options["procesos"]} procesos, {options["hilos"]} hilos en mod_wsgi)...'
+        ))
+        try:
+            resultados = comparar_servidores(
+                nombres,
+                puerto=options['puerto'],
+                procesos=options['procesos'],
+                hilos=options['hilos'],
+                registro=None if options['verbosity'] < 2 else sys.stderr,
+                usuarios=options['usuarios'],
+                mezcla=mezcla,
+                duracion=options['duracion'],
+                pensar=options['pensar'],
+                rampa=options['rampa'],
+                semilla=options['seed'],
+            )
+        except RuntimeError as error:
+            raise CommandError(error)
+
+        self.mostrar(resultados)
+        if options['json']:
+            guardar(options['json'], resultados)
+            self.stdout.write(self.style.SUCCESS(f'  ✓ Resultados guardados en {options["json"]}'))
+
+    def mostrar(self, resultados):
+        for nombre, resumen in resultados.items():
+            self.stdout.write(
+                f'\n  {nombre}: {resumen["requests_por_segundo"]} req/s, '
+                f'tasa de error {resumen["tasa_error"]:.2%}'
+            )
+            for accion, datos in resumen['acciones'].items():
+                self.stdout.write(
+                    f'    {accion:<16} {datos["requests"]:>7}  p50 {datos["p50_ms"]:>8.1f} ms  '
+                    f'p95 {datos["p95_ms"]:>8.1f} ms'
+                )
@@ -0,0 +1,92 @@
+import io
+import logging
+import os
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from persona.poblacion import GeneradorPoblacion
+from rendimiento.benchmark import Benchmark, comparar, guardar_base, leer_base
+
+
+class Command(BaseCommand):
+    help = 'Mide latencia, consultas y memoria de cada ruta del proyecto y compara contra una línea base'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale',
+            type=int,
+            default=0,
+            help='Personas sintéticas a generar si la base no tiene población (create_test_users --scale)',
+        )
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--repeticiones', type=int, default=20, help='Requests medidos por ruta')
+        parser.add_argument('--solo', help='Medir sólo las rutas cuyo nombre contenga este texto')
+        parser.add_argument('--base', help='JSON de línea base contra el que comparar')
+        parser.add_argument('--guardar', help='Guardar los resultados como JSON (nueva línea base)')
+        parser.add_argument(
+            '--umbral',
+            type=float,
+            default=0.2,
+            help='Aumento tolerado de p95 y memoria respecto de la línea base (0.2 = 20%%)',
+        )
+        parser.add_argument(
+            '--base-temporal',
+            action='store_true',
+            help='Usar una base de pruebas nueva en lugar de la configurada',
+        )
+        parser.add_argument(
+            '--keepdb',
+            action='store_true',
+            help='Con --base-temporal, conservar la base de pruebas (y sus datos) entre corridas',
+        )
+
+    def handle(self, *args, **options):
+        nombre_original = connection.settings_dict['NAME']
+        if options['base_temporal']:
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            resultados = self.medir(options)
+        finally:
+            if options['base_temporal'] and not options['keepdb']:
+                connection.creation.destroy_test_db(nombre_original, verbosity=0)
+
+        if options['guardar']:
+            guardar_base(
+                options['guardar'], resultados,
+                repeticiones=options['repeticiones'], scale=options['scale'], vendor=connection.vendor,
+            )
+            self.stdout.write(self.style.SUCCESS(f'  ✓ Resultados guardados en {options["guardar"]}'))
+
+        if options['base']:
+            self.comparar(resultados, options['base'], options['umbral'])
+
+    def medir(self, options):
+        if options['scale'] and not GeneradorPoblacion(options['scale']).existe():
+            self.stdout.write(f'Generando población de {options["scale"]} personas...')
+            call_command('create_test_users', scale=options['scale'], seed=options['seed'], stdout=io.StringIO())
+
+        if options['verbosity'] < 2:
+            # Sin las líneas del middleware y del detector de N+1 por cada request medido
+            logging.getLogger('rendimiento').setLevel(logging.ERROR)
+
+        benchmark = Benchmark(
+            repeticiones=options['repeticiones'], filtro=options['solo'], salida=self.stdout.write,
+        )
+        self.stdout.write(self.style.SUCCESS(f'\nMidiendo rutas ({options["repeticiones"]} requests cada una)...'))
+        resultados = benchmark.ejecutar()
+        for nombre, motivo in benchmark.omitidas.items():
+            self.stdout.write(self.style.WARNING(f'  - {nombre}: omitida ({motivo})'))
+        return resultados
+
+    def comparar(self, resultados, ruta, umbral):
+        if not os.path.exists(ruta):
+            raise CommandError(f'No existe la línea base {ruta}')
+        regresiones = comparar(resultados, leer_base(ruta), umbral)
+        if not regresiones:
+            self.stdout.write(self.style.SUCCESS(f'  ✓ Sin regresiones respecto de {ruta}'))
+            return
+        for nombre, metrica, antes, ahora in regresiones:
+            self.stdout.write(self.style.ERROR(f'  ✗ {nombre}: {metrica} {antes} → {ahora}'))
+        raise CommandError(f'{len(regresiones)} regresiones respecto de {ruta}')
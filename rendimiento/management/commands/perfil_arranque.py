@@ -0,0 +1,64 @@
+import os
+import shlex
+
+from django.core.management.base import BaseCommand, CommandError
+
+from rendimiento.arranque import OBJETIVOS, guardar, leer, perfilar
+
+
+class Command(BaseCommand):
+    help = 'Mide el arranque en frío de un proceso (python -X importtime): total, paquetes y módulos más lentos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--objetivo', choices=list(OBJETIVOS), default='wsgi',
+            help='wsgi: Django + apps + URLconf, como un worker antes del primer request',
+        )
+        parser.add_argument('--comando', help='Perfilar en cambio un comando de manage.py (ej. "check")')
+        parser.add_argument('--repeticiones', type=int, default=5, help='Corridas; se informa la mediana')
+        parser.add_argument('--top', type=int, default=20, help='Paquetes y módulos a mostrar')
+        parser.add_argument('--guardar', help='Guardar el perfil como JSON')
+        parser.add_argument('--base', help='Perfil JSON anterior contra el que comparar')
+
+    def handle(self, *args, **options):
+        comando = shlex.split(options['comando']) if options['comando'] else None
+        try:
+            perfil = perfilar(options['objetivo'], comando, options['repeticiones'])
+        except RuntimeError as error:
+            raise CommandError(error)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\n{perfil["objetivo"]}: {perfil["total_ms"]} ms de arranque (mediana de {options["repeticiones"]}), '
+            f'{perfil["imports_ms"]} ms importando {perfil["modulos"]} módulos'
+        ))
+        self.stdout.write('\n  Paquetes (tiempo propio de sus módulos):')
+        for nombre, ms in list(perfil['paquetes'].items())[:options['top']]:
+            self.stdout.write(f'    {nombre:<32} {ms:>8.1f} ms')
+        self.stdout.write('\n  Módulos (acumulado, incluye lo que importan):')
+        for modulo in perfil['lentos'][:options['top']]:
+            self.stdout.write(f'    {modulo["modulo"]:<48} {modulo["acumulado_ms"]:>8.1f} ms')
+
+        if options['guardar']:
+            guardar(options['guardar'], perfil)
+            self.stdout.write(self.style.SUCCESS(f'\n  ✓ Perfil guardado en {options["guardar"]}'))
+        if options['base']:
+            self.comparar(perfil, options['base'], options['top'])
+
+    def comparar(self, perfil, ruta, top):
+        if not os.path.exists(ruta):
+            raise CommandError(f'No existe el perfil {ruta}')
+        base = leer(ruta)
+        diferencia = perfil['total_ms'] - base['total_ms']
+        estilo = self.style.SUCCESS if diferencia <= 0 else self.style.WARNING
+        self.stdout.write(estilo(
+            f'\n  Arranque: {base["total_ms"]} → {perfil["total_ms"]} ms ({diferencia:+.1f} ms); '
+            f'imports {base["imports_ms"]} → {perfil["imports_ms"]} ms'
+        ))
+        paquetes = set(base['paquetes']) | set(perfil['paquetes'])
+        cambios = sorted(
+            ((nombre, base['paquetes'].get(nombre, 0), perfil['paquetes'].get(nombre, 0)) for nombre in paquetes),
+            key=lambda cambio: abs(cambio[2] - cambio[1]), reverse=True,
+        )
+        for nombre, antes, ahora in cambios[:top]:
+            if abs(ahora - antes) >= 0.5:
+                self.stdout.write(f'    {nombre:<32} {antes:>8.1f} → {ahora:>8.1f} ms')
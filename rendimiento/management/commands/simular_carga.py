@@ -0,0 +1,111 @@
+import logging
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from rendimiento.carga import Simulacion, guardar, limpiar, parsear_mezcla
+
+
+class Command(BaseCommand):
+    help = 'Simula el pico del mediodía: usuarios concurrentes comprando, generando y consultando tickets'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuarios', type=int, default=50, help='Usuarios virtuales concurrentes')
+        parser.add_argument(
+            '--mezcla',
+            default='pago=60,becado=25,consulta=15',
+            help='Proporción de perfiles: pago (comprar_tickets), becado (generar_ticket_gratuito), consulta',
+        )
+        parser.add_argument('--duracion', type=float, default=60, help='Segundos de carga después de la rampa')
+        parser.add_argument('--rampa', type=float, default=5, help='Segundos en los que arrancan los usuarios')
+        parser.add_argument('--pensar', type=float, default=1.0, help='Espera media entre pasos (segundos)')
+        parser.add_argument(
+            '--modo',
+            choices=['cliente', 'servidor'],
+            default='cliente',
+            help='cliente: cliente de pruebas de Django; servidor: servidor WSGI local con hilos',
+        )
+        parser.add_argument('--url', help='Servidor externo (ej. http://staging:8080); sin contadores de base')
+        parser.add_argument(
+            '--duplicados', type=float, default=0.1,
+            help='Fracción de compras que se mandan dos veces a la vez con la misma clave de idempotencia',
+        )
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--json', help='Guardar el resumen en este archivo')
+        parser.add_argument(
+            '--limpiar',
+            action='store_true',
+            help='Borrar al final las compras y tickets creados durante la simulación',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            mezcla = parsear_mezcla(options['mezcla'])
+        except ValueError as error:
+            raise CommandError(error)
+
+        simulacion = Simulacion(
+            usuarios=options['usuarios'],
+            mezcla=mezcla,
+            duracion=options['duracion'],
+            pensar=options['pensar'],
+            rampa=options['rampa'],
+            modo='url' if options['url'] else options['modo'],
+            url=options['url'],
+            semilla=options['seed'],
+            duplicados=options['duplicados'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'\nSimulando {options["usuarios"]} usuarios ({options["mezcla"]}) durante '
+            f'{options["rampa"] + options["duracion"]:.0f}s en modo {simulacion.modo}...'
+        ))
+        if options['verbosity'] < 2:
+            logging.getLogger('rendimiento').setLevel(logging.ERROR)
+            logging.getLogger('comedor').setLevel(logging.ERROR)
+
+        desde = timezone.now()
+        try:
+            resumen = simulacion.ejecutar()
+        except ValueError as error:
+            raise CommandError(error)
+
+        self.mostrar(resumen, simulacion.modo)
+        if options['json']:
+            guardar(options['json'], resumen)
+            self.stdout.write(self.style.SUCCESS(f'  ✓ Resumen guardado en {options["json"]}'))
+        if options['limpiar']:
+            borrados = limpiar({v.usuario for v in simulacion.virtuales}, desde)
+            self.stdout.write(self.style.SUCCESS(f'  ✓ {borrados} compras y tickets de la simulación eliminados'))
+
+    def mostrar(self, resumen, modo):
+        self.stdout.write(
+            f'\n  {resumen["requests"]} requests en {resumen["segundos"]}s: '
+            f'{resumen["requests_por_segundo"]} req/s, tasa de error {resumen["tasa_error"]:.2%}'
+        )
+        for accion, datos in resumen['acciones'].items():
+            errores = ', '.join(f'{tipo}={cantidad}' for tipo, cantidad in datos['errores'].items())
+            self.stdout.write(
+                f'  {accion:<16} {datos["requests"]:>7}  p50 {datos["p50_ms"]:>8.1f} ms  '
+                f'p95 {datos["p95_ms"]:>8.1f} ms  {errores}'
+            )
+        for nombre, cantidad in resumen['resultados'].items():
+            self.stdout.write(f'  • {nombre}: {cantidad}')
+
+        if modo == 'url':
+            self.stdout.write(self.style.WARNING('  - Sin contadores de base: el servidor corre en otro proceso'))
+            return
+        base = resumen['base']
+        estilo = self.style.ERROR if base['colisiones_unicas'] or base['errores_bloqueo'] else self.style.SUCCESS
+        self.stdout.write(estilo(
+            f'  Base: {base["colisiones_unicas"]} colisiones de claves únicas, '
+            f'{base["errores_bloqueo"]} errores por bloqueo, {base["escrituras"]} escrituras '
+            f'(p95 {base["escritura_p95_ms"]} ms, máx {base["escritura_max_ms"]} ms)'
+        ))
+        if base['colisiones_idempotencia']:
+            self.stdout.write(
+                f'  {base["colisiones_idempotencia"]} pedidos repetidos frenados por la clave de idempotencia'
+            )
+        if base['max_esperando_locks'] is not None:
+            self.stdout.write(f'  Hasta {base["max_esperando_locks"]} sesiones esperando un lock a la vez')
+        if base['otros_errores']:
+            self.stdout.write(self.style.ERROR(f'  Otros errores de base: {base["otros_errores"]}'))
@@ -0,0 +1,100 @@
+"""
+Medición de tiempos de un request: SQL, render de templates y total.
+
+La medición activa vive en un ``ContextVar``, así el wrapper de SQL y el
+render de templates la encuentran sin pasarla por parámetro (y funciona igual
+con hilos o con vistas async).
+"""
+import heapq
+import sys
+import time
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+
+medicion_actual = ContextVar('medicion_actual', default=None)
+
+CONSULTAS_LENTAS = getattr(settings, 'RENDIMIENTO_CONSULTAS_LENTAS', 5)
+
+_BASE = str(Path(settings.BASE_DIR).resolve())
+_PROPIO = str(Path(__file__).resolve().parent)
+
+
+def origen(profundidad=0):
+    """``archivo:línea en función`` del primer frame del proyecto fuera de esta app"""
+    frame = sys._getframe(profundidad + 1)
+    while frame:
+        archivo = frame.f_code.co_filename
+        if archivo.startswith(_BASE) and not archivo.startswith(_PROPIO) and 'site-packages' not in archivo:
+            return f'{Path(archivo).relative_to(_BASE)}:{frame.f_lineno} en {frame.f_code.co_name}'
+        frame = frame.f_back
+    return ''
+
+
+class Medicion:
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.consultas = 0
+        self.tiempo_sql = 0.0
+        self.tiempo_templates = 0.0
+        self.profundidad_templates = 0
+        self.lentas = []  # heap de (duración, orden, sql, origen)
+        self.huellas = None  # rendimiento.consultas.Huellas si se detectan N+1
+
+    @property
+    def total(self):
+        return time.perf_counter() - self.inicio
+
+    def registrar_consulta(self, sql, duracion):
+        self.consultas += 1
+        self.tiempo_sql += duracion
+        if self.huellas is not None:
+            self.huellas.registrar(sql)
+        if len(self.lentas) < CONSULTAS_LENTAS:
+            heapq.heappush(self.lentas, (duracion, self.consultas, sql, origen(2)))
+        elif duracion > self.lentas[0][0]:
+            # El origen sólo se calcula para las consultas que entran al top
+            heapq.heapreplace(self.lentas, (duracion, self.consultas, sql, origen(2)))
+
+    def consultas_lentas(self):
+        return [
+            {'ms': round(duracion * 1000, 2), 'sql': sql, 'origen': donde}
+            for duracion, _, sql, donde in sorted(self.lentas, reverse=True)
+        ]
+
+
+def wrapper_sql(execute, sql, params, many, context):
+    medicion = medicion_actual.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicion.registrar_consulta(sql, time.perf_counter() - inicio)
+
+
+def instrumentar_templates():
+    """Envuelve ``Template.render`` del backend de Django para acumular el tiempo de render"""
+    from django.template.backends.django import Template
+
+    if getattr(Template.render, '_instrumentado', False):
+        return
+    render_original = Template.render
+
+    def render(self, context=None, request=None):
+        medicion = medicion_actual.get()
+        if medicion is None:
+            return render_original(self, context, request)
+        medicion.profundidad_templates += 1
+        inicio = time.perf_counter()
+        try:
+            return render_original(self, context, request)
+        finally:
+            medicion.profundidad_templates -= 1
+            if not medicion.profundidad_templates:
+                medicion.tiempo_templates += time.perf_counter() - inicio
+
+    render._instrumentado = True
+    Template.render = render
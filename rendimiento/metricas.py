@@ -0,0 +1,327 @@
+"""
+Registro de métricas en formato de exposición de Prometheus.
+
+Con mod_wsgi hay varios procesos daemon, cada uno con su propio registro en
+memoria. Cada proceso vuelca su estado a ``<RENDIMIENTO_METRICAS_DIR>/<pid>-<id>.json``
+(como mucho cada ``RENDIMIENTO_METRICAS_INTERVALO`` segundos y al salir) y
+``/metrics`` suma los archivos de todos los procesos al leer, más el estado en
+memoria del proceso que atiende. El ``<id>`` al azar evita que un proceso nuevo
+con un PID reusado pise el archivo de uno muerto.
+
+Los contadores e histogramas de procesos que ya terminaron no retroceden: al
+leer se suman a ``terminados.json`` y su archivo se borra, así el directorio no
+crece con cada proceso reciclado. Los gauges sólo se suman para procesos vivos.
+El plegado toma un ``flock`` sobre el directorio; donde no hay ``fcntl``
+(Windows, sólo desarrollo) los archivos de procesos muertos se suman sin borrarse.
+"""
+import atexit
+import bisect
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+from django.conf import settings
+
+DIRECTORIO = Path(getattr(
+    settings, 'RENDIMIENTO_METRICAS_DIR', Path(tempfile.gettempdir()) / 'comedor-metricas'
+))
+INTERVALO = getattr(settings, 'RENDIMIENTO_METRICAS_INTERVALO', 5)
+
+TERMINADOS = 'terminados.json'
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_lock = threading.Lock()
+_metricas = {}
+
+
+class Metrica:
+    tipo = None
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self.valores = {}
+        _metricas[nombre] = self
+
+    def _clave(self, etiquetas):
+        return tuple(str(etiquetas.get(e, '')) for e in self.etiquetas)
+
+
+class Contador(Metrica):
+    tipo = 'counter'
+
+    def inc(self, cantidad=1, **etiquetas):
+        clave = self._clave(etiquetas)
+        with _lock:
+            self.valores[clave] = self.valores.get(clave, 0) + cantidad
+
+
+class Gauge(Metrica):
+    tipo = 'gauge'
+
+    def inc(self, cantidad=1, **etiquetas):
+        clave = self._clave(etiquetas)
+        with _lock:
+            self.valores[clave] = self.valores.get(clave, 0) + cantidad
+
+    def dec(self, cantidad=1, **etiquetas):
+        self.inc(-cantidad, **etiquetas)
+
+
+class Histograma(Metrica):
+    tipo = 'histogram'
+
+    def __init__(self, nombre, ayuda, etiquetas=(), buckets=BUCKETS_SEGUNDOS):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.buckets = tuple(buckets)
+
+    def observar(self, valor, **etiquetas):
+        clave = self._clave(etiquetas)
+        with _lock:
+            # [conteo por bucket..., +Inf, suma]
+            datos = self.valores.setdefault(clave, [0] * (len(self.buckets) + 1) + [0.0])
+            datos[bisect.bisect_left(self.buckets, valor)] += 1
+            datos[-1] += valor
+
+
+# Métricas de la aplicación
+
+duracion_requests = Histograma(
+    'comedor_request_duracion_segundos', 'Duración de los requests por vista', ['vista'],
+)
+requests_total = Contador(
+    'comedor_requests_total', 'Requests atendidos por vista y código de estado', ['vista', 'estado'],
+)
+requests_en_curso = Gauge(
+    'comedor_requests_en_curso', 'Requests en curso (hilos ocupados) sumando todos los procesos',
+)
+consultas_sql = Histograma(
+    'comedor_request_consultas_sql', 'Consultas SQL por request', ['vista'],
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500),
+)
+conexiones_db = Contador(
+    'comedor_db_conexiones_total',
+    'Requests según si encontraron la conexión a la base abierta (reutilizada) o no',
+    ['reutilizada'],
+)
+conexiones_creadas = Contador(
+    'comedor_db_conexiones_creadas_total', 'Conexiones a la base abiertas', ['alias'],
+)
+tickets_emitidos = Contador(
+    'comedor_tickets_emitidos_total', 'Tickets emitidos', ['estado'],
+)
+duracion_qr = Histograma(
+    'comedor_qr_duracion_segundos', 'Tiempo de generación de códigos QR',
+)
+escaneos = Contador(
+    'comedor_escaneos_total', 'Resultados del escaneo de tickets', ['resultado'],
+)
+reservas_turnos = Contador(
+    'comedor_turnos_reservas_total',
+    'Reservas de lugar en turnos: franja libre, varias franjas, esperando un lock o sin cupo', ['resultado'],
+)
+cache_consultas = Contador(
+    'comedor_cache_consultas_total', 'Consultas a la caché', ['cache', 'resultado'],
+)
+trabajos_total = Contador(
+    'comedor_trabajos_total', 'Trabajos en segundo plano terminados por tarea y resultado', ['tarea', 'resultado'],
+)
+duracion_trabajos = Histograma(
+    'comedor_trabajo_duracion_segundos', 'Duración de los trabajos en segundo plano', ['tarea'],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300),
+)
+trabajos_en_curso = Gauge(
+    'comedor_trabajos_en_curso', 'Trabajos ejecutándose en los workers',
+)
+periodicas_total = Contador(
+    'comedor_periodicas_total', 'Ejecuciones de tareas periódicas por tarea y resultado', ['tarea', 'resultado'],
+)
+duracion_periodicas = Histograma(
+    'comedor_periodica_duracion_segundos', 'Duración de las tareas periódicas', ['tarea'],
+    buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, 1800),
+)
+
+
+def registrar_escaneo(resultado):
+    """``resultado``: 'valido', 'usado', 'vencido', 'inexistente', ..."""
+    escaneos.inc(resultado=resultado)
+
+
+def registrar_cache(cache, acierto):
+    cache_consultas.inc(cache=cache, resultado='acierto' if acierto else 'fallo')
+
+
+# Persistencia por proceso
+
+_ultimo_volcado = 0.0
+_propio = None  # (pid, archivo): se recalcula si el proceso se bifurcó
+
+
+def _archivo_propio():
+    global _propio
+    pid = os.getpid()
+    if _propio is None or _propio[0] != pid:
+        _propio = (pid, DIRECTORIO / f'{pid}-{uuid.uuid4().hex[:8]}.json')
+    return _propio[1]
+
+
+def _pid(archivo):
+    try:
+        return int(archivo.stem.split('-')[0])
+    except ValueError:
+        return None
+
+
+def _estado():
+    with _lock:
+        return {
+            nombre: [[list(clave), valor] for clave, valor in metrica.valores.items()]
+            for nombre, metrica in _metricas.items()
+        }
+
+
+def volcar():
+    global _ultimo_volcado
+    _ultimo_volcado = time.monotonic()
+    DIRECTORIO.mkdir(parents=True, exist_ok=True)
+    _escribir(_archivo_propio(), _estado())
+
+
+def _escribir(destino, datos):
+    temporal = destino.with_suffix('.tmp')
+    temporal.write_text(json.dumps(datos))
+    os.replace(temporal, destino)
+
+
+def volcar_si_corresponde():
+    if time.monotonic() - _ultimo_volcado >= INTERVALO:
+        try:
+            volcar()
+        except OSError:
+            pass
+
+
+@atexit.register
+def _volcar_al_salir():
+    if not any(metrica.valores for metrica in _metricas.values()):
+        return
+    try:
+        volcar()
+    except OSError:
+        pass
+
+
+def _proceso_vivo(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _leer(archivo):
+    try:
+        return json.loads(archivo.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _sumar(total, datos, con_gauges=True):
+    for nombre, valores in datos.items():
+        metrica = _metricas.get(nombre)
+        if metrica is None or (metrica.tipo == 'gauge' and not con_gauges):
+            continue
+        acumulado = total.setdefault(nombre, {})
+        for clave, valor in valores:
+            clave = tuple(clave)
+            if metrica.tipo == 'histogram':
+                previo = acumulado.get(clave)
+                acumulado[clave] = [a + b for a, b in zip(previo, valor)] if previo else list(valor)
+            else:
+                acumulado[clave] = acumulado.get(clave, 0) + valor
+
+
+def _plegar_terminados():
+    """Suma los archivos de procesos muertos a ``terminados.json`` y los borra"""
+    if fcntl is None or not DIRECTORIO.is_dir():
+        return
+    with open(DIRECTORIO / '.lock', 'w') as lock:
+        # Dos lecturas a la vez no pueden plegar el mismo archivo dos veces
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        muertos = [
+            archivo for archivo in DIRECTORIO.glob('*.json')
+            if archivo.name != TERMINADOS and _pid(archivo) is not None and not _proceso_vivo(_pid(archivo))
+        ]
+        if not muertos:
+            return
+        total = {}
+        _sumar(total, _leer(DIRECTORIO / TERMINADOS) or {}, con_gauges=False)
+        for archivo in muertos:
+            _sumar(total, _leer(archivo) or {}, con_gauges=False)
+        _escribir(DIRECTORIO / TERMINADOS, {
+            nombre: [[list(clave), valor] for clave, valor in valores.items()]
+            for nombre, valores in total.items()
+        })
+        for archivo in muertos:
+            archivo.unlink(missing_ok=True)
+
+
+def _agregado():
+    _plegar_terminados()
+    propio = _archivo_propio()
+    total = {nombre: {} for nombre in _metricas}
+    # Este proceso desde la memoria: su archivo puede estar atrasado
+    _sumar(total, _estado())
+    for archivo in DIRECTORIO.glob('*.json') if DIRECTORIO.is_dir() else ():
+        if archivo == propio:
+            continue
+        datos = _leer(archivo)
+        if datos is None:
+            continue
+        pid = _pid(archivo)
+        # terminados.json y los muertos que no se pudieron plegar: sin gauges
+        _sumar(total, datos, con_gauges=pid is not None and _proceso_vivo(pid))
+    return total
+
+
+def _etiquetas(nombres, valores, extra=()):
+    pares = list(zip(nombres, valores)) + list(extra)
+    if not pares:
+        return ''
+    escapar = lambda v: str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{n}="{escapar(v)}"' for n, v in pares) + '}'
+
+
+def exponer():
+    """Texto en formato de exposición de Prometheus 0.0.4 con todos los procesos"""
+    lineas = []
+    for nombre, valores in _agregado().items():
+        metrica = _metricas[nombre]
+        lineas.append(f'# HELP {nombre} {metrica.ayuda}')
+        lineas.append(f'# TYPE {nombre} {metrica.tipo}')
+        for clave, valor in sorted(valores.items()):
+            if metrica.tipo != 'histogram':
+                lineas.append(f'{nombre}{_etiquetas(metrica.etiquetas, clave)} {valor}')
+                continue
+            acumulado = 0
+            for limite, conteo in zip(metrica.buckets + ('+Inf',), valor[:-1]):
+                acumulado += conteo
+                lineas.append(
+                    f'{nombre}_bucket{_etiquetas(metrica.etiquetas, clave, [("le", limite)])} {acumulado}'
+                )
+            lineas.append(f'{nombre}_sum{_etiquetas(metrica.etiquetas, clave)} {valor[-1]}')
+            lineas.append(f'{nombre}_count{_etiquetas(metrica.etiquetas, clave)} {acumulado}')
+    return '\n'.join(lineas) + '\n'
@@ -0,0 +1,156 @@
+import json
+import logging
+import random
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+
+from . import consultas, metricas
+from .medicion import Medicion, medicion_actual, wrapper_sql
+
+logger = logging.getLogger('rendimiento')
+
+MUESTREO = getattr(settings, 'RENDIMIENTO_MUESTREO', 0.1)
+# Umbral en ms por nombre de vista (``view_name`` del resolver) y 'default'
+UMBRALES = getattr(settings, 'RENDIMIENTO_UMBRALES', {'default': 1000})
+
+
+class MedicionMiddleware:
+    """
+    Mide cada request y agrega un header ``Server-Timing`` (en DEBUG o para
+    staff) con el tiempo de SQL, templates y total. Deja una línea JSON en el
+    logger ``rendimiento`` para una muestra de los requests, y siempre que se
+    supera el umbral de la vista, junto con las consultas más lentas.
+    También alimenta las métricas de ``rendimiento.metricas`` (``/metrics``).
+    Conviene ubicarlo primero en ``MIDDLEWARE``. Soporta ASGI y vistas async.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        medicion, token = self.iniciar()
+        stack = self.instrumentar()
+        try:
+            response = self.get_response(request)
+        finally:
+            stack.close()
+            self.terminar(token)
+        self.finalizar(request, response, medicion, medicion.total)
+        return response
+
+    async def __acall__(self, request):
+        medicion, token = self.iniciar()
+        # Las conexiones son por hilo: el ORM async consulta desde el hilo de sync_to_async
+        stack = await sync_to_async(self.instrumentar)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(stack.close)()
+            self.terminar(token)
+        total = medicion.total
+        # Server-Timing lee request.user, que puede consultar la base
+        await sync_to_async(self.finalizar)(request, response, medicion, total)
+        return response
+
+    def iniciar(self):
+        medicion = Medicion()
+        if consultas.DETECTAR or consultas.PRESUPUESTOS:
+            medicion.huellas = consultas.Huellas()
+        metricas.requests_en_curso.inc()
+        return medicion, medicion_actual.set(medicion)
+
+    def instrumentar(self):
+        """Envuelve las conexiones del hilo actual; devuelve el ``ExitStack`` que las libera"""
+        metricas.conexiones_db.inc(reutilizada='si' if connections['default'].connection else 'no')
+        stack = ExitStack()
+        for alias in connections:
+            stack.enter_context(connections[alias].execute_wrapper(wrapper_sql))
+        return stack
+
+    def terminar(self, token):
+        medicion_actual.reset(token)
+        metricas.requests_en_curso.dec()
+
+    def finalizar(self, request, response, medicion, total):
+        self.agregar_server_timing(request, response, medicion, total)
+        self.registrar(request, response, medicion, total)
+        self.observar(request, response, medicion, total)
+        self.controlar_consultas(request, medicion)
+
+    def controlar_consultas(self, request, medicion):
+        if medicion.huellas is None:
+            return
+        match = getattr(request, 'resolver_match', None)
+        vista = match.view_name if match else None
+
+        repetidas = medicion.huellas.repetidas() if consultas.DETECTAR else []
+        for repetida in repetidas:
+            logger.warning(json.dumps({'nmas1': vista, 'ruta': request.path, **repetida}, ensure_ascii=False))
+
+        limite = consultas.presupuesto(vista)
+        if limite is None or medicion.consultas <= limite:
+            return
+        mensaje = f'{vista}: {medicion.consultas} consultas, presupuesto {limite}'
+        if consultas.ESTRICTO:
+            detalle = ''.join(
+                f'\n  {r["veces"]}x {r["template"] or r["origen"]}: {r["sql"][:200]}'
+                for r in medicion.huellas.repetidas(umbral=2)
+            )
+            raise consultas.PresupuestoConsultasExcedido(mensaje + detalle)
+        logger.warning(mensaje)
+
+    def observar(self, request, response, medicion, total):
+        match = getattr(request, 'resolver_match', None)
+        vista = match.view_name if match else 'sin_ruta'
+        metricas.duracion_requests.observar(total, vista=vista)
+        metricas.consultas_sql.observar(medicion.consultas, vista=vista)
+        metricas.requests_total.inc(vista=vista, estado=response.status_code)
+        metricas.volcar_si_corresponde()
+
+    def agregar_server_timing(self, request, response, medicion, total):
+        usuario = getattr(request, 'user', None)
+        if not (settings.DEBUG or (usuario is not None and usuario.is_staff)):
+            return
+        python = max(total - medicion.tiempo_sql - medicion.tiempo_templates, 0)
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={medicion.tiempo_sql * 1000:.1f};desc="SQL ({medicion.consultas})"',
+            f'tpl;dur={medicion.tiempo_templates * 1000:.1f};desc="Templates"',
+            f'py;dur={python * 1000:.1f};desc="Python"',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+    def registrar(self, request, response, medicion, total):
+        match = getattr(request, 'resolver_match', None)
+        vista = match.view_name if match else None
+        umbral = UMBRALES.get(vista, UMBRALES.get('default'))
+        lento = umbral is not None and total * 1000 > umbral
+
+        if not lento and random.random() >= MUESTREO:
+            return
+
+        datos = {
+            'vista': vista,
+            'metodo': request.method,
+            'ruta': request.path,
+            'estado': response.status_code,
+            'total_ms': round(total * 1000, 1),
+            'sql_ms': round(medicion.tiempo_sql * 1000, 1),
+            'consultas': medicion.consultas,
+            'templates_ms': round(medicion.tiempo_templates * 1000, 1),
+        }
+        if lento:
+            datos['umbral_ms'] = umbral
+            datos['consultas_lentas'] = medicion.consultas_lentas()
+            logger.warning(json.dumps(datos, ensure_ascii=False))
+        else:
+            logger.info(json.dumps(datos, ensure_ascii=False))
@@ -0,0 +1,96 @@
+"""
+Comparación de servidores de aplicación con la misma carga de ``simular_carga``.
+
+Levanta cada servidor como subproceso sobre la base configurada (mod_wsgi con
+``procesos`` x ``hilos``, uvicorn con ``procesos`` workers sobre
+``src.asgi``), corre la simulación en modo ``url`` contra él y lo detiene.
+Los servidores que no están instalados se omiten. Requiere un sistema POSIX.
+"""
+import os
+import shutil
+import signal
+import subprocess
+import time
+import urllib.error
+import urllib.request
+
+from django.conf import settings
+
+from .carga import Simulacion
+
+SERVIDORES = {
+    'mod_wsgi': [
+        'mod_wsgi-express', 'start-server', 'src/wsgi.py', '--port', '{puerto}',
+        '--processes', '{procesos}', '--threads', '{hilos}', '--python-path', '{base}',
+        '--log-to-terminal',
+    ],
+    'uvicorn': [
+        'uvicorn', 'src.asgi:application', '--port', '{puerto}', '--workers', '{procesos}',
+        '--log-level', 'warning',
+    ],
+}
+
+
+def disponibles(nombres=None):
+    """Servidores pedidos cuyo ejecutable está en el PATH"""
+    return [nombre for nombre in nombres or SERVIDORES if shutil.which(SERVIDORES[nombre][0])]
+
+
+def _esperar(url, limite):
+    fin = time.monotonic() + limite
+    while time.monotonic() < fin:
+        try:
+            urllib.request.urlopen(url, timeout=1)
+            return True
+        except urllib.error.HTTPError:
+            return True  # responde, aunque sea con error
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+class Servidor:
+    def __init__(self, nombre, puerto, procesos=2, hilos=5, registro=None):
+        self.nombre = nombre
+        self.puerto = puerto
+        self.url = f'http://127.0.0.1:{puerto}'
+        self.comando = [
+            parte.format(puerto=puerto, procesos=procesos, hilos=hilos, base=settings.BASE_DIR)
+            for parte in SERVIDORES[nombre]
+        ]
+        self.registro = registro if registro is not None else subprocess.DEVNULL
+        self.proceso = None
+
+    def __enter__(self):
+        entorno = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'src.settings')}
+        self.proceso = subprocess.Popen(
+            self.comando, cwd=settings.BASE_DIR, env=entorno, stdout=self.registro, stderr=subprocess.STDOUT,
+            start_new_session=True,
+        )
+        if not _esperar(self.url + '/', limite=30):
+            self.__exit__(None, None, None)
+            raise RuntimeError(f'{self.nombre} no respondió en {self.url}')
+        return self
+
+    def __exit__(self, *exc):
+        if self.proceso and self.proceso.poll() is None:
+            # Al grupo entero: uvicorn y mod_wsgi dejan procesos hijos
+            os.killpg(self.proceso.pid, signal.SIGTERM)
+            try:
+                self.proceso.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                os.killpg(self.proceso.pid, signal.SIGKILL)
+                self.proceso.wait()
+
+
+def comparar_servidores(nombres, puerto=8760, procesos=2, hilos=5, registro=None, **carga):
+    """
+    Corre la misma simulación contra cada servidor; ``carga`` son los argumentos
+    de ``Simulacion`` (usuarios, mezcla, duracion, pensar, rampa, semilla).
+    """
+    resultados = {}
+    for desplazamiento, nombre in enumerate(nombres):
+        with Servidor(nombre, puerto + desplazamiento, procesos, hilos, registro=registro) as servidor:
+            resultados[nombre] = Simulacion(modo='url', url=servidor.url, **carga).ejecutar()
+    return resultados
+
@@ -0,0 +1,47 @@
+import time
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from comedor.models import Ticket
+
+from . import metricas
+
+
+@receiver(connection_created)
+def contar_conexion(sender, connection, **kwargs):
+    metricas.conexiones_creadas.inc(alias=connection.alias)
+
+
+@receiver(connection_created)
+def configurar_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for pragma, valor in getattr(settings, 'SQLITE_PRAGMAS', {}).items():
+            cursor.execute(f'PRAGMA {pragma} = {valor}')
+
+
+@receiver(post_save, sender=Ticket)
+def contar_ticket(sender, instance, created, **kwargs):
+    if created:
+        metricas.tickets_emitidos.inc(estado=instance.estado)
+
+
+def instrumentar_qr():
+    """Mide ``Ticket.generar_qr`` sin tocar el modelo"""
+    if getattr(Ticket.generar_qr, '_instrumentado', False):
+        return
+    generar_original = Ticket.generar_qr
+
+    def generar_qr(self, *args, **kwargs):
+        inicio = time.perf_counter()
+        try:
+            return generar_original(self, *args, **kwargs)
+        finally:
+            metricas.duracion_qr.observar(time.perf_counter() - inicio)
+
+    generar_qr._instrumentado = True
+    Ticket.generar_qr = generar_qr
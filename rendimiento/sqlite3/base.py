@@ -0,0 +1,15 @@
+"""
+Backend SQLite que abre las transacciones con ``BEGIN IMMEDIATE``.
+
+Con ``BEGIN`` (deferred) una transacción que primero lee y después escribe
+pide el lock de escritura a mitad de camino; si otra conexión escribió en el
+medio, SQLite falla con "database is locked" sin esperar ``busy_timeout``.
+Tomando el lock al comenzar, las escrituras concurrentes esperan su turno.
+Es el ``transaction_mode`` que Django agrega en 5.1.
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN IMMEDIATE')
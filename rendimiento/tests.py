@@ -0,0 +1,93 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db.models import Count
+from django.test import TestCase
+from django.urls import reverse
+
+from comedor.models import Ticket
+from persona.models import PersonaEstudiante
+from salud.models import CoberturaSalud
+
+from . import consultas
+
+
+class PresupuestoConsultasTests(TestCase):
+    """Cada vista de ``PRESUPUESTO_CONSULTAS`` responde dentro de su presupuesto (``src.settings_test``)"""
+
+    VISTAS = {
+        'comprar_tickets', 'generar_ticket_gratuito', 'mis_tickets', 'detalle_ticket', 'carrousel',
+        'panel_admin', 'listar_beneficiarios', 'detalle_beneficiario', 'listar_becas', 'salud:dashboard',
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('create_test_users', scale=30, stdout=StringIO())
+        usuarios = get_user_model().objects
+        cls.admin = usuarios.get(email='admin.comedor@comedor.uncu.edu.ar')
+        cls.becado = usuarios.get(email='estudiante1@comedor.uncu.edu.ar')
+        cls.con_descuento = usuarios.get(email='estudiante3@comedor.uncu.edu.ar')
+        # Los casos con más filas, que es donde aparecen los N+1
+        mas_tickets = Ticket.objects.values('usuario').annotate(total=Count('id')).order_by('-total')[0]
+        cls.con_tickets = usuarios.get(pk=mas_tickets['usuario'])
+        cls.ticket = Ticket.objects.filter(usuario=cls.con_tickets).latest('id')
+        cls.beneficiario = PersonaEstudiante.objects.annotate(total=Count('becas')).latest('total')
+        cls.con_cobertura = CoberturaSalud.objects.exclude(persona__usuario=None).latest('id').persona.usuario
+
+    def setUp(self):
+        # Sin caché se mide el peor caso
+        caches['default'].clear()
+        caches['local'].clear()
+
+    def pedir(self, usuario, vista, *args):
+        if usuario:
+            self.client.force_login(usuario)
+        respuesta = self.client.get(reverse(vista, args=args))
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta
+
+    def test_modo_estricto_activo(self):
+        self.assertTrue(consultas.ESTRICTO)
+
+    def test_todas_las_vistas_con_presupuesto_se_prueban(self):
+        self.assertEqual(set(consultas.PRESUPUESTOS), self.VISTAS)
+
+    def test_comprar_tickets(self):
+        self.pedir(self.con_descuento, 'comprar_tickets')
+
+    def test_generar_ticket_gratuito(self):
+        self.pedir(self.becado, 'generar_ticket_gratuito')
+
+    def test_mis_tickets(self):
+        self.pedir(self.con_tickets, 'mis_tickets')
+
+    def test_detalle_ticket(self):
+        self.pedir(self.con_tickets, 'detalle_ticket', self.ticket.pk)
+
+    def test_carrousel(self):
+        self.pedir(None, 'carrousel')
+
+    def test_panel_admin(self):
+        self.pedir(self.admin, 'panel_admin')
+
+    def test_listar_beneficiarios(self):
+        self.pedir(self.admin, 'listar_beneficiarios')
+
+    def test_detalle_beneficiario(self):
+        self.pedir(self.admin, 'detalle_beneficiario', self.beneficiario.pk)
+
+    def test_listar_becas(self):
+        self.pedir(self.admin, 'listar_becas')
+
+    def test_salud_dashboard(self):
+        self.pedir(self.con_cobertura, 'salud:dashboard')
+
+    def test_exceder_el_presupuesto_levanta(self):
+        self.client.force_login(self.admin)
+        with mock.patch.dict(consultas.PRESUPUESTOS, {'listar_becas': 1}), \
+                mock.patch.object(consultas, 'ESTRICTO', True):
+            with self.assertRaises(consultas.PresupuestoConsultasExcedido):
+                self.client.get(reverse('listar_becas'))
@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.views.decorators.http import require_GET
+
+from .metricas import exponer
+
+IPS_PERMITIDAS = getattr(settings, 'RENDIMIENTO_METRICAS_IPS', ['127.0.0.1', '::1'])
+
+
+@require_GET
+def metricas(request):
+    """Métricas en formato Prometheus, para las IPs del scraper o usuarios staff"""
+    ip = request.META.get('REMOTE_ADDR')
+    if ip not in IPS_PERMITIDAS and not request.user.is_staff:
+        return HttpResponseForbidden()
+    return HttpResponse(exponer(), content_type='text/plain; version=0.0.4; charset=utf-8')
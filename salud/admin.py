@@ -1,11 +1,15 @@
 from django.contrib import admin
+from django.urls import reverse
+from django.utils.html import format_html
 
+from .calendario import rotar_token, token_calendario
 from .models import (
     PrestadorSalud,
     PlanSalud,
     CoberturaSalud,
     PagoSalud,
     RegistroIntegracion,
+    ResumenIntegracion,
     IntegracionPrestadorSalud,
     AfiliacionSalud,
     TurnoSalud,
@@ -15,9 +19,21 @@ from .models import (
 
 @admin.register(PrestadorSalud)
 class PrestadorSaludAdmin(admin.ModelAdmin):
-    list_display = ("nombre", "codigo", "activo")
+    list_display = ("nombre", "codigo", "activo", "calendario")
     search_fields = ("nombre", "codigo")
     list_filter = ("activo",)
+    actions = ("rotar_calendario",)
+
+    @admin.action(description="Rotar la URL del calendario de turnos")
+    def rotar_calendario(self, request, queryset):
+        for prestador in queryset:
+            rotar_token("prestador", prestador.pk)
+        self.message_user(request, f"Se rotó el calendario de {queryset.count()} prestador(es).")
+
+    @admin.display(description="Calendario de turnos")
+    def calendario(self, obj):
+        url = reverse("salud:calendario_prestador", args=[token_calendario("prestador", obj.pk)])
+        return format_html('<a href="{}">.ics</a>', url)
 
 
 @admin.register(PlanSalud)
@@ -27,11 +43,34 @@ class PlanSaludAdmin(admin.ModelAdmin):
     list_filter = ("activo", "prestador")
 
 
+class VigenciaFilter(admin.SimpleListFilter):
+    title = "vigencia"
+    parameter_name = "vigente"
+
+    def lookups(self, request, model_admin):
+        return (("si", "Vigente"), ("no", "No vigente"))
+
+    def queryset(self, request, queryset):
+        if self.value() == "si":
+            return queryset.vigentes()
+        if self.value() == "no":
+            return queryset.no_vigentes()
+        return queryset
+
+
 @admin.register(CoberturaSalud)
 class CoberturaSaludAdmin(admin.ModelAdmin):
-    list_display = ("persona", "plan", "fecha_inicio", "fecha_fin", "activa", "esta_vigente")
+    list_display = ("persona", "plan", "fecha_inicio", "fecha_fin", "activa", "vigente")
     search_fields = ("persona__nombre", "persona__apellido", "plan__nombre")
-    list_filter = ("activa", "plan__prestador")
+    list_filter = (VigenciaFilter, "activa", "plan__prestador")
+    list_select_related = ("persona", "plan")
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).con_vigencia()
+
+    @admin.display(boolean=True, ordering="vigente", description="Vigente")
+    def vigente(self, obj):
+        return obj.vigente
 
 
 @admin.register(PagoSalud)
@@ -48,6 +87,13 @@ class RegistroIntegracionAdmin(admin.ModelAdmin):
     search_fields = ("prestador__nombre", "persona__nombre", "persona__apellido")
 
 
+@admin.register(ResumenIntegracion)
+class ResumenIntegracionAdmin(admin.ModelAdmin):
+    list_display = ("persona", "prestador", "estado", "endpoint", "fecha")
+    list_filter = ("estado", "prestador")
+    search_fields = ("prestador__nombre", "persona__nombre", "persona__apellido")
+
+
 @admin.register(IntegracionPrestadorSalud)
 class IntegracionPrestadorSaludAdmin(admin.ModelAdmin):
     list_display = ("prestador", "auth_tipo", "base_url", "activo", "ultima_sincronizacion")
@@ -0,0 +1,153 @@
+"""
+Feeds iCalendar (``.ics``) de ``TurnoSalud``.
+
+Cada persona y cada prestador tiene una URL con un token firmado
+(``django.core.signing``), así los clientes de calendario pueden suscribirse
+sin sesión. El token lleva la versión de ``VersionCalendario``: rotarla
+invalida las URLs ya compartidas. El feed cubre una ventana de fechas sobre los índices
+``(persona, fecha_hora)`` / ``(prestador, fecha_hora)`` y se genera de a
+líneas, sin armar el archivo completo en memoria.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.db.models import Count, F, Max
+from django.utils import timezone
+
+from .models import TurnoSalud, VersionCalendario
+
+SALT = 'salud.calendario'
+DIAS_ATRAS = getattr(settings, 'SALUD_CALENDARIO_DIAS_ATRAS', 30)
+DIAS_ADELANTE = getattr(settings, 'SALUD_CALENDARIO_DIAS_ADELANTE', 365)
+DURACION_TURNO = timedelta(minutes=getattr(settings, 'SALUD_CALENDARIO_DURACION_MINUTOS', 30))
+
+ESTADOS_ICS = {
+    'pendiente': 'TENTATIVE',
+    'confirmado': 'CONFIRMED',
+    'atendido': 'CONFIRMED',
+    'cancelado': 'CANCELLED',
+}
+
+
+def _version(tipo, pk):
+    return (
+        VersionCalendario.objects
+        .filter(tipo=tipo, objeto_id=pk)
+        .values_list('version', flat=True)
+        .first()
+    ) or 0
+
+
+def token_calendario(tipo, pk):
+    """Token firmado para ``tipo`` 'persona' o 'prestador'"""
+    return signing.Signer(salt=SALT).sign(f'{tipo}:{pk}:{_version(tipo, pk)}')
+
+
+def rotar_token(tipo, pk):
+    """Sube la versión del token; devuelve el token nuevo"""
+    VersionCalendario.objects.get_or_create(tipo=tipo, objeto_id=pk)
+    VersionCalendario.objects.filter(tipo=tipo, objeto_id=pk).update(version=F('version') + 1)
+    return token_calendario(tipo, pk)
+
+
+def leer_token(token, tipo):
+    """Devuelve el pk del token o ``None`` si la firma, el tipo o la versión no coinciden"""
+    try:
+        valor = signing.Signer(salt=SALT).unsign(token)
+    except signing.BadSignature:
+        return None
+    # Los tokens sin versión son de antes de poder rotarlos: valen como versión 0
+    tipo_token, pk, version = (valor.split(':') + ['0'])[:3]
+    if tipo_token != tipo or not pk.isdigit() or not version.isdigit():
+        return None
+    if int(version) != _version(tipo, int(pk)):
+        return None
+    return int(pk)
+
+
+def turnos_feed(**filtros):
+    ahora = timezone.now()
+    return TurnoSalud.objects.filter(
+        fecha_hora__gte=ahora - timedelta(days=DIAS_ATRAS),
+        fecha_hora__lte=ahora + timedelta(days=DIAS_ADELANTE),
+        **filtros,
+    )
+
+
+def etag_feed(turnos):
+    """ETag a partir de la última modificación y la cantidad de turnos de la ventana"""
+    datos = turnos.order_by().aggregate(ultimo=Max('actualizado_en'), total=Count('id'))
+    ultimo = datos['ultimo'].timestamp() if datos['ultimo'] else 0
+    return f'{ultimo:.6f}-{datos["total"]}'
+
+
+def _texto(valor):
+    return (
+        str(valor)
+        .replace('\\', '\\\\')
+        .replace(';', '\\;')
+        .replace(',', '\\,')
+        .replace('\r\n', '\\n')
+        .replace('\n', '\\n')
+    )
+
+
+def _linea(contenido):
+    """Línea terminada en CRLF y plegada a 75 octetos, como pide RFC 5545"""
+    datos = contenido.encode()
+    partes = []
+    while len(datos) > 75:
+        corte = 75 if not partes else 74
+        # No partir un carácter UTF-8 multibyte
+        while corte and (datos[corte] & 0xC0) == 0x80:
+            corte -= 1
+        partes.append(datos[:corte])
+        datos = datos[corte:]
+    partes.append(datos)
+    return b'\r\n '.join(partes) + b'\r\n'
+
+
+def _fecha(valor):
+    return valor.astimezone(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def generar_ics(turnos, nombre, con_persona=False):
+    """Genera el calendario línea por línea (bytes)"""
+    yield _linea('BEGIN:VCALENDAR')
+    yield _linea('VERSION:2.0')
+    yield _linea('PRODID:-//Comedor Universitario//Turnos de Salud//ES')
+    yield _linea('CALSCALE:GREGORIAN')
+    yield _linea(f'X-WR-CALNAME:{_texto(nombre)}')
+
+    ahora = _fecha(timezone.now())
+    campos = ['id', 'fecha_hora', 'especialidad', 'profesional', 'ubicacion', 'motivo',
+              'estado', 'actualizado_en', 'prestador__nombre']
+    if con_persona:
+        campos += ['persona__nombre', 'persona__apellido']
+
+    for turno in turnos.order_by('fecha_hora').values(*campos).iterator(chunk_size=500):
+        resumen = turno['especialidad']
+        if con_persona:
+            resumen = f'{resumen} - {turno["persona__apellido"]}, {turno["persona__nombre"]}'
+        descripcion = '\n'.join(filter(None, [
+            turno['prestador__nombre'],
+            turno['profesional'],
+            turno['motivo'],
+        ]))
+
+        yield _linea('BEGIN:VEVENT')
+        yield _linea(f'UID:turno-{turno["id"]}@salud')
+        yield _linea(f'DTSTAMP:{ahora}')
+        yield _linea(f'LAST-MODIFIED:{_fecha(turno["actualizado_en"])}')
+        yield _linea(f'DTSTART:{_fecha(turno["fecha_hora"])}')
+        yield _linea(f'DTEND:{_fecha(turno["fecha_hora"] + DURACION_TURNO)}')
+        yield _linea(f'SUMMARY:{_texto(resumen)}')
+        if descripcion:
+            yield _linea(f'DESCRIPTION:{_texto(descripcion)}')
+        if turno['ubicacion']:
+            yield _linea(f'LOCATION:{_texto(turno["ubicacion"])}')
+        yield _linea(f'STATUS:{ESTADOS_ICS.get(turno["estado"], "TENTATIVE")}')
+        yield _linea('END:VEVENT')
+
+    yield _linea('END:VCALENDAR')
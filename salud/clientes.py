@@ -0,0 +1,145 @@
+"""
+Cliente HTTP para las APIs de los prestadores de salud.
+
+Cada ``IntegracionPrestadorSalud`` tiene su propia ``requests.Session`` con un
+pool de conexiones keep-alive del tamaño de la cantidad de hilos de
+sincronización, de modo que los workers reutilizan las conexiones TCP/TLS en
+lugar de abrir una por pedido.
+
+Contrato esperado del prestador::
+
+    GET {base_url}/personas/{documento}
+    {
+        "afiliacion": {"numero_afiliado", "plan", "estado", "fecha_inicio", "fecha_fin"} | null,
+        "turnos": [{"id", "fecha_hora", "especialidad", "profesional", "ubicacion", "motivo", "estado"}],
+        "atenciones": [{"id", "fecha", "especialidad", "profesional", "diagnostico",
+                        "tratamiento", "observaciones", "turno_id"}]
+    }
+
+    GET {base_url}/cambios?desde=<ISO 8601>&cursor=<cursor>&limite=<n>
+    {
+        "resultados": [{"documento", "afiliacion", "turnos", "atenciones"}],
+        "siguiente": "<cursor de la próxima página>" | null
+    }
+"""
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .excepciones import ErrorPrestador
+from .resiliencia import estado_prestador
+from .tokens import gestor_tokens
+
+
+class ClientePrestador:
+    def __init__(self, integracion, tamano_pool=10):
+        self.integracion = integracion
+        self.base_url = integracion.base_url.rstrip('/')
+        self.timeout = integracion.timeout_segundos
+        self.estado = estado_prestador(integracion.prestador)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=tamano_pool)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({'Accept': 'application/json'})
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cerrar()
+
+    def cerrar(self):
+        self.session.close()
+
+    def headers_autenticacion(self):
+        integracion = self.integracion
+        if integracion.auth_tipo == 'api_key' and integracion.api_key_header:
+            return {integracion.api_key_header: integracion.api_key_value}
+        if integracion.auth_tipo == 'bearer':
+            return {'Authorization': f'Bearer {integracion.api_key_value}'}
+        if integracion.auth_tipo == 'oauth2':
+            return {'Authorization': f'Bearer {gestor_tokens.obtener(integracion)}'}
+        return {}
+
+    def get(self, ruta, params=None):
+        """Hace un GET a la API del prestador y devuelve el JSON decodificado"""
+        url = f'{self.base_url}/{ruta.lstrip("/")}'
+        estado = self.estado
+        estado.interruptor.permitir()
+        estado.limitador.adquirir()
+
+        inicio = time.monotonic()
+        try:
+            respuesta = self._pedir(url, params)
+            if respuesta.status_code == 401 and self.integracion.auth_tipo == 'oauth2':
+                # Token revocado antes de tiempo: pedir uno nuevo y reintentar una vez
+                gestor_tokens.invalidar(self.integracion)
+                respuesta = self._pedir(url, params)
+        except requests.Timeout as e:
+            self._fallo('timeout', e)
+            raise ErrorPrestador(f'{url}: timeout ({self.timeout}s)') from e
+        except requests.RequestException as e:
+            self._fallo('conexion', e)
+            raise ErrorPrestador(f'{url}: {e}') from e
+        except ErrorPrestador as e:
+            self._fallo('token', e)
+            raise
+        finally:
+            estado.latencias.observar((time.monotonic() - inicio) * 1000)
+
+        if respuesta.status_code >= 500:
+            self._fallo(f'http_{respuesta.status_code}', f'HTTP {respuesta.status_code}')
+            raise ErrorPrestador(f'{url}: HTTP {respuesta.status_code}')
+
+        # El prestador respondió: los errores 4xx son del pedido, no del servicio
+        estado.interruptor.registrar_exito()
+
+        if respuesta.status_code == 404:
+            return None
+        if respuesta.status_code >= 400:
+            estado.registrar_error(f'http_{respuesta.status_code}')
+            raise ErrorPrestador(f'{url}: HTTP {respuesta.status_code}')
+
+        try:
+            return respuesta.json()
+        except ValueError as e:
+            estado.registrar_error('json')
+            raise ErrorPrestador(f'{url}: respuesta no es JSON') from e
+
+    def _pedir(self, url, params):
+        return self.session.get(
+            url,
+            params=params,
+            headers=self.headers_autenticacion(),
+            timeout=self.timeout,
+        )
+
+    def _fallo(self, tipo, motivo):
+        self.estado.registrar_error(tipo)
+        self.estado.interruptor.registrar_fallo(motivo)
+
+    def datos_persona(self, documento):
+        """Afiliación, turnos y atenciones de una persona en el prestador"""
+        return self.get(f'personas/{documento}')
+
+    def paginas_cambios(self, desde=None, cursor=None, limite=200):
+        """
+        Recorre las páginas de personas con cambios desde ``desde``.
+        Cada página se pide recién cuando se consumió la anterior.
+        """
+        while True:
+            params = {'limite': limite}
+            if desde:
+                params['desde'] = desde.isoformat()
+            if cursor:
+                params['cursor'] = cursor
+
+            pagina = self.get('cambios', params=params) or {}
+            yield pagina
+
+            cursor = pagina.get('siguiente')
+            if not cursor:
+                break
@@ -0,0 +1,180 @@
+"""
+Conciliación de ``PagoSalud`` pendientes contra extractos bancarios o del
+procesador de pagos.
+
+El extracto se lee línea por línea (CSV o ancho fijo) y se cruza contra un
+diccionario en memoria de los pagos pendientes indexados por
+``referencia_pago``: un hash join, sin consultas por línea. Los pagos que
+coinciden se marcan ``pagado`` con UPDATEs agrupados por fecha de pago.
+"""
+import csv
+from datetime import datetime, time
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import PagoSalud
+
+# Posiciones (desde, hasta) por defecto para extractos de ancho fijo
+CAMPOS_ANCHO_FIJO = {
+    'referencia': (0, 30),
+    'monto': (30, 45),
+    'fecha': (45, 55),
+}
+
+FORMATOS_FECHA = ('%Y-%m-%d', '%d/%m/%Y', '%Y%m%d')
+
+
+def _monto(valor):
+    valor = valor.strip().replace('$', '').replace(' ', '')
+    if ',' in valor:
+        # Formato local: 1.234,56
+        valor = valor.replace('.', '').replace(',', '.')
+    try:
+        return Decimal(valor)
+    except InvalidOperation:
+        raise ValueError(f'monto inválido: {valor!r}')
+
+
+def _fecha(valor):
+    valor = valor.strip()
+    for formato in FORMATOS_FECHA:
+        try:
+            return timezone.make_aware(datetime.combine(datetime.strptime(valor, formato).date(), time(12)))
+        except ValueError:
+            continue
+    raise ValueError(f'fecha inválida: {valor!r}')
+
+
+def leer_csv(archivo, delimitador=','):
+    """Genera (línea, referencia, monto, fecha) desde un CSV con encabezado referencia,monto,fecha"""
+    lector = csv.DictReader(archivo, delimiter=delimitador)
+    for numero, fila in enumerate(lector, start=2):
+        yield numero, fila.get('referencia') or '', fila.get('monto') or '', fila.get('fecha') or ''
+
+
+def leer_ancho_fijo(archivo, campos=None):
+    campos = campos or CAMPOS_ANCHO_FIJO
+    for numero, linea in enumerate(archivo, start=1):
+        if not linea.strip():
+            continue
+        yield numero, *(linea[desde:hasta] for desde, hasta in (
+            campos['referencia'], campos['monto'], campos['fecha']
+        ))
+
+
+class Conciliador:
+    def __init__(self, tamano_lote=1000, simular=False):
+        self.tamano_lote = tamano_lote
+        self.simular = simular
+        self.excepciones = []
+        self.conciliados = 0
+        self.lineas = 0
+        self._por_fecha = {}
+        self._pendientes_lote = 0
+
+        # Índice en memoria de los pagos pendientes: referencia -> [(id, monto)]
+        self.pendientes = {}
+        consulta = (
+            PagoSalud.objects
+            .filter(estado='pendiente')
+            .exclude(referencia_pago__isnull=True)
+            .exclude(referencia_pago='')
+            .values_list('id', 'referencia_pago', 'monto')
+        )
+        for pago_id, referencia, monto in consulta.iterator(chunk_size=5000):
+            self.pendientes.setdefault(referencia.strip(), []).append((pago_id, monto))
+
+    def excepcion(self, linea, referencia, motivo, detalle=''):
+        self.excepciones.append({
+            'linea': linea,
+            'referencia': referencia,
+            'motivo': motivo,
+            'detalle': detalle,
+        })
+
+    def conciliar(self, filas):
+        vistos = set()
+        no_encontrados = {}
+
+        with transaction.atomic():
+            for linea, referencia, monto, fecha in filas:
+                self.lineas += 1
+                referencia = referencia.strip()
+
+                try:
+                    monto = _monto(monto)
+                    fecha = _fecha(fecha)
+                except ValueError as e:
+                    self.excepcion(linea, referencia, 'linea_invalida', str(e))
+                    continue
+
+                if referencia in vistos:
+                    self.excepcion(linea, referencia, 'duplicada_en_extracto')
+                    continue
+                vistos.add(referencia)
+
+                candidatos = self.pendientes.get(referencia)
+                if not candidatos:
+                    no_encontrados[referencia] = linea
+                    continue
+                if len(candidatos) > 1:
+                    self.excepcion(linea, referencia, 'referencia_ambigua',
+                                   f'{len(candidatos)} pagos pendientes con la misma referencia')
+                    continue
+
+                pago_id, monto_esperado = candidatos[0]
+                if monto != monto_esperado:
+                    self.excepcion(linea, referencia, 'monto_distinto',
+                                   f'esperado {monto_esperado}, extracto {monto}')
+                    continue
+
+                self._marcar(pago_id, fecha)
+
+            self._volcar()
+
+        self._clasificar_no_encontrados(no_encontrados)
+        return self
+
+    def _marcar(self, pago_id, fecha):
+        self._por_fecha.setdefault(fecha, []).append(pago_id)
+        self._pendientes_lote += 1
+        self.conciliados += 1
+        if self._pendientes_lote >= self.tamano_lote:
+            self._volcar()
+
+    def _volcar(self):
+        if not self.simular:
+            for fecha, ids in self._por_fecha.items():
+                PagoSalud.objects.filter(id__in=ids, estado='pendiente').update(
+                    estado='pagado',
+                    fecha_pago=fecha,
+                )
+        self._por_fecha = {}
+        self._pendientes_lote = 0
+
+    def _clasificar_no_encontrados(self, no_encontrados):
+        """Distingue referencias ya pagadas de las desconocidas, con una consulta por lote"""
+        referencias = list(no_encontrados)
+        estados = {}
+        for inicio in range(0, len(referencias), self.tamano_lote):
+            estados.update(
+                PagoSalud.objects
+                .filter(referencia_pago__in=referencias[inicio:inicio + self.tamano_lote])
+                .values_list('referencia_pago', 'estado')
+            )
+
+        for referencia, linea in no_encontrados.items():
+            estado = estados.get(referencia)
+            if estado:
+                self.excepcion(linea, referencia, f'pago_{estado}', 'el pago no está pendiente')
+            else:
+                self.excepcion(linea, referencia, 'sin_pago', 'no hay pagos con esa referencia')
+
+        self.excepciones.sort(key=lambda e: e['linea'])
+
+    def escribir_reporte(self, salida):
+        escritor = csv.DictWriter(salida, fieldnames=['linea', 'referencia', 'motivo', 'detalle'])
+        escritor.writeheader()
+        escritor.writerows(self.excepciones)
@@ -0,0 +1,2 @@
+class ErrorPrestador(Exception):
+    """Error al comunicarse con la API de un prestador"""
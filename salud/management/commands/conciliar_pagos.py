@@ -0,0 +1,74 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from salud.conciliacion import CAMPOS_ANCHO_FIJO, Conciliador, leer_ancho_fijo, leer_csv
+
+
+def _campos(valor):
+    """Parsea ``referencia:0:30,monto:30:45,fecha:45:55``"""
+    campos = dict(CAMPOS_ANCHO_FIJO)
+    try:
+        for parte in valor.split(','):
+            nombre, desde, hasta = parte.split(':')
+            if nombre not in campos:
+                raise ValueError(nombre)
+            campos[nombre] = (int(desde), int(hasta))
+    except ValueError:
+        raise CommandError(f'--campos inválido: {valor!r}')
+    return campos
+
+
+class Command(BaseCommand):
+    help = 'Concilia los pagos de salud pendientes contra un extracto bancario o del procesador'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Extracto a conciliar')
+        parser.add_argument(
+            '--formato',
+            choices=['csv', 'fijo'],
+            default='csv',
+            help='csv con encabezado referencia,monto,fecha o ancho fijo',
+        )
+        parser.add_argument('--delimitador', default=',', help='Delimitador del CSV')
+        parser.add_argument(
+            '--campos',
+            help='Posiciones para ancho fijo, ej. referencia:0:30,monto:30:45,fecha:45:55',
+        )
+        parser.add_argument('--encoding', default='utf-8')
+        parser.add_argument('--reporte', help='CSV de excepciones (por defecto, salida estándar)')
+        parser.add_argument('--lote', type=int, default=1000, help='Pagos por UPDATE')
+        parser.add_argument('--simular', action='store_true', help='No marca los pagos, sólo informa')
+
+    def handle(self, *args, **options):
+        conciliador = Conciliador(tamano_lote=options['lote'], simular=options['simular'])
+
+        try:
+            with open(options['archivo'], encoding=options['encoding'], newline='') as archivo:
+                if options['formato'] == 'csv':
+                    filas = leer_csv(archivo, options['delimitador'])
+                else:
+                    filas = leer_ancho_fijo(archivo, _campos(options['campos']) if options['campos'] else None)
+                conciliador.conciliar(filas)
+        except OSError as e:
+            raise CommandError(f'No se pudo leer el extracto: {e}')
+        except UnicodeDecodeError as e:
+            raise CommandError(f'El extracto no está en {options["encoding"]} (probá --encoding): {e}')
+        except LookupError:
+            raise CommandError(f'--encoding desconocido: {options["encoding"]!r}')
+        except ValueError as e:
+            raise CommandError(f'Extracto inválido: {e}')
+
+        if options['reporte']:
+            with open(options['reporte'], 'w', newline='', encoding='utf-8') as salida:
+                conciliador.escribir_reporte(salida)
+        elif conciliador.excepciones:
+            conciliador.escribir_reporte(self.stdout)
+
+        prefijo = '[simulación] ' if options['simular'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'  ✓ {prefijo}{conciliador.lineas} líneas leídas, {conciliador.conciliados} pagos conciliados'
+        ))
+        if conciliador.excepciones:
+            self.stdout.write(self.style.WARNING(
+                f'  ! {len(conciliador.excepciones)} excepciones'
+                + (f' en {options["reporte"]}' if options['reporte'] else '')
+            ))
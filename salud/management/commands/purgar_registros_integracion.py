@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from salud.registro import RETENCION_DIAS, purgar_registros
+
+
+class Command(BaseCommand):
+    help = 'Borra en lotes los registros de integración más viejos que la ventana de retención'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias',
+            type=int,
+            default=RETENCION_DIAS,
+            help=f'Días de registros a conservar (por defecto {RETENCION_DIAS}, SALUD_RETENCION_REGISTROS_DIAS)',
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=5000,
+            help='Cantidad de filas a borrar por sentencia',
+        )
+
+    def handle(self, *args, **options):
+        borrados = purgar_registros(dias=options['dias'], lote=options['lote'])
+        self.stdout.write(self.style.SUCCESS(
+            f'  ✓ {borrados} registros de integración anteriores a {options["dias"]} días eliminados'
+        ))
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from salud.stub import ServidorPrestadorStub
+
+
+class Command(BaseCommand):
+    help = 'Levanta un prestador de salud simulado para probar la sincronización localmente'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--puerto', type=int, default=8099)
+
+    def handle(self, *args, **options):
+        stub = ServidorPrestadorStub(host=options['host'], puerto=options['puerto']).iniciar()
+        self.stdout.write(self.style.SUCCESS(f'Prestador simulado escuchando en {stub.url}'))
+        self.stdout.write('Configurar ese valor como base_url de la integración. Ctrl+C para terminar.')
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            stub.detener()
+            self.stdout.write(f'{stub.pedidos} pedidos atendidos')
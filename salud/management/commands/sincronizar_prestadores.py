@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand
+
+from salud.sincronizacion import sincronizar_prestadores
+
+
+class Command(BaseCommand):
+    help = 'Sincroniza afiliaciones, turnos y atenciones desde las integraciones de prestadores activas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--prestador',
+            action='append',
+            dest='prestadores',
+            help='Código del prestador a sincronizar (puede repetirse). Por defecto, todos los activos',
+        )
+        parser.add_argument(
+            '--documento',
+            action='append',
+            dest='documentos',
+            help='Limita la sincronización a estos documentos (puede repetirse)',
+        )
+        parser.add_argument(
+            '--completa',
+            action='store_true',
+            help='Consulta persona por persona en lugar de pedir sólo los cambios desde la última marca',
+        )
+        parser.add_argument(
+            '--hilos',
+            type=int,
+            default=None,
+            help='Cantidad de pedidos concurrentes por prestador',
+        )
+
+    def handle(self, *args, **options):
+        resultados = sincronizar_prestadores(
+            codigos=options['prestadores'],
+            hilos=options['hilos'],
+            documentos=options['documentos'],
+            completa=options['completa'],
+        )
+
+        if not resultados:
+            self.stdout.write(self.style.WARNING('No hay integraciones activas para sincronizar'))
+            return
+
+        for codigo, resultado in resultados.items():
+            if 'error' in resultado:
+                self.stdout.write(self.style.ERROR(f"  ✗ {codigo}: {resultado['error']}"))
+                continue
+
+            estilo = self.style.SUCCESS if not resultado['errores'] else self.style.WARNING
+            self.stdout.write(estilo(
+                f"  ✓ {codigo}: {resultado['personas']} personas, {resultado['turnos']} turnos, "
+                f"{resultado['atenciones']} atenciones, {resultado['errores']} errores "
+                f"(latencia p50 ≤ {resultado['latencia_p50_ms']} ms, p95 ≤ {resultado['latencia_p95_ms']} ms)"
+            ))
+            if resultado.get('interrumpida'):
+                self.stdout.write(self.style.WARNING(
+                    f'    Circuito abierto para {codigo}: se cortó la sincronización'
+                ))
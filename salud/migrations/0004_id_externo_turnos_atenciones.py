@@ -0,0 +1,31 @@
+# Generated by Django 4.2.5 on 2026-10-19 12:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salud', '0003_afiliacionsalud_integracionprestador'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='atencionsalud',
+            name='id_externo',
+            field=models.CharField(blank=True, help_text='Identificador de la atención en el sistema del prestador', max_length=80, null=True),
+        ),
+        migrations.AddField(
+            model_name='turnosalud',
+            name='id_externo',
+            field=models.CharField(blank=True, help_text='Identificador del turno en el sistema del prestador', max_length=80, null=True),
+        ),
+        migrations.AlterUniqueTogether(
+            name='atencionsalud',
+            unique_together={('prestador', 'id_externo')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='turnosalud',
+            unique_together={('prestador', 'id_externo')},
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.5 on 2026-10-19 12:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salud', '0004_id_externo_turnos_atenciones'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='integracionprestadorsalud',
+            name='cursor_sincronizacion',
+            field=models.CharField(blank=True, help_text='Cursor de la última página confirmada de la sincronización en curso', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='integracionprestadorsalud',
+            name='sincronizacion_iniciada',
+            field=models.DateTimeField(blank=True, help_text='Inicio de la sincronización incremental en curso (vacío si no hay ninguna)', null=True),
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 4.2.5 on 2026-10-19 12:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def copiar_ultimos_registros(apps, schema_editor):
+    """Llena el resumen con el registro más reciente de cada persona"""
+    RegistroIntegracion = apps.get_model('salud', 'RegistroIntegracion')
+    ResumenIntegracion = apps.get_model('salud', 'ResumenIntegracion')
+    registros = (
+        RegistroIntegracion.objects
+        .order_by('persona_id', '-fecha', '-id')
+        .values('persona_id', 'prestador_id', 'endpoint', 'estado', 'mensaje', 'fecha')
+    )
+    lote = []
+    anterior = None
+    # Ordenado por persona y fecha descendente: el primero de cada persona es el último
+    for registro in registros.iterator(chunk_size=2000):
+        if registro['persona_id'] == anterior:
+            continue
+        anterior = registro['persona_id']
+        lote.append(ResumenIntegracion(**registro))
+        if len(lote) >= 1000:
+            ResumenIntegracion.objects.bulk_create(lote)
+            lote = []
+    ResumenIntegracion.objects.bulk_create(lote)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('persona', '0001_initial'),
+        ('salud', '0005_sincronizacion_incremental'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenIntegracion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('endpoint', models.CharField(max_length=100)),
+                ('estado', models.CharField(max_length=50)),
+                ('mensaje', models.TextField(blank=True)),
+                ('fecha', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Resumen de Integración',
+                'verbose_name_plural': 'Resúmenes de Integración',
+            },
+        ),
+        migrations.AlterField(
+            model_name='registrointegracion',
+            name='fecha',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='registrointegracion',
+            index=models.Index(fields=['persona', '-fecha'], name='salud_regint_persona_fecha'),
+        ),
+        migrations.AddIndex(
+            model_name='registrointegracion',
+            index=models.Index(fields=['fecha'], name='salud_regint_fecha'),
+        ),
+        migrations.AddField(
+            model_name='resumenintegracion',
+            name='persona',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='resumen_integracion', to='persona.persona'),
+        ),
+        migrations.AddField(
+            model_name='resumenintegracion',
+            name='prestador',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, to='salud.prestadorsalud'),
+        ),
+        migrations.RunPython(copiar_ultimos_registros, migrations.RunPython.noop),
+    ]
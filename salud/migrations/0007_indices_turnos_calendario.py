@@ -0,0 +1,21 @@
+# Generated by Django 4.2.5 on 2026-10-19 13:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salud', '0006_registro_integracion_resumen'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='turnosalud',
+            index=models.Index(fields=['persona', 'fecha_hora'], name='salud_turno_persona_fecha'),
+        ),
+        migrations.AddIndex(
+            model_name='turnosalud',
+            index=models.Index(fields=['prestador', 'fecha_hora'], name='salud_turno_prestador_fecha'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.5 on 2026-10-19 13:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salud', '0007_indices_turnos_calendario'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='coberturasalud',
+            index=models.Index(condition=models.Q(('activa', True)), fields=['fecha_fin'], name='salud_cobertura_activa_fin'),
+        ),
+    ]
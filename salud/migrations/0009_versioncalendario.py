@@ -0,0 +1,30 @@
+# Generated by Django 4.2.5 on 2026-10-19 14:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('salud', '0008_indices_vigencia'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionCalendario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('persona', 'Persona'), ('prestador', 'Prestador')], max_length=10)),
+                ('objeto_id', models.PositiveIntegerField()),
+                ('version', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Versión de Calendario',
+                'verbose_name_plural': 'Versiones de Calendario',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='versioncalendario',
+            constraint=models.UniqueConstraint(fields=('tipo', 'objeto_id'), name='salud_versioncal_tipo_objeto'),
+        ),
+    ]
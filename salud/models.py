@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import ExpressionWrapper, Q
 from django.utils import timezone
 from persona.models import Persona
 
@@ -39,6 +40,26 @@ class PlanSalud(models.Model):
 
 #Cobertura del Estudiante
 
+class CoberturaSaludQuerySet(models.QuerySet):
+    """Vigencia de coberturas resuelta en SQL (misma regla que ``esta_vigente``)"""
+
+    @staticmethod
+    def condicion_vigente(on=None):
+        on = on or timezone.localdate()
+        return Q(activa=True) & (Q(fecha_fin__isnull=True) | Q(fecha_fin__gte=on))
+
+    def vigentes(self, on=None):
+        return self.filter(self.condicion_vigente(on))
+
+    def no_vigentes(self, on=None):
+        return self.exclude(self.condicion_vigente(on))
+
+    def con_vigencia(self, on=None):
+        return self.annotate(
+            vigente=ExpressionWrapper(self.condicion_vigente(on), output_field=models.BooleanField())
+        )
+
+
 class CoberturaSalud(models.Model):
     persona = models.OneToOneField(
         Persona,
@@ -58,9 +79,14 @@ class CoberturaSalud(models.Model):
         null=True
     )
 
+    objects = CoberturaSaludQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Cobertura de Salud"
         verbose_name_plural = "Coberturas de Salud"
+        indexes = [
+            models.Index(fields=["fecha_fin"], condition=Q(activa=True), name="salud_cobertura_activa_fin"),
+        ]
 
     def __str__(self):
         return f"{self.persona} - {self.plan}"
@@ -69,7 +95,7 @@ class CoberturaSalud(models.Model):
     def esta_vigente(self):
         if not self.activa:
             return False
-        if self.fecha_fin and self.fecha_fin < timezone.now().date():
+        if self.fecha_fin and self.fecha_fin < timezone.localdate():
             return False
         return True
 
@@ -122,16 +148,66 @@ class RegistroIntegracion(models.Model):
     endpoint = models.CharField(max_length=100)
     estado = models.CharField(max_length=50)
     mensaje = models.TextField(blank=True)
-    fecha = models.DateTimeField(auto_now_add=True)
+    fecha = models.DateTimeField(default=timezone.now)
 
     class Meta:
         verbose_name = "Registro de Integración"
         verbose_name_plural = "Registros de Integración"
+        indexes = [
+            models.Index(fields=["persona", "-fecha"], name="salud_regint_persona_fecha"),
+            models.Index(fields=["fecha"], name="salud_regint_fecha"),
+        ]
 
     def __str__(self):
         return f"{self.prestador} - {self.estado}"
 
 
+#Último resultado de integración por persona
+class ResumenIntegracion(models.Model):
+    persona = models.OneToOneField(
+        Persona,
+        on_delete=models.CASCADE,
+        related_name="resumen_integracion"
+    )
+    prestador = models.ForeignKey(
+        PrestadorSalud,
+        on_delete=models.PROTECT
+    )
+    endpoint = models.CharField(max_length=100)
+    estado = models.CharField(max_length=50)
+    mensaje = models.TextField(blank=True)
+    fecha = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "Resumen de Integración"
+        verbose_name_plural = "Resúmenes de Integración"
+
+    def __str__(self):
+        return f"{self.persona} - {self.prestador} - {self.estado}"
+
+
+#Versión del token de calendario: al rotarla, las URLs anteriores dejan de andar
+class VersionCalendario(models.Model):
+    TIPOS = (
+        ("persona", "Persona"),
+        ("prestador", "Prestador"),
+    )
+
+    tipo = models.CharField(max_length=10, choices=TIPOS)
+    objeto_id = models.PositiveIntegerField()
+    version = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Versión de Calendario"
+        verbose_name_plural = "Versiones de Calendario"
+        constraints = [
+            models.UniqueConstraint(fields=["tipo", "objeto_id"], name="salud_versioncal_tipo_objeto"),
+        ]
+
+    def __str__(self):
+        return f"{self.tipo} {self.objeto_id} v{self.version}"
+
+
 class IntegracionPrestadorSalud(models.Model):
     TIPOS_AUTH = (
         ("api_key", "API Key"),
@@ -155,6 +231,16 @@ class IntegracionPrestadorSalud(models.Model):
     timeout_segundos = models.PositiveIntegerField(default=10)
     activo = models.BooleanField(default=True)
     ultima_sincronizacion = models.DateTimeField(blank=True, null=True)
+    sincronizacion_iniciada = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text="Inicio de la sincronización incremental en curso (vacío si no hay ninguna)"
+    )
+    cursor_sincronizacion = models.CharField(
+        max_length=255,
+        blank=True,
+        help_text="Cursor de la última página confirmada de la sincronización en curso"
+    )
     ultimo_estado = models.CharField(max_length=50, blank=True)
     ultimo_mensaje = models.TextField(blank=True)
 
@@ -239,6 +325,12 @@ class TurnoSalud(models.Model):
     motivo = models.CharField(max_length=150, blank=True)
     estado = models.CharField(max_length=15, choices=ESTADOS, default="pendiente")
     fuente = models.CharField(max_length=15, choices=FUENTE, default="integracion")
+    id_externo = models.CharField(
+        max_length=80,
+        blank=True,
+        null=True,
+        help_text="Identificador del turno en el sistema del prestador"
+    )
     creado_en = models.DateTimeField(auto_now_add=True)
     actualizado_en = models.DateTimeField(auto_now=True)
 
@@ -246,6 +338,11 @@ class TurnoSalud(models.Model):
         verbose_name = "Turno de Salud"
         verbose_name_plural = "Turnos de Salud"
         ordering = ["fecha_hora"]
+        unique_together = ("prestador", "id_externo")
+        indexes = [
+            models.Index(fields=["persona", "fecha_hora"], name="salud_turno_persona_fecha"),
+            models.Index(fields=["prestador", "fecha_hora"], name="salud_turno_prestador_fecha"),
+        ]
 
     def __str__(self):
         return f"{self.persona} - {self.especialidad} ({self.fecha_hora:%d/%m/%Y %H:%M})"
@@ -288,12 +385,19 @@ class AtencionSalud(models.Model):
     tratamiento = models.TextField(blank=True)
     observaciones = models.TextField(blank=True)
     fuente = models.CharField(max_length=15, choices=FUENTE, default="integracion")
+    id_externo = models.CharField(
+        max_length=80,
+        blank=True,
+        null=True,
+        help_text="Identificador de la atención en el sistema del prestador"
+    )
     creado_en = models.DateTimeField(auto_now_add=True)
 
     class Meta:
         verbose_name = "Atención de Salud"
         verbose_name_plural = "Atenciones de Salud"
         ordering = ["-fecha"]
+        unique_together = ("prestador", "id_externo")
 
     def __str__(self):
         return f"{self.persona} - {self.especialidad} ({self.fecha:%d/%m/%Y})"
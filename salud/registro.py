@@ -0,0 +1,101 @@
+"""
+Escritura por lotes y retención de ``RegistroIntegracion``.
+
+Las llamadas a los prestadores no se registran con un INSERT cada una: se
+acumulan en un ``BufferRegistros`` que se vuelca con ``bulk_create`` cada
+``tamano`` registros o cada ``intervalo`` segundos (lo que ocurra primero, se
+verifica al agregar) y siempre al cerrarlo. En el mismo vuelco se actualiza
+``ResumenIntegracion``, que guarda sólo el último resultado de cada persona.
+"""
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import RegistroIntegracion, ResumenIntegracion
+
+TAMANO_BUFFER = getattr(settings, 'SALUD_REGISTRO_BUFFER', 500)
+INTERVALO_BUFFER = getattr(settings, 'SALUD_REGISTRO_INTERVALO', 5)
+RETENCION_DIAS = getattr(settings, 'SALUD_RETENCION_REGISTROS_DIAS', 90)
+
+
+class BufferRegistros:
+    def __init__(self, tamano=None, intervalo=None):
+        self.tamano = tamano or TAMANO_BUFFER
+        self.intervalo = intervalo if intervalo is not None else INTERVALO_BUFFER
+        self.pendientes = []
+        self.ultimo_vuelco = time.monotonic()
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.volcar()
+
+    def agregar(self, prestador, persona_id, endpoint, estado, mensaje=''):
+        with self.lock:
+            self.pendientes.append(RegistroIntegracion(
+                prestador=prestador,
+                persona_id=persona_id,
+                endpoint=endpoint,
+                estado=estado,
+                mensaje=mensaje,
+                fecha=timezone.now(),
+            ))
+            lleno = len(self.pendientes) >= self.tamano
+            vencido = time.monotonic() - self.ultimo_vuelco >= self.intervalo
+        if lleno or vencido:
+            self.volcar()
+
+    def volcar(self):
+        with self.lock:
+            registros, self.pendientes = self.pendientes, []
+            self.ultimo_vuelco = time.monotonic()
+        if not registros:
+            return
+
+        # Último registro de cada persona dentro del lote
+        ultimos = {}
+        for registro in registros:
+            ultimos[registro.persona_id] = registro
+
+        with transaction.atomic():
+            RegistroIntegracion.objects.bulk_create(registros, batch_size=self.tamano)
+            ResumenIntegracion.objects.bulk_create(
+                [
+                    ResumenIntegracion(
+                        persona_id=registro.persona_id,
+                        prestador=registro.prestador,
+                        endpoint=registro.endpoint,
+                        estado=registro.estado,
+                        mensaje=registro.mensaje,
+                        fecha=registro.fecha,
+                    )
+                    for registro in ultimos.values()
+                ],
+                update_conflicts=True,
+                unique_fields=['persona'],
+                update_fields=['prestador', 'endpoint', 'estado', 'mensaje', 'fecha'],
+                batch_size=self.tamano,
+            )
+
+
+def purgar_registros(dias=None, lote=5000):
+    """
+    Borra los registros más viejos que ``dias`` en lotes de ``lote`` filas,
+    para no bloquear la tabla con un DELETE gigante. El último resultado de
+    cada persona queda en ``ResumenIntegracion``. Devuelve la cantidad borrada.
+    """
+    limite = timezone.now() - timedelta(days=dias if dias is not None else RETENCION_DIAS)
+    viejos = RegistroIntegracion.objects.filter(fecha__lt=limite)
+
+    borrados = 0
+    while True:
+        ids = list(viejos.values_list('id', flat=True)[:lote])
+        if not ids:
+            return borrados
+        borrados += RegistroIntegracion.objects.filter(id__in=ids).delete()[0]
@@ -0,0 +1,187 @@
+"""
+Protecciones por prestador para las integraciones de salud.
+
+Cada ``PrestadorSalud`` tiene su propio estado en el proceso:
+
+* ``LimitadorTasa``: token bucket que acota los pedidos por segundo.
+* ``Interruptor``: circuit breaker que se abre tras ``fallos`` errores o
+  timeouts consecutivos. Mientras está abierto los pedidos fallan al instante
+  con ``CircuitoAbierto``; pasado ``apertura`` segundos deja pasar un pedido
+  de prueba y se cierra si sale bien.
+* ``Histograma`` de latencias y conteo de errores por tipo.
+
+Como el estado es por prestador, uno degradado no consume los hilos ni el
+cupo de los demás. Los cambios de estado del interruptor se guardan en
+``IntegracionPrestadorSalud.ultimo_estado`` / ``ultimo_mensaje``.
+
+Los límites se ajustan con ``SALUD_LIMITES``, por código de prestador::
+
+    SALUD_LIMITES = {
+        'default': {'tasa': 20, 'rafaga': 40, 'fallos': 5, 'apertura': 60},
+        'OSEP': {'tasa': 5},
+    }
+"""
+import bisect
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from .excepciones import ErrorPrestador
+
+LIMITES_POR_DEFECTO = {'tasa': 20, 'rafaga': 40, 'fallos': 5, 'apertura': 60}
+
+# Límites superiores de los buckets de latencia, en milisegundos
+BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class CircuitoAbierto(ErrorPrestador):
+    """El prestador está degradado y se rechazan los pedidos sin intentarlos"""
+
+
+class LimitadorTasa:
+    def __init__(self, tasa, rafaga):
+        self.tasa = float(tasa)
+        self.capacidad = float(rafaga)
+        self.fichas = float(rafaga)
+        self.ultimo = time.monotonic()
+        self.lock = threading.Lock()
+
+    def adquirir(self):
+        """Bloquea hasta que haya una ficha disponible"""
+        while True:
+            with self.lock:
+                ahora = time.monotonic()
+                self.fichas = min(self.capacidad, self.fichas + (ahora - self.ultimo) * self.tasa)
+                self.ultimo = ahora
+                if self.fichas >= 1:
+                    self.fichas -= 1
+                    return
+                espera = (1 - self.fichas) / self.tasa
+            time.sleep(espera)
+
+
+class Interruptor:
+    CERRADO = 'cerrado'
+    ABIERTO = 'abierto'
+    SEMIABIERTO = 'semiabierto'
+
+    def __init__(self, fallos, apertura, al_cambiar=None):
+        self.umbral = fallos
+        self.apertura = apertura
+        self.al_cambiar = al_cambiar
+        self.estado = self.CERRADO
+        self.fallos_consecutivos = 0
+        self.abierto_desde = None
+        self.prueba_en_curso = False
+        self.lock = threading.Lock()
+
+    @property
+    def abierto(self):
+        return self.estado == self.ABIERTO
+
+    def permitir(self):
+        with self.lock:
+            if self.estado == self.CERRADO:
+                return
+            if self.estado == self.ABIERTO and time.monotonic() - self.abierto_desde >= self.apertura:
+                self._cambiar(self.SEMIABIERTO, 'Probando si el prestador se recuperó')
+            if self.estado == self.SEMIABIERTO and not self.prueba_en_curso:
+                self.prueba_en_curso = True
+                return
+        raise CircuitoAbierto('Circuito abierto: el prestador no responde, se reintentará más tarde')
+
+    def registrar_exito(self):
+        with self.lock:
+            self.fallos_consecutivos = 0
+            self.prueba_en_curso = False
+            if self.estado != self.CERRADO:
+                self._cambiar(self.CERRADO, 'El prestador volvió a responder')
+
+    def registrar_fallo(self, motivo):
+        with self.lock:
+            self.fallos_consecutivos += 1
+            self.prueba_en_curso = False
+            if self.estado == self.SEMIABIERTO or (
+                    self.estado == self.CERRADO and self.fallos_consecutivos >= self.umbral):
+                self.abierto_desde = time.monotonic()
+                self._cambiar(
+                    self.ABIERTO,
+                    f'{self.fallos_consecutivos} fallos consecutivos, último: {motivo}',
+                )
+
+    def _cambiar(self, estado, mensaje):
+        self.estado = estado
+        if self.al_cambiar:
+            self.al_cambiar(estado, mensaje)
+
+
+class Histograma:
+    def __init__(self, buckets=BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.conteos = [0] * (len(self.buckets) + 1)
+        self.suma = 0.0
+        self.total = 0
+        self.lock = threading.Lock()
+
+    def observar(self, valor):
+        with self.lock:
+            self.conteos[bisect.bisect_left(self.buckets, valor)] += 1
+            self.suma += valor
+            self.total += 1
+
+    def percentil(self, p):
+        """Límite superior del bucket que contiene el percentil ``p`` (0-100)"""
+        with self.lock:
+            if not self.total:
+                return None
+            objetivo = self.total * p / 100
+            acumulado = 0
+            for i, conteo in enumerate(self.conteos):
+                acumulado += conteo
+                if acumulado >= objetivo:
+                    return self.buckets[i] if i < len(self.buckets) else float('inf')
+
+
+class EstadoPrestador:
+    def __init__(self, prestador_id, limites):
+        self.prestador_id = prestador_id
+        self.limitador = LimitadorTasa(limites['tasa'], limites['rafaga'])
+        self.interruptor = Interruptor(limites['fallos'], limites['apertura'], self._persistir)
+        self.latencias = Histograma()
+        self.errores = {}
+        self.lock = threading.Lock()
+
+    def registrar_error(self, tipo):
+        with self.lock:
+            self.errores[tipo] = self.errores.get(tipo, 0) + 1
+
+    def _persistir(self, estado, mensaje):
+        from .models import IntegracionPrestadorSalud
+
+        IntegracionPrestadorSalud.objects.filter(prestador_id=self.prestador_id).update(
+            ultimo_estado=f'circuito_{estado}',
+            ultimo_mensaje=f'{timezone.now():%d/%m/%Y %H:%M:%S} - {mensaje}',
+        )
+        if threading.current_thread() is not threading.main_thread():
+            # Los workers del pool no deben dejar conexiones abiertas
+            connection.close()
+
+
+_estados = {}
+_estados_lock = threading.Lock()
+
+
+def limites_prestador(codigo):
+    configurados = getattr(settings, 'SALUD_LIMITES', {})
+    return {**LIMITES_POR_DEFECTO, **configurados.get('default', {}), **configurados.get(codigo, {})}
+
+
+def estado_prestador(prestador):
+    """Estado compartido (en el proceso) de un prestador"""
+    with _estados_lock:
+        if prestador.pk not in _estados:
+            _estados[prestador.pk] = EstadoPrestador(prestador.pk, limites_prestador(prestador.codigo))
+        return _estados[prestador.pk]
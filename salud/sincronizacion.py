@@ -0,0 +1,311 @@
+"""
+Sincronización de afiliaciones, turnos y atenciones desde los prestadores.
+
+Las consultas HTTP se reparten en un pool acotado de hilos que comparte la
+sesión keep-alive del prestador. La escritura se hace siempre desde el hilo
+principal, por lotes, con ``bulk_create(update_conflicts=True)``: así no se
+abren conexiones a la base por hilo y un lote es una sola transacción.
+
+La sincronización incremental pide al prestador sólo las personas con cambios
+desde ``ultima_sincronizacion``. Cada página se guarda en la misma transacción
+que avanza ``cursor_sincronizacion``, así que si el proceso se corta a mitad
+de camino la próxima corrida retoma desde la última página confirmada.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .clientes import ClientePrestador, ErrorPrestador
+from .resiliencia import estado_prestador
+from .models import (
+    AfiliacionSalud,
+    AtencionSalud,
+    CoberturaSalud,
+    IntegracionPrestadorSalud,
+    TurnoSalud,
+)
+from .registro import BufferRegistros
+from persona.models import Persona
+
+HILOS_POR_DEFECTO = getattr(settings, 'SALUD_SYNC_HILOS', 8)
+LOTE_POR_DEFECTO = getattr(settings, 'SALUD_SYNC_LOTE', 200)
+
+ESTADOS_AFILIACION = {codigo for codigo, _ in AfiliacionSalud.ESTADOS}
+ESTADOS_TURNO = {codigo for codigo, _ in TurnoSalud.ESTADOS}
+
+
+def _fecha(valor):
+    return parse_date(valor) if valor else None
+
+
+def _fecha_hora(valor):
+    if not valor:
+        return None
+    fecha_hora = parse_datetime(valor)
+    if fecha_hora is not None and timezone.is_naive(fecha_hora):
+        fecha_hora = timezone.make_aware(fecha_hora)
+    return fecha_hora
+
+
+class SincronizadorPrestador:
+    """Trae los datos de un prestador para muchas personas en paralelo"""
+
+    def __init__(self, integracion, hilos=None, tamano_lote=None):
+        self.integracion = integracion
+        self.prestador = integracion.prestador
+        self.hilos = hilos or HILOS_POR_DEFECTO
+        self.tamano_lote = tamano_lote or LOTE_POR_DEFECTO
+        self.coberturas = dict(
+            CoberturaSalud.objects
+            .filter(plan__prestador=self.prestador)
+            .values_list('persona_id', 'id')
+        )
+        self.estado = estado_prestador(self.prestador)
+        self.registros = BufferRegistros()
+        self.resultado = {'personas': 0, 'errores': 0, 'turnos': 0, 'atenciones': 0}
+
+    def personas(self):
+        """Personas afiliadas o con cobertura en el prestador"""
+        return (
+            Persona.objects
+            .filter(
+                Q(afiliaciones_salud__prestador=self.prestador) |
+                Q(cobertura_salud__plan__prestador=self.prestador)
+            )
+            .distinct()
+            .values_list('id', 'documento')
+        )
+
+    def ejecutar(self, personas=None):
+        """Sincronización completa: consulta persona por persona"""
+        marca = timezone.now()
+        personas = list(personas if personas is not None else self.personas())
+
+        with self.registros, ClientePrestador(self.integracion, tamano_pool=self.hilos) as cliente, \
+                ThreadPoolExecutor(max_workers=self.hilos) as pool:
+            for inicio in range(0, len(personas), self.tamano_lote):
+                lote = personas[inicio:inicio + self.tamano_lote]
+                resultados = list(pool.map(lambda p: self._obtener(cliente, *p), lote))
+                self._guardar_lote(resultados)
+                if self.estado.interruptor.abierto:
+                    # Prestador degradado: no seguir encolando pedidos que van a fallar
+                    self.resultado['interrumpida'] = True
+                    break
+
+        # Sólo una corrida sin errores deja una marca confiable para la incremental
+        self._registrar_fin(marca=marca if not self.resultado['errores'] else None)
+        return self.resultado
+
+    def ejecutar_incremental(self):
+        """Sincroniza sólo lo que cambió desde la última marca, retomando si quedó a medias"""
+        integracion = self.integracion
+        integraciones = IntegracionPrestadorSalud.objects.filter(pk=integracion.pk)
+
+        inicio = integracion.sincronizacion_iniciada
+        cursor = integracion.cursor_sincronizacion or None
+        if inicio is None:
+            inicio = timezone.now()
+            cursor = None
+            integraciones.update(sincronizacion_iniciada=inicio, cursor_sincronizacion='')
+
+        with self.registros, ClientePrestador(integracion, tamano_pool=1) as cliente:
+            paginas = cliente.paginas_cambios(
+                desde=integracion.ultima_sincronizacion,
+                cursor=cursor,
+                limite=self.tamano_lote,
+            )
+            for pagina in paginas:
+                resultados = self._resultados_pagina(pagina.get('resultados') or [])
+                siguiente = pagina.get('siguiente') or ''
+                with transaction.atomic():
+                    self._guardar_lote(resultados)
+                    if siguiente:
+                        integraciones.update(cursor_sincronizacion=siguiente)
+                    else:
+                        integraciones.update(
+                            ultima_sincronizacion=inicio,
+                            sincronizacion_iniciada=None,
+                            cursor_sincronizacion='',
+                        )
+
+        self._registrar_fin()
+        return self.resultado
+
+    def _resultados_pagina(self, items):
+        documentos = [item['documento'] for item in items if item.get('documento')]
+        ids = dict(
+            Persona.objects
+            .filter(documento__in=documentos)
+            .values_list('documento', 'id')
+        )
+        return [
+            (ids[item['documento']], 'cambios', item, None)
+            for item in items
+            if item.get('documento') in ids
+        ]
+
+    def _obtener(self, cliente, persona_id, documento):
+        endpoint = f'personas/{documento}'
+        try:
+            return persona_id, endpoint, cliente.datos_persona(documento), None
+        except ErrorPrestador as e:
+            return persona_id, endpoint, None, str(e)
+
+    @transaction.atomic
+    def _guardar_lote(self, resultados):
+        afiliaciones, turnos, atenciones = [], {}, {}
+
+        for persona_id, endpoint, datos, error in resultados:
+            self.resultado['personas'] += 1
+            self.registros.agregar(
+                self.prestador,
+                persona_id,
+                endpoint,
+                'error' if error else 'ok',
+                error or '',
+            )
+            if error:
+                self.resultado['errores'] += 1
+                continue
+            if not datos:
+                continue
+
+            cobertura_id = self.coberturas.get(persona_id)
+
+            afiliacion = datos.get('afiliacion')
+            if afiliacion:
+                estado = afiliacion.get('estado')
+                afiliaciones.append(AfiliacionSalud(
+                    persona_id=persona_id,
+                    prestador=self.prestador,
+                    numero_afiliado=afiliacion.get('numero_afiliado') or '',
+                    plan_nombre=afiliacion.get('plan') or '',
+                    estado=estado if estado in ESTADOS_AFILIACION else 'pendiente',
+                    fecha_inicio=_fecha(afiliacion.get('fecha_inicio')),
+                    fecha_fin=_fecha(afiliacion.get('fecha_fin')),
+                    payload=afiliacion,
+                ))
+
+            for turno in datos.get('turnos') or []:
+                estado = turno.get('estado')
+                turnos[str(turno['id'])] = TurnoSalud(
+                    persona_id=persona_id,
+                    prestador=self.prestador,
+                    cobertura_id=cobertura_id,
+                    id_externo=str(turno['id']),
+                    fecha_hora=_fecha_hora(turno.get('fecha_hora')),
+                    especialidad=turno.get('especialidad') or '',
+                    profesional=turno.get('profesional') or '',
+                    ubicacion=turno.get('ubicacion') or '',
+                    motivo=turno.get('motivo') or '',
+                    estado=estado if estado in ESTADOS_TURNO else 'pendiente',
+                    fuente='integracion',
+                )
+
+            for atencion in datos.get('atenciones') or []:
+                atenciones[str(atencion['id'])] = (atencion.get('turno_id'), AtencionSalud(
+                    persona_id=persona_id,
+                    prestador=self.prestador,
+                    cobertura_id=cobertura_id,
+                    id_externo=str(atencion['id']),
+                    fecha=_fecha(atencion.get('fecha')) or timezone.now().date(),
+                    especialidad=atencion.get('especialidad') or '',
+                    profesional=atencion.get('profesional') or '',
+                    diagnostico=atencion.get('diagnostico') or '',
+                    tratamiento=atencion.get('tratamiento') or '',
+                    observaciones=atencion.get('observaciones') or '',
+                    fuente='integracion',
+                ))
+
+        if afiliaciones:
+            AfiliacionSalud.objects.bulk_create(
+                afiliaciones,
+                update_conflicts=True,
+                unique_fields=['persona', 'prestador'],
+                update_fields=['numero_afiliado', 'plan_nombre', 'estado', 'fecha_inicio',
+                               'fecha_fin', 'payload', 'ultima_actualizacion'],
+            )
+
+        if turnos:
+            TurnoSalud.objects.bulk_create(
+                list(turnos.values()),
+                update_conflicts=True,
+                unique_fields=['prestador', 'id_externo'],
+                update_fields=['persona', 'cobertura', 'fecha_hora', 'especialidad', 'profesional',
+                               'ubicacion', 'motivo', 'estado', 'actualizado_en'],
+            )
+            self.resultado['turnos'] += len(turnos)
+
+        if atenciones:
+            atenciones = list(atenciones.values())
+            # Las atenciones referencian el turno por su id externo
+            ids_turnos = {str(turno_id) for turno_id, _ in atenciones if turno_id}
+            turnos_locales = dict(
+                TurnoSalud.objects
+                .filter(prestador=self.prestador, id_externo__in=ids_turnos)
+                .values_list('id_externo', 'id')
+            ) if ids_turnos else {}
+            for turno_id, atencion in atenciones:
+                atencion.turno_id = turnos_locales.get(str(turno_id)) if turno_id else None
+
+            AtencionSalud.objects.bulk_create(
+                [atencion for _, atencion in atenciones],
+                update_conflicts=True,
+                unique_fields=['prestador', 'id_externo'],
+                update_fields=['persona', 'cobertura', 'turno', 'fecha', 'especialidad', 'profesional',
+                               'diagnostico', 'tratamiento', 'observaciones'],
+            )
+            self.resultado['atenciones'] += len(atenciones)
+
+    def _registrar_fin(self, marca=None):
+        resultado = self.resultado
+        resultado['latencia_p50_ms'] = self.estado.latencias.percentil(50)
+        resultado['latencia_p95_ms'] = self.estado.latencias.percentil(95)
+
+        campos = {}
+        if marca is not None:
+            campos['ultima_sincronizacion'] = marca
+        # Con el circuito abierto se conserva el estado que dejó el interruptor
+        if not self.estado.interruptor.abierto:
+            campos['ultimo_estado'] = 'ok' if not resultado['errores'] else 'con_errores'
+            campos['ultimo_mensaje'] = (
+                f"{resultado['personas']} personas, {resultado['turnos']} turnos, "
+                f"{resultado['atenciones']} atenciones, {resultado['errores']} errores"
+            )
+        if campos:
+            IntegracionPrestadorSalud.objects.filter(pk=self.integracion.pk).update(**campos)
+
+
+def sincronizar_prestadores(codigos=None, hilos=None, documentos=None, completa=False):
+    """
+    Sincroniza todas las integraciones activas (o las de los códigos indicados).
+    Por defecto es incremental; ``completa`` o ``documentos`` fuerzan la consulta
+    persona por persona.
+    """
+    integraciones = IntegracionPrestadorSalud.objects.select_related('prestador').filter(
+        activo=True,
+        prestador__activo=True,
+    )
+    if codigos:
+        integraciones = integraciones.filter(prestador__codigo__in=codigos)
+
+    resultados = {}
+    for integracion in integraciones:
+        sincronizador = SincronizadorPrestador(integracion, hilos=hilos)
+        try:
+            if documentos:
+                personas = Persona.objects.filter(documento__in=documentos).values_list('id', 'documento')
+                resultado = sincronizador.ejecutar(personas)
+            elif completa:
+                resultado = sincronizador.ejecutar()
+            else:
+                resultado = sincronizador.ejecutar_incremental()
+        except ErrorPrestador as e:
+            # Un prestador caído no frena a los demás; la incremental retoma en la próxima corrida
+            resultado = dict(sincronizador.resultado, error=str(e))
+        resultados[integracion.prestador.codigo] = resultado
+    return resultados
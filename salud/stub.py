@@ -0,0 +1,174 @@
+"""
+Prestador de salud simulado para desarrollo y pruebas de la sincronización.
+
+Levanta un ``ThreadingHTTPServer`` local que responde el mismo contrato que
+``salud.clientes.ClientePrestador`` espera, incluido ``POST /token`` para
+integraciones OAuth2. Los datos se generan de forma determinística a partir
+del documento, así que no hace falta cargar nada::
+
+    with ServidorPrestadorStub() as stub:
+        integracion.base_url = stub.url
+        SincronizadorPrestador(integracion).ejecutar()
+"""
+import json
+import random
+import threading
+import zlib
+from datetime import date, datetime, time, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+ESPECIALIDADES = ['Clínica Médica', 'Odontología', 'Oftalmología', 'Psicología', 'Nutrición', 'Ginecología']
+PROFESIONALES = ['Dra. Pérez', 'Dr. Gómez', 'Dra. Fernández', 'Dr. López', 'Lic. Martínez']
+
+
+def datos_persona(documento, hoy=None):
+    """Genera la respuesta de ``GET /personas/{documento}`` para un documento"""
+    hoy = hoy or date.today()
+    rnd = random.Random(zlib.crc32(documento.encode()))
+
+    turnos = []
+    for i in range(rnd.randint(0, 3)):
+        dia = hoy + timedelta(days=rnd.randint(-30, 30))
+        turnos.append({
+            'id': f'T-{documento}-{i}',
+            'fecha_hora': datetime.combine(dia, time(rnd.randint(8, 18), rnd.choice([0, 30]))).isoformat(),
+            'especialidad': rnd.choice(ESPECIALIDADES),
+            'profesional': rnd.choice(PROFESIONALES),
+            'ubicacion': 'Consultorio Central',
+            'motivo': 'Control',
+            'estado': 'atendido' if dia < hoy else 'confirmado',
+        })
+
+    atenciones = [
+        {
+            'id': f'A-{turno["id"]}',
+            'turno_id': turno['id'],
+            'fecha': turno['fecha_hora'][:10],
+            'especialidad': turno['especialidad'],
+            'profesional': turno['profesional'],
+            'diagnostico': 'Sin particularidades',
+            'tratamiento': '',
+            'observaciones': '',
+        }
+        for turno in turnos if turno['estado'] == 'atendido'
+    ]
+
+    return {
+        'afiliacion': {
+            'numero_afiliado': f'{rnd.randint(10 ** 7, 10 ** 8 - 1)}',
+            'plan': rnd.choice(['Plan Estudiantil', 'Plan Integral', 'Plan Básico']),
+            'estado': rnd.choice(['activa', 'activa', 'activa', 'suspendida']),
+            'fecha_inicio': date(hoy.year, 3, 1).isoformat(),
+            'fecha_fin': None,
+        },
+        'turnos': turnos,
+        'atenciones': atenciones,
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _responder(self, estado, cuerpo):
+        contenido = json.dumps(cuerpo).encode()
+        self.send_response(estado)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(contenido)))
+        self.end_headers()
+        self.wfile.write(contenido)
+
+    def do_GET(self):
+        stub = self.server.stub
+        url = urlparse(self.path)
+        partes = url.path.strip('/').split('/')
+        with stub.lock:
+            stub.pedidos += 1
+
+        if partes == ['cambios']:
+            params = parse_qs(url.query)
+            offset = int(params.get('cursor', ['0'])[0])
+            limite = int(params.get('limite', ['200'])[0])
+            with stub.lock:
+                stub.paginas_pedidas.append(offset)
+                if offset in stub.fallar_en:
+                    stub.fallar_en.discard(offset)
+                    return self._responder(500, {'error': 'fallo simulado'})
+            documentos = stub.cambios[offset:offset + limite]
+            siguiente = offset + limite if offset + limite < len(stub.cambios) else None
+            return self._responder(200, {
+                'resultados': [
+                    dict(stub.datos.get(documento) or datos_persona(documento), documento=documento)
+                    for documento in documentos
+                ],
+                'siguiente': str(siguiente) if siguiente is not None else None,
+            })
+
+        if len(partes) == 2 and partes[0] == 'personas':
+            documento = partes[1]
+            if documento in stub.fallidos:
+                return self._responder(500, {'error': 'fallo simulado'})
+            if documento in stub.datos:
+                return self._responder(200, stub.datos[documento])
+            return self._responder(200, datos_persona(documento))
+
+        self._responder(404, {'error': 'no encontrado'})
+
+    def do_POST(self):
+        stub = self.server.stub
+        largo = int(self.headers.get('Content-Length') or 0)
+        self.rfile.read(largo)
+
+        if urlparse(self.path).path.strip('/') == 'token':
+            with stub.lock:
+                stub.tokens_emitidos += 1
+                numero = stub.tokens_emitidos
+            return self._responder(200, {
+                'access_token': f'token-{numero}',
+                'token_type': 'Bearer',
+                'expires_in': stub.expires_in,
+            })
+
+        self._responder(404, {'error': 'no encontrado'})
+
+
+class ServidorPrestadorStub:
+    def __init__(self, host='127.0.0.1', puerto=0, datos=None, fallidos=(), expires_in=3600,
+                 cambios=(), fallar_en=()):
+        self.datos = datos or {}
+        self.fallidos = set(fallidos)
+        # Documentos que ``GET /cambios`` informa como modificados y offsets de página que fallan una vez
+        self.cambios = list(cambios)
+        self.fallar_en = set(fallar_en)
+        self.paginas_pedidas = []
+        self.expires_in = expires_in
+        self.pedidos = 0
+        self.tokens_emitidos = 0
+        self.lock = threading.Lock()
+        self.servidor = ThreadingHTTPServer((host, puerto), _Handler)
+        self.servidor.daemon_threads = True
+        self.servidor.stub = self
+        self._hilo = None
+
+    @property
+    def url(self):
+        host, puerto = self.servidor.server_address[:2]
+        return f'http://{host}:{puerto}'
+
+    def iniciar(self):
+        self._hilo = threading.Thread(target=self.servidor.serve_forever, daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.detener()
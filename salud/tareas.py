@@ -0,0 +1,23 @@
+from tareas.cola import tarea
+from tareas.periodicas import periodica
+
+from .registro import purgar_registros
+from .sincronizacion import sincronizar_prestadores
+
+
+@tarea(max_intentos=5)
+def sincronizar(codigos=None, completa=False):
+    """Sincronización de prestadores fuera del request (por ejemplo, pedida desde el admin)"""
+    return sincronizar_prestadores(codigos=codigos, completa=completa)
+
+
+@periodica('*/30 * * * *', vencimiento=3600)
+def sincronizar_incremental():
+    """Cambios de los prestadores desde la última sincronización"""
+    return sincronizar_prestadores()
+
+
+@periodica('30 3 * * *')
+def purgar_registros_integracion():
+    """Registros de integración fuera de la ventana de retención"""
+    return purgar_registros()
@@ -0,0 +1,136 @@
+"""
+Caché compartida de access tokens OAuth2 de los prestadores.
+
+Los tokens se guardan en el backend de caché por integración hasta poco antes
+de su vencimiento. Cuando al token le queda menos de ``SALUD_TOKEN_RENOVAR_ANTES``
+segundos (o de la mitad de su duración, si dura menos) se renueva en segundo
+plano, sin frenar al worker que lo pidió.
+
+Para no saturar el endpoint de tokens, la renovación es single-flight: dentro
+del proceso con un lock por integración y entre procesos con un lock en la
+caché (``cache.add``). Quien no obtiene el lock espera a que el token aparezca.
+"""
+import threading
+import time
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+
+from rendimiento.metricas import registrar_cache
+
+from .excepciones import ErrorPrestador
+
+MARGEN = getattr(settings, 'SALUD_TOKEN_MARGEN', 30)
+RENOVAR_ANTES = getattr(settings, 'SALUD_TOKEN_RENOVAR_ANTES', 300)
+ESPERA_LOCK = 10
+
+
+class GestorTokens:
+    def __init__(self):
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+        self._renovando = set()
+
+    def _clave(self, integracion):
+        return f'salud:token:{integracion.pk}'
+
+    def _lock_local(self, integracion):
+        with self._locks_guard:
+            return self._locks.setdefault(integracion.pk, threading.Lock())
+
+    def obtener(self, integracion):
+        """Devuelve un access token válido para la integración"""
+        datos = cache.get(self._clave(integracion))
+        vigente = bool(datos) and time.time() < datos['expira'] - MARGEN
+        registrar_cache('salud_tokens', vigente)
+        if vigente:
+            if time.time() >= datos.get('renovar_desde', datos['expira'] - RENOVAR_ANTES):
+                self._renovar_en_segundo_plano(integracion)
+            return datos['access_token']
+
+        with self._lock_local(integracion):
+            datos = cache.get(self._clave(integracion))
+            if datos and time.time() < datos['expira'] - MARGEN:
+                return datos['access_token']
+            return self._renovar(integracion)['access_token']
+
+    def invalidar(self, integracion):
+        cache.delete(self._clave(integracion))
+
+    def _renovar_en_segundo_plano(self, integracion):
+        with self._locks_guard:
+            if integracion.pk in self._renovando:
+                return
+            self._renovando.add(integracion.pk)
+
+        def renovar():
+            try:
+                with self._lock_local(integracion):
+                    self._renovar(integracion)
+            except ErrorPrestador:
+                # El token actual sigue siendo válido; se reintenta en el próximo pedido
+                pass
+            finally:
+                with self._locks_guard:
+                    self._renovando.discard(integracion.pk)
+
+        threading.Thread(target=renovar, daemon=True).start()
+
+    def _renovar(self, integracion):
+        clave = self._clave(integracion)
+        clave_lock = f'{clave}:lock'
+
+        adquirido = cache.add(clave_lock, 1, timeout=ESPERA_LOCK)
+        if not adquirido:
+            # Otro proceso está pidiendo el token: esperar a que lo publique
+            anterior = cache.get(clave)
+            limite = time.time() + ESPERA_LOCK
+            while time.time() < limite:
+                time.sleep(0.1)
+                datos = cache.get(clave)
+                if datos and datos != anterior:
+                    return datos
+            # No lo publicó a tiempo: pedirlo igual, con el lock si ya venció
+            adquirido = cache.add(clave_lock, 1, timeout=ESPERA_LOCK)
+
+        try:
+            datos = self._pedir_token(integracion)
+            cache.set(clave, datos, timeout=max(int(datos['expira'] - time.time() - MARGEN), 1))
+            return datos
+        finally:
+            # Sólo el lock propio: borrar el de otro proceso dejaría pasar a un tercero
+            if adquirido:
+                cache.delete(clave_lock)
+
+    def _pedir_token(self, integracion):
+        try:
+            respuesta = requests.post(
+                integracion.token_url,
+                data={
+                    'grant_type': 'client_credentials',
+                    'client_id': integracion.client_id,
+                    'client_secret': integracion.client_secret,
+                    'scope': integracion.scope,
+                },
+                timeout=integracion.timeout_segundos,
+            )
+            respuesta.raise_for_status()
+            cuerpo = respuesta.json()
+        except (requests.RequestException, ValueError) as e:
+            raise ErrorPrestador(f'{integracion.token_url}: no se pudo obtener el token ({e})') from e
+
+        if 'access_token' not in cuerpo:
+            raise ErrorPrestador(f'{integracion.token_url}: respuesta sin access_token')
+
+        ahora = time.time()
+        duracion = int(cuerpo.get('expires_in', 3600))
+        return {
+            'access_token': cuerpo['access_token'],
+            'expira': ahora + duracion,
+            # Con tokens cortos, una ventana fija quedaría siempre abierta y cada pedido renovaría
+            'renovar_desde': ahora + duracion - min(RENOVAR_ANTES, duracion / 2),
+        }
+
+
+gestor_tokens = GestorTokens()
@@ -7,4 +7,7 @@ app_name = "salud"
 urlpatterns = [
     path("", views.home, name="home"),
     path("dashboard/", dashboard_salud, name="dashboard"),
+    path("calendario/rotar/", views.rotar_calendario, name="rotar_calendario"),
+    path("calendario/<str:token>/turnos.ics", views.calendario_persona, name="calendario_persona"),
+    path("calendario/prestador/<str:token>/turnos.ics", views.calendario_prestador, name="calendario_prestador"),
 ]
@@ -1,77 +1,91 @@
+from asgiref.sync import sync_to_async
+from django.http import Http404, StreamingHttpResponse
+from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.shortcuts import render
+from django.shortcuts import get_object_or_404, redirect, render
+from django.urls import reverse
 from django.utils import timezone
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_GET, require_POST
+from comedor.decorators import login_required_async
+from persona.models import Persona
+from .calendario import etag_feed, generar_ics, leer_token, rotar_token, token_calendario, turnos_feed
 from .models import (
     CoberturaSalud,
+    PrestadorSalud,
     TurnoSalud,
     AtencionSalud,
-    RegistroIntegracion,
+    ResumenIntegracion,
     AfiliacionSalud,
     IntegracionPrestadorSalud,
 )
 
-@login_required
-def dashboard_salud(request):
-    cobertura = (
+@login_required_async
+async def dashboard_salud(request):
+    persona = await Persona.objects.aget(usuario=request.user)
+    cobertura = await (
         CoberturaSalud.objects
+        .con_vigencia()
         .select_related("plan", "plan__prestador")
-        .filter(persona=request.user.persona, activa=True)
-        .first()
+        .filter(persona=persona, activa=True)
+        .afirst()
     )
 
     ultimo_pago = None
     if cobertura:
-        ultimo_pago = cobertura.pagos.order_by("-fecha_creacion").first()
+        ultimo_pago = await cobertura.pagos.order_by("-fecha_creacion").afirst()
 
-    turnos = (
+    turnos = [
+        turno async for turno in
         TurnoSalud.objects
         .select_related("prestador", "cobertura")
-        .filter(persona=request.user.persona, fecha_hora__gte=timezone.now())
+        .filter(persona=persona, fecha_hora__gte=timezone.now())
         .order_by("fecha_hora")[:5]
-    )
+    ]
 
-    historial = (
+    historial = [
+        atencion async for atencion in
         AtencionSalud.objects
         .select_related("prestador", "cobertura")
-        .filter(persona=request.user.persona)
+        .filter(persona=persona)
         .order_by("-fecha")[:5]
-    )
+    ]
 
     afiliacion = None
     if cobertura:
-        afiliacion = (
+        afiliacion = await (
             AfiliacionSalud.objects
             .select_related("prestador")
-            .filter(persona=request.user.persona, prestador=cobertura.plan.prestador)
-            .first()
+            .filter(persona=persona, prestador=cobertura.plan.prestador)
+            .afirst()
         )
     if afiliacion is None:
-        afiliacion = (
+        afiliacion = await (
             AfiliacionSalud.objects
             .select_related("prestador")
-            .filter(persona=request.user.persona)
+            .filter(persona=persona)
             .order_by("-ultima_actualizacion")
-            .first()
+            .afirst()
         )
 
     integracion = None
     if afiliacion:
-        integracion = (
+        integracion = await (
             IntegracionPrestadorSalud.objects
             .select_related("prestador")
             .filter(prestador=afiliacion.prestador)
-            .first()
+            .afirst()
         )
 
-    ultima_integracion = (
-        RegistroIntegracion.objects
-        .filter(persona=request.user.persona)
+    ultima_integracion = await (
+        ResumenIntegracion.objects
+        .filter(persona=persona)
         .select_related("prestador")
-        .order_by("-fecha")
-        .first()
+        .afirst()
     )
 
-    return render(
+    # El render va en un hilo: el layout lee relaciones del usuario de forma perezosa
+    return await sync_to_async(render)(
         request,
         "salud/dashboard.html",
         {
@@ -82,7 +96,62 @@ def dashboard_salud(request):
             "afiliacion": afiliacion,
             "integracion": integracion,
             "ultima_integracion": ultima_integracion,
+            "url_calendario": request.build_absolute_uri(
+                reverse(
+                    "salud:calendario_persona",
+                    args=[await sync_to_async(token_calendario)("persona", persona.pk)],
+                )
+            ),
         }
     )
+
+
 def home(request):
     return render(request, "salud/home.html")
+
+
+@login_required
+@require_POST
+def rotar_calendario(request):
+    persona = get_object_or_404(Persona, usuario=request.user)
+    rotar_token("persona", persona.pk)
+    messages.success(request, "Se generó una nueva URL de calendario; la anterior ya no funciona.")
+    return redirect("salud:dashboard")
+
+
+def _turnos_persona(token):
+    persona_id = leer_token(token, "persona")
+    if persona_id is None:
+        raise Http404
+    return turnos_feed(persona_id=persona_id)
+
+
+def _turnos_prestador(token):
+    prestador_id = leer_token(token, "prestador")
+    if prestador_id is None:
+        raise Http404
+    return turnos_feed(prestador_id=prestador_id)
+
+
+def _respuesta_ics(contenido, nombre_archivo):
+    response = StreamingHttpResponse(contenido, content_type="text/calendar; charset=utf-8")
+    response["Content-Disposition"] = f'inline; filename="{nombre_archivo}"'
+    return response
+
+
+@require_GET
+@cache_control(private=True, max_age=300)
+@condition(etag_func=lambda request, token: etag_feed(_turnos_persona(token)))
+def calendario_persona(request, token):
+    return _respuesta_ics(generar_ics(_turnos_persona(token), "Mis turnos de salud"), "turnos.ics")
+
+
+@require_GET
+@cache_control(private=True, max_age=300)
+@condition(etag_func=lambda request, token: etag_feed(_turnos_prestador(token)))
+def calendario_prestador(request, token):
+    prestador = get_object_or_404(PrestadorSalud, pk=leer_token(token, "prestador"))
+    return _respuesta_ics(
+        generar_ics(_turnos_prestador(token), f"Turnos {prestador.nombre}", con_persona=True),
+        f"turnos-{prestador.codigo}.ics",
+    )
@@ -1,16 +1,17 @@
 """
-ASGI config for djhtmx project.
+ASGI config for src project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Para servirlo: ``uvicorn src.asgi:application --workers 4``.
 
 For more information on this file, see
-https://docs.djangoproject.com/en/4.0/howto/deployment/asgi/
+https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
 
 import os
 
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'djhtmx.settings')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'src.settings')
 
 application = get_asgi_application()
@@ -1,5 +1,6 @@
 import os
 import sys
+import tempfile
 
 from pathlib import Path
 from django.templatetags.static import static
@@ -56,13 +57,26 @@ DATE_FORMAT = 'd/m/Y'
 # Application definition
 #FORCE_SCRIPT_NAME = '/turismo'
 
+# Apps instaladas que el código no usa: cada una suma imports al arranque de cada proceso
+# de mod_wsgi y de cada comando (ver `python manage.py perfil_arranque`). Se activan por nombre,
+# ej. APPS_OPCIONALES=captcha,socialaccount
+APPS_OPCIONALES = env.list('APPS_OPCIONALES', default=[])
+
+
+def _opcional(nombre, *apps):
+    return list(apps) if nombre in APPS_OPCIONALES else []
+
+
 INSTALLED_APPS = [
     #'jazzmin',
     "unfold",  # before django.contrib.admin
-    "unfold.contrib.filters",  # optional, if special filters are needed
-    "unfold.contrib.forms",  # optional, if special form elements are needed
-    "unfold.contrib.inlines",  # optional, if special inlines are needed
-    "unfold.contrib.simple_history",
+    *_opcional(
+        'unfold_contrib',
+        "unfold.contrib.filters",  # optional, if special filters are needed
+        "unfold.contrib.forms",  # optional, if special form elements are needed
+        "unfold.contrib.inlines",  # optional, if special inlines are needed
+        "unfold.contrib.simple_history",
+    ),
     'django.contrib.admin',
     'django.contrib.auth',
     'django.contrib.contenttypes',
@@ -75,26 +89,29 @@ INSTALLED_APPS = [
     # 3rd party
     'allauth',
     'allauth.account',
-    'allauth.socialaccount',
+    *_opcional('socialaccount', 'allauth.socialaccount'),
     'materializecssform',
     #'hitcount',
     'corsheaders',
     'imagekit',
-    'widget_tweaks',
+    *_opcional('widget_tweaks', 'widget_tweaks'),
     'simple_history',
 
     # local
     'accounts',
-    'captcha',
+    *_opcional('captcha', 'captcha'),
     'comedor',
     'persona',
     'salud',
+    'rendimiento',
+    'tareas',
 
 
     
 ]
 
 MIDDLEWARE = [
+    'rendimiento.middleware.MedicionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'simple_history.middleware.HistoryRequestMiddleware',
@@ -142,11 +159,19 @@ WSGI_APPLICATION = 'src.wsgi.application'
     }
 }'''
 
+# Conexiones persistentes: segundos que un proceso reutiliza su conexión (0 = una por request).
+# Con health checks se verifica una conexión reutilizada antes del primer uso en cada request.
+DB_CONN_MAX_AGE = env.int('DB_CONN_MAX_AGE', default=0 if DEBUG else 60)
+DB_CONN_HEALTH_CHECKS = env.bool('DB_CONN_HEALTH_CHECKS', default=True)
+
 if DEBUG:
     DATABASES = {
         'default': {
-            'ENGINE': 'django.db.backends.sqlite3',
+            # Transacciones BEGIN IMMEDIATE: ver rendimiento/sqlite3/base.py
+            'ENGINE': 'rendimiento.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': DB_CONN_HEALTH_CHECKS,
         }
     }
 
@@ -160,9 +185,77 @@ else:
             'PASSWORD': env('POSTGRESQL_PASS'),
             'HOST': env('POSTGRESQL_HOST'),
             'PORT': env('POSTGRESQL_PORT'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': DB_CONN_HEALTH_CHECKS,
+            # Con pgbouncer en modo transaction, un cursor con nombre (.iterator()) no sobrevive
+            # al fin de la transacción porque la conexión del servidor vuelve al pool
+            'DISABLE_SERVER_SIDE_CURSORS': env.bool('DB_PGBOUNCER', default=False),
         }
     }
 
+# PRAGMAs que se aplican a cada conexión SQLite nueva (ver rendimiento.signals).
+# WAL permite leer mientras otro proceso escribe; busy_timeout espera el lock en lugar de
+# fallar con "database is locked"; synchronous=NORMAL es seguro con WAL y evita un fsync por commit.
+SQLITE_PRAGMAS = {
+    'journal_mode': env('SQLITE_JOURNAL_MODE', default='WAL'),
+    'busy_timeout': env.int('SQLITE_BUSY_TIMEOUT_MS', default=5000),
+    'synchronous': env('SQLITE_SYNCHRONOUS', default='NORMAL'),
+}
+
+# Caché en dos niveles (ver rendimiento.cache): L1 en memoria del proceso, chica y de TTL corto,
+# y L2 compartida entre los procesos de mod_wsgi. CACHE_L2: archivo (sin servicios externos),
+# base (requiere `python manage.py createcachetable`) o redis (REDIS_URL, paquete redis instalado).
+CACHE_L2 = env('CACHE_L2', default='archivo')
+# Archivo y base borran entradas al azar al pasar MAX_ENTRIES (300 por defecto): alcanzar para
+# una entrada de elegibilidad por estudiante y por día, y al llenarse borrar de a un décimo
+_CACHE_L2_LIMITES = {
+    'MAX_ENTRIES': env.int('CACHE_L2_ENTRADAS', default=50000),
+    'CULL_FREQUENCY': env.int('CACHE_L2_CULL_FREQUENCY', default=10),
+}
+_CACHE_L2 = {
+    'archivo': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': env('CACHE_DIR', default=os.path.join(tempfile.gettempdir(), 'comedor-cache')),
+        'OPTIONS': _CACHE_L2_LIMITES,
+    },
+    'base': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'comedor_cache',
+        'OPTIONS': _CACHE_L2_LIMITES,
+    },
+    'redis': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': env('REDIS_URL', default='redis://127.0.0.1:6379/1'),
+    },
+}
+# Cola de trabajos en la base (app tareas, `manage.py run_worker`)
+TAREAS_BACKOFF_BASE = env.int('TAREAS_BACKOFF_BASE', default=10)
+TAREAS_VENCIMIENTO = env.int('TAREAS_VENCIMIENTO', default=600)
+COMEDOR_QR_EN_SEGUNDO_PLANO = env.bool('COMEDOR_QR_EN_SEGUNDO_PLANO', default=False)
+# Procesos que arman las planillas de tickets en PDF (0: en el mismo proceso; ver comedor/planillas.py)
+COMEDOR_PLANILLAS_PROCESOS = env.int('COMEDOR_PLANILLAS_PROCESOS', default=2)
+# Contadores en que se reparte el cupo de cada turno (ver comedor/turnos.py)
+COMEDOR_TURNOS_FRANJAS = env.int('COMEDOR_TURNOS_FRANJAS', default=8)
+# Segundos que se recuerda la clave de idempotencia de una compra (ver comedor/idempotencia.py)
+COMEDOR_IDEMPOTENCIA_TTL = env.int('COMEDOR_IDEMPOTENCIA_TTL', default=3600)
+# Horarios de las tareas periódicas (`manage.py run_scheduler`) que cambian el del código;
+# None deshabilita la tarea. Ej.: {'salud.sincronizar_incremental': '*/15 * * * *'}
+TAREAS_PERIODICAS = {}
+
+CACHES = {
+    'default': {
+        **_CACHE_L2[CACHE_L2],
+        'TIMEOUT': env.int('CACHE_TIMEOUT', default=300),
+        'KEY_PREFIX': 'comedor',
+    },
+    'local': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'comedor-l1',
+        'TIMEOUT': env.int('CACHE_L1_TIMEOUT', default=10),
+        'OPTIONS': {'MAX_ENTRIES': env.int('CACHE_L1_ENTRADAS', default=500)},
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.0/ref/settings/#auth-password-validators
@@ -256,5 +349,70 @@ CORS_ALLOWED_ORIGINS = [
 
 CORS_ALLOW_ALL_ORIGINS = True
 
+# Medición de requests (rendimiento.middleware.MedicionMiddleware)
+RENDIMIENTO_MUESTREO = env.float('RENDIMIENTO_MUESTREO', default=0.1)
+RENDIMIENTO_UMBRALES = {
+    'default': env.int('RENDIMIENTO_UMBRAL_MS', default=1000),
+}
+
+# Detección de N+1 y máximo de consultas por vista (view_name); en modo
+# estricto exceder el presupuesto levanta una excepción (falla el test).
+# src.settings_test lo activa; las vistas que responden en streaming
+# (calendarios .ics) consultan después del middleware y no tienen presupuesto
+RENDIMIENTO_DETECTAR_NMAS1 = env.bool('RENDIMIENTO_DETECTAR_NMAS1', default=DEBUG)
+RENDIMIENTO_ESTRICTO = env.bool('RENDIMIENTO_ESTRICTO', default=False)
+PRESUPUESTO_CONSULTAS = {
+    'comprar_tickets': 25,
+    'generar_ticket_gratuito': 25,
+    'mis_tickets': 8,
+    'detalle_ticket': 8,
+    'carrousel': 5,
+    'panel_admin': 25,
+    'listar_beneficiarios': 12,
+    'detalle_beneficiario': 15,
+    'listar_becas': 8,
+    'salud:dashboard': 15,
+}
+
+# /metrics (rendimiento.views.metricas): IPs del scraper de Prometheus y
+# directorio compartido donde cada proceso vuelca sus métricas
+RENDIMIENTO_METRICAS_IPS = env.list('RENDIMIENTO_METRICAS_IPS', default=['127.0.0.1', '::1'])
+RENDIMIENTO_METRICAS_DIR = env('RENDIMIENTO_METRICAS_DIR', default=os.path.join(tempfile.gettempdir(), 'comedor-metricas'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'simple': {
+            'format': '{asctime} {levelname} {name} {message}',
+            'style': '{',
+        },
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'simple',
+        },
+    },
+    'root': {
+        'handlers': ['console'],
+        'level': 'WARNING',
+    },
+    'loggers': {
+        'rendimiento': {
+            'handlers': ['console'],
+            'level': env('RENDIMIENTO_LOG_LEVEL', default='INFO'),
+            'propagate': False,
+        },
+        # INFO también en desarrollo; APP_LOG_LEVEL=DEBUG para ver el detalle
+        'comedor': {
+            'level': env('APP_LOG_LEVEL', default='INFO'),
+        },
+        'accounts': {
+            'level': env('APP_LOG_LEVEL', default='INFO'),
+        },
+    },
+}
+
 HITCOUNT_KEEP_HIT_IN_DATABASE = { 'days': 30 }
 HITCOUNT_KEEP_HIT_ACTIVE = { 'days': 1 }
@@ -0,0 +1,15 @@
+"""Settings para los tests: igual que ``settings`` pero con presupuestos de consultas estrictos"""
+from .settings import *  # noqa: F401,F403
+
+RENDIMIENTO_ESTRICTO = True
+RENDIMIENTO_MUESTREO = 0
+
+# L2 en memoria: los tests no leen ni ensucian la caché compartida de desarrollo
+CACHES = {
+    **CACHES,  # noqa: F405
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'comedor-l2-tests',
+        'KEY_PREFIX': 'comedor',
+    },
+}
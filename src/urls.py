@@ -10,7 +10,6 @@ urlpatterns = [
     path("", views.home, name='home'),
     # admin
     path('admin/', admin.site.urls),
-    path('captcha/', include('captcha.urls')),
     # allauth & accounts
     path('accounts/', include('allauth.urls')),
     path('accounts/', include("accounts.urls", namespace="accounts")),
@@ -21,9 +20,14 @@ urlpatterns = [
 
     path("salud/", include("salud.urls")),
 
+    path("", include("rendimiento.urls")),
+
 
 ]
 
+if 'captcha' in settings.APPS_OPCIONALES:
+    urlpatterns += [path('captcha/', include('captcha.urls'))]
+
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
@@ -0,0 +1,28 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import TareaPeriodica, Trabajo
+
+
+@admin.register(Trabajo)
+class TrabajoAdmin(admin.ModelAdmin):
+    list_display = ('id', 'tarea', 'estado', 'prioridad', 'intentos', 'max_intentos', 'disponible_desde', 'terminado_en')
+    list_filter = ('estado', 'tarea')
+    search_fields = ('tarea', 'clave')
+    readonly_fields = ('tomado_por', 'tomado_en', 'terminado_en', 'resultado', 'ultimo_error', 'fecha_creacion')
+
+    @admin.action(description='Reintentar los fallidos ahora')
+    def reintentar(self, request, queryset):
+        queryset.filter(estado='fallido').update(estado='pendiente', intentos=0, disponible_desde=timezone.now())
+
+    actions = ['reintentar']
+
+
+@admin.register(TareaPeriodica)
+class TareaPeriodicaAdmin(admin.ModelAdmin):
+    list_display = ('nombre', 'ultima_programada', 'ultimo_estado', 'ultima_duracion', 'ultimo_fin', 'en_curso_por')
+    list_filter = ('ultimo_estado',)
+    readonly_fields = (
+        'nombre', 'ultima_programada', 'en_curso_por', 'en_curso_desde',
+        'ultimo_estado', 'ultima_duracion', 'ultimo_fin', 'ultimo_error',
+    )
@@ -0,0 +1,288 @@
+"""
+Cola de trabajos en segundo plano guardada en la base, sin broker.
+
+Las funciones se registran con ``@tarea`` en el módulo ``tareas.py`` de cada
+app y se encolan con ``encolar`` (o ``funcion.encolar``); el trabajo queda en
+la misma transacción que lo creó, así que el worker lo ve recién con el commit.
+
+Los workers (``manage.py run_worker``) toman trabajos por prioridad y
+antigüedad. En PostgreSQL con ``SELECT ... FOR UPDATE SKIP LOCKED``: cada
+worker salta las filas que otro está tomando. En SQLite, que no lo tiene,
+con un ``UPDATE`` condicional por candidato (``WHERE estado = 'pendiente'``):
+si otro worker lo tomó antes, el update no afecta filas y se sigue con el
+próximo. Un trabajo que falla se reintenta con backoff exponencial hasta
+``max_intentos``.
+
+Mientras un trabajo corre, el worker renueva su ``tomado_en`` cada
+``TAREAS_VENCIMIENTO / 4`` segundos desde otro hilo. Sólo un trabajo sin
+renovar durante ``TAREAS_VENCIMIENTO`` segundos (worker caído) vuelve a la
+cola; uno largo pero vivo no se ejecuta dos veces a la vez.
+"""
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connections, router, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from rendimiento import metricas
+
+from .models import Trabajo
+
+logger = logging.getLogger('tareas')
+
+BACKOFF_BASE = getattr(settings, 'TAREAS_BACKOFF_BASE', 10)
+BACKOFF_MAXIMO = getattr(settings, 'TAREAS_BACKOFF_MAXIMO', 3600)
+VENCIMIENTO = getattr(settings, 'TAREAS_VENCIMIENTO', 600)
+LATIDO = VENCIMIENTO / 4
+
+REGISTRO = {}
+
+
+class TareaDesconocida(Exception):
+    pass
+
+
+def tarea(funcion=None, *, nombre=None, prioridad=0, max_intentos=3):
+    """
+    Registra una función como tarea (``'<app>.<función>'`` si no se da
+    ``nombre``). Los argumentos deben ser serializables a JSON.
+    """
+    def registrar(funcion):
+        funcion.nombre_tarea = nombre or f'{funcion.__module__.split(".")[0]}.{funcion.__name__}'
+        funcion.prioridad = prioridad
+        funcion.max_intentos = max_intentos
+        funcion.encolar = lambda *args, **kwargs: encolar(funcion, *args, **kwargs)
+        REGISTRO[funcion.nombre_tarea] = funcion
+        return funcion
+
+    return registrar(funcion) if funcion else registrar
+
+
+def encolar(funcion, *args, clave=None, prioridad=None, demora=None, **kwargs):
+    """
+    Crea un trabajo para ``funcion`` (la función registrada o su nombre).
+    Con ``clave``, si ya hay un trabajo activo con la misma clave se devuelve
+    ese en lugar de crear otro. ``demora`` en segundos posterga la ejecución.
+    """
+    if isinstance(funcion, str):
+        funcion = REGISTRO[funcion]
+    campos = {
+        'tarea': funcion.nombre_tarea,
+        'argumentos': {'args': list(args), 'kwargs': kwargs},
+        'prioridad': funcion.prioridad if prioridad is None else prioridad,
+        'max_intentos': funcion.max_intentos,
+        'clave': clave,
+    }
+    if demora:
+        campos['disponible_desde'] = timezone.now() + timedelta(seconds=demora)
+    if clave is None:
+        return Trabajo.objects.create(**campos)
+    try:
+        with transaction.atomic():
+            return Trabajo.objects.create(**campos)
+    except IntegrityError:
+        existente = Trabajo.objects.filter(clave=clave, estado__in=Trabajo.ACTIVOS).first()
+        if existente is None:
+            raise
+        return existente
+
+
+def tomar(trabajador, cantidad=1):
+    """Marca como en curso hasta ``cantidad`` trabajos disponibles y los devuelve"""
+    ahora = timezone.now()
+    pendientes = (
+        Trabajo.objects
+        .filter(estado='pendiente', disponible_desde__lte=ahora)
+        .order_by('-prioridad', 'disponible_desde', 'id')
+    )
+    marcar = {
+        'estado': 'en_curso',
+        'tomado_por': trabajador,
+        'tomado_en': ahora,
+        'intentos': F('intentos') + 1,
+    }
+    conexion = connections[router.db_for_write(Trabajo)]
+
+    if conexion.features.has_select_for_update_skip_locked:
+        with transaction.atomic(using=conexion.alias):
+            ids = list(pendientes.select_for_update(skip_locked=True).values_list('id', flat=True)[:cantidad])
+            Trabajo.objects.filter(id__in=ids).update(**marcar)
+    else:
+        ids = []
+        # Algunos candidatos de más por si otro worker gana la carrera
+        for candidato in pendientes.values_list('id', flat=True)[:cantidad * 5]:
+            if Trabajo.objects.filter(id=candidato, estado='pendiente').update(**marcar):
+                ids.append(candidato)
+                if len(ids) == cantidad:
+                    break
+    return list(Trabajo.objects.filter(id__in=ids).order_by('-prioridad', 'disponible_desde', 'id'))
+
+
+def _serializable(valor):
+    try:
+        json.dumps(valor)
+        return valor
+    except TypeError:
+        return str(valor)
+
+
+def espera_reintento(intentos):
+    """Backoff exponencial con jitter: BASE, 2*BASE, 4*BASE... hasta BACKOFF_MAXIMO"""
+    return min(BACKOFF_BASE * 2 ** (intentos - 1), BACKOFF_MAXIMO) * random.uniform(0.8, 1.2)
+
+
+def ejecutar(trabajo):
+    """Ejecuta un trabajo tomado y registra el resultado; devuelve el estado final"""
+    inicio = time.perf_counter()
+    metricas.trabajos_en_curso.inc()
+    try:
+        funcion = REGISTRO.get(trabajo.tarea)
+        if funcion is None:
+            raise TareaDesconocida(trabajo.tarea)
+        resultado = funcion(*trabajo.argumentos.get('args', []), **trabajo.argumentos.get('kwargs', {}))
+    except Exception as error:
+        estado = _fallar(trabajo, error)
+    else:
+        estado = 'completado'
+        Trabajo.objects.filter(pk=trabajo.pk, tomado_por=trabajo.tomado_por).update(
+            estado=estado, terminado_en=timezone.now(), resultado=_serializable(resultado), ultimo_error='',
+        )
+    finally:
+        metricas.trabajos_en_curso.dec()
+
+    duracion = time.perf_counter() - inicio
+    metricas.duracion_trabajos.observar(duracion, tarea=trabajo.tarea)
+    metricas.trabajos_total.inc(tarea=trabajo.tarea, resultado=estado)
+    logger.info(json.dumps(
+        {'trabajo': trabajo.pk, 'tarea': trabajo.tarea, 'estado': estado, 'intento': trabajo.intentos,
+         'ms': round(duracion * 1000, 1)},
+        ensure_ascii=False,
+    ))
+    return estado
+
+
+def _fallar(trabajo, error):
+    detalle = ''.join(traceback.format_exception(error))[-4000:]
+    reintentar = trabajo.intentos < trabajo.max_intentos and not isinstance(error, TareaDesconocida)
+    if reintentar:
+        estado = 'reintento'
+        campos = {
+            'estado': 'pendiente',
+            'disponible_desde': timezone.now() + timedelta(seconds=espera_reintento(trabajo.intentos)),
+        }
+    else:
+        estado = 'fallido'
+        campos = {'estado': 'fallido', 'terminado_en': timezone.now()}
+    Trabajo.objects.filter(pk=trabajo.pk, tomado_por=trabajo.tomado_por).update(ultimo_error=detalle, **campos)
+    logger.warning(f'{trabajo.tarea} #{trabajo.pk} intento {trabajo.intentos}/{trabajo.max_intentos}: {error!r}')
+    return estado
+
+
+def liberar_vencidos(vencimiento=VENCIMIENTO):
+    """Devuelve a la cola (o da por fallidos) los trabajos en curso de workers que no terminaron"""
+    limite = timezone.now() - timedelta(seconds=vencimiento)
+    vencidos = Trabajo.objects.filter(estado='en_curso', tomado_en__lt=limite)
+    error = f'Sin terminar después de {vencimiento}s (¿worker caído?)'
+    fallidos = vencidos.filter(intentos__gte=F('max_intentos')).update(
+        estado='fallido', terminado_en=timezone.now(), ultimo_error=error,
+    )
+    liberados = vencidos.update(estado='pendiente', ultimo_error=error)
+    return liberados, fallidos
+
+
+def purgar(dias=7):
+    """Borra los trabajos completados hace más de ``dias`` días"""
+    limite = timezone.now() - timedelta(days=dias)
+    return Trabajo.objects.filter(estado='completado', terminado_en__lt=limite).delete()[0]
+
+
+class Worker:
+    """
+    ``concurrencia`` hilos que toman y ejecutan trabajos. Con ``una_vez``
+    cada hilo termina cuando no encuentra más trabajos disponibles.
+    """
+
+    def __init__(self, concurrencia=2, intervalo=1.0, una_vez=False, max_trabajos=None):
+        self.concurrencia = concurrencia
+        self.intervalo = intervalo
+        self.una_vez = una_vez
+        self.max_trabajos = max_trabajos
+        self.nombre = f'{socket.gethostname()}:{os.getpid()}'
+        self.detener = threading.Event()
+        self.estados = {}
+        self.en_curso = set()
+        self._lock = threading.Lock()
+        self._ultima_liberacion = 0.0
+
+    def iniciar(self):
+        hilos = [
+            threading.Thread(target=self._bucle, args=(indice,), name=f'worker-{indice}')
+            for indice in range(self.concurrencia)
+        ]
+        for hilo in hilos:
+            hilo.start()
+        threading.Thread(target=self._latir, args=(hilos,), name='worker-latido', daemon=True).start()
+        return hilos
+
+    def _latir(self, hilos):
+        """Renueva ``tomado_en`` de los trabajos en curso para que no se den por vencidos"""
+        try:
+            while not self.detener.wait(LATIDO) and any(hilo.is_alive() for hilo in hilos):
+                with self._lock:
+                    ids = list(self.en_curso)
+                if ids:
+                    Trabajo.objects.filter(
+                        id__in=ids, estado='en_curso', tomado_por__startswith=f'{self.nombre}:',
+                    ).update(tomado_en=timezone.now())
+                close_old_connections()
+        finally:
+            connections.close_all()
+
+    def _contar(self, estado):
+        with self._lock:
+            self.estados[estado] = self.estados.get(estado, 0) + 1
+            if self.max_trabajos and sum(self.estados.values()) >= self.max_trabajos:
+                self.detener.set()
+
+    def _liberar_si_corresponde(self):
+        with self._lock:
+            if time.monotonic() - self._ultima_liberacion < 60:
+                return
+            self._ultima_liberacion = time.monotonic()
+        liberados, fallidos = liberar_vencidos()
+        if liberados or fallidos:
+            logger.warning(f'{liberados} trabajos vencidos devueltos a la cola, {fallidos} dados por fallidos')
+
+    def _bucle(self, indice):
+        trabajador = f'{self.nombre}:{indice}'
+        try:
+            while not self.detener.is_set():
+                close_old_connections()
+                self._liberar_si_corresponde()
+                trabajos = tomar(trabajador)
+                if not trabajos:
+                    if self.una_vez:
+                        break
+                    self.detener.wait(self.intervalo)
+                    continue
+                for trabajo in trabajos:
+                    with self._lock:
+                        self.en_curso.add(trabajo.pk)
+                    try:
+                        estado = ejecutar(trabajo)
+                    finally:
+                        with self._lock:
+                            self.en_curso.discard(trabajo.pk)
+                    self._contar(estado)
+                metricas.volcar_si_corresponde()
+        finally:
+            connections.close_all()
@@ -0,0 +1,76 @@
+import logging
+import signal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from tareas.models import TareaPeriodica
+from tareas.periodicas import PERIODICAS, Programador, ejecutar_ahora
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta las tareas periódicas (@periodica) en un proceso que queda corriendo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tarea', action='append', help='Programar sólo esta tarea (se puede repetir)')
+        parser.add_argument('--listar', action='store_true', help='Mostrar las tareas, su horario y la última ejecución')
+        parser.add_argument('--ejecutar', metavar='TAREA', help='Ejecutar una tarea ahora, una vez, y terminar')
+
+    def handle(self, *args, **options):
+        if options['verbosity'] >= 2:
+            logging.getLogger('tareas').setLevel(logging.INFO)
+
+        nombres = options['tarea'] or []
+        desconocidas = set(nombres + ([options['ejecutar']] if options['ejecutar'] else [])) - set(PERIODICAS)
+        if desconocidas:
+            raise CommandError(
+                f'Tareas desconocidas: {", ".join(sorted(desconocidas))}. Registradas: {", ".join(sorted(PERIODICAS))}'
+            )
+
+        if options['listar']:
+            return self.listar()
+        if options['ejecutar']:
+            programador = Programador()
+            estado = ejecutar_ahora(options['ejecutar'], programador.nombre)
+            estilo = self.style.SUCCESS if estado == 'ok' else self.style.WARNING
+            self.stdout.write(estilo(f'  ✓ {options["ejecutar"]}: {estado}'))
+            return
+
+        programador = Programador(nombres)
+
+        def detener(signum, frame):
+            self.stdout.write(self.style.WARNING('  - Terminando las tareas en curso...'))
+            programador.detener.set()
+
+        signal.signal(signal.SIGTERM, detener)
+        signal.signal(signal.SIGINT, detener)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\nProgramador {programador.nombre}: {len(programador.tareas)} tareas periódicas'
+        ))
+        for funcion in programador.tareas:
+            self.stdout.write(f'    {funcion.nombre_tarea:<40} {funcion.cron}')
+
+        programador.bucle()
+        # join con timeout: el hilo principal tiene que seguir atendiendo las señales
+        while programador.en_curso():
+            for hilo in programador.en_curso():
+                hilo.join(timeout=0.5)
+        self.stdout.write(self.style.SUCCESS('  ✓ Programador detenido'))
+
+    def listar(self):
+        ahora = timezone.now()
+        filas = {fila.nombre: fila for fila in TareaPeriodica.objects.all()}
+        for nombre, funcion in sorted(PERIODICAS.items()):
+            fila = filas.get(nombre)
+            horario = str(funcion.cron) if funcion.cron else 'deshabilitada'
+            proxima = timezone.localtime(funcion.cron.siguiente(ahora)).strftime('%d/%m %H:%M') if funcion.cron else '-'
+            ultima = '-'
+            if fila and fila.ultimo_fin:
+                ultima = (
+                    f'{timezone.localtime(fila.ultimo_fin):%d/%m %H:%M} {fila.ultimo_estado} '
+                    f'({fila.ultima_duracion:.1f}s)'
+                )
+            if fila and fila.en_curso_por:
+                ultima += f', en curso en {fila.en_curso_por}'
+            self.stdout.write(f'  {nombre:<40} {horario:<16} próxima {proxima:<12} última {ultima}')
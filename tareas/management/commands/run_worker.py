@@ -0,0 +1,51 @@
+import logging
+import signal
+
+from django.core.management.base import BaseCommand
+
+from tareas.cola import REGISTRO, Worker
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta los trabajos encolados en la base (tareas registradas con @tarea)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrencia', type=int, default=2, help='Hilos que ejecutan trabajos en paralelo')
+        parser.add_argument(
+            '--intervalo', type=float, default=1.0, help='Segundos de espera cuando la cola está vacía',
+        )
+        parser.add_argument(
+            '--una-vez', action='store_true', help='Terminar cuando no queden trabajos disponibles (cron, pruebas)',
+        )
+        parser.add_argument('--max-trabajos', type=int, help='Terminar después de ejecutar esta cantidad')
+
+    def handle(self, *args, **options):
+        if options['verbosity'] >= 2:
+            logging.getLogger('tareas').setLevel(logging.INFO)
+
+        worker = Worker(
+            concurrencia=options['concurrencia'],
+            intervalo=options['intervalo'],
+            una_vez=options['una_vez'],
+            max_trabajos=options['max_trabajos'],
+        )
+
+        def detener(signum, frame):
+            self.stdout.write(self.style.WARNING('  - Terminando los trabajos en curso...'))
+            worker.detener.set()
+
+        signal.signal(signal.SIGTERM, detener)
+        signal.signal(signal.SIGINT, detener)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'\nWorker {worker.nombre}: {options["concurrencia"]} hilos, '
+            f'{len(REGISTRO)} tareas registradas ({", ".join(sorted(REGISTRO))})'
+        ))
+        hilos = worker.iniciar()
+        # join con timeout: el hilo principal tiene que seguir atendiendo las señales
+        while any(hilo.is_alive() for hilo in hilos):
+            for hilo in hilos:
+                hilo.join(timeout=0.5)
+
+        resumen = ', '.join(f'{estado}={cantidad}' for estado, cantidad in sorted(worker.estados.items()))
+        self.stdout.write(self.style.SUCCESS(f'  ✓ Worker detenido: {resumen or "sin trabajos"}'))
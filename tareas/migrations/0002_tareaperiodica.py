@@ -0,0 +1,32 @@
+# Generated by Django 4.2.5 on 2026-10-19 13:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tareas', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TareaPeriodica',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=100, unique=True)),
+                ('ultima_programada', models.DateTimeField(blank=True, help_text='Horario del cron que se ejecutó (o se tomó) por última vez', null=True)),
+                ('en_curso_por', models.CharField(blank=True, max_length=100)),
+                ('en_curso_desde', models.DateTimeField(blank=True, null=True)),
+                ('ultimo_estado', models.CharField(blank=True, max_length=20)),
+                ('ultima_duracion', models.FloatField(blank=True, help_text='Segundos', null=True)),
+                ('ultimo_fin', models.DateTimeField(blank=True, null=True)),
+                ('ultimo_error', models.TextField(blank=True)),
+            ],
+            options={
+                'verbose_name': 'Tarea periódica',
+                'verbose_name_plural': 'Tareas periódicas',
+                'ordering': ['nombre'],
+            },
+        ),
+    ]
@@ -0,0 +1,87 @@
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class Trabajo(models.Model):
+    """Ejecución pendiente o terminada de una tarea registrada con ``@tarea``"""
+    ESTADO_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('en_curso', 'En curso'),
+        ('completado', 'Completado'),
+        ('fallido', 'Fallido'),
+    ]
+    ACTIVOS = ('pendiente', 'en_curso')
+
+    tarea = models.CharField(max_length=100, verbose_name='Tarea')
+    argumentos = models.JSONField(default=dict, blank=True)
+    prioridad = models.SmallIntegerField(default=0, help_text='Mayor prioridad se toma antes')
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='pendiente')
+    clave = models.CharField(
+        max_length=200,
+        null=True,
+        blank=True,
+        help_text='Deduplicación: no puede haber dos trabajos activos con la misma clave',
+    )
+
+    intentos = models.PositiveSmallIntegerField(default=0)
+    max_intentos = models.PositiveSmallIntegerField(default=3)
+    disponible_desde = models.DateTimeField(default=timezone.now)
+
+    tomado_por = models.CharField(max_length=100, blank=True)
+    tomado_en = models.DateTimeField(null=True, blank=True)
+    terminado_en = models.DateTimeField(null=True, blank=True)
+    resultado = models.JSONField(null=True, blank=True)
+    ultimo_error = models.TextField(blank=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'Trabajo'
+        verbose_name_plural = 'Trabajos'
+        ordering = ['-fecha_creacion']
+        indexes = [
+            # Orden en que los workers toman los pendientes
+            models.Index(
+                fields=['-prioridad', 'disponible_desde', 'id'],
+                condition=Q(estado='pendiente'),
+                name='tareas_trabajo_pendientes',
+            ),
+            models.Index(fields=['estado', 'tomado_en'], name='tareas_trabajo_estado'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['clave'],
+                condition=Q(estado__in=['pendiente', 'en_curso']),
+                name='tareas_trabajo_clave_activa',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.tarea} #{self.pk} ({self.get_estado_display()})'
+
+
+class TareaPeriodica(models.Model):
+    """
+    Estado de una tarea periódica (``@periodica``) compartido entre los
+    procesos de ``run_scheduler``: qué horario programado se ejecutó por
+    última vez y quién la está ejecutando ahora.
+    """
+    nombre = models.CharField(max_length=100, unique=True)
+    ultima_programada = models.DateTimeField(
+        null=True, blank=True, help_text='Horario del cron que se ejecutó (o se tomó) por última vez',
+    )
+    en_curso_por = models.CharField(max_length=100, blank=True)
+    en_curso_desde = models.DateTimeField(null=True, blank=True)
+
+    ultimo_estado = models.CharField(max_length=20, blank=True)
+    ultima_duracion = models.FloatField(null=True, blank=True, help_text='Segundos')
+    ultimo_fin = models.DateTimeField(null=True, blank=True)
+    ultimo_error = models.TextField(blank=True)
+
+    class Meta:
+        verbose_name = 'Tarea periódica'
+        verbose_name_plural = 'Tareas periódicas'
+        ordering = ['nombre']
+
+    def __str__(self):
+        return self.nombre
@@ -0,0 +1,287 @@
+"""
+Tareas periódicas de mantenimiento, ejecutadas por ``manage.py run_scheduler``.
+
+Las funciones se registran con ``@periodica('<expresión cron>')`` en el
+módulo ``tareas.py`` de cada app. La expresión tiene los cinco campos de cron
+(minuto, hora, día, mes, día de la semana, en ``TIME_ZONE``) con ``*``,
+listas, rangos y pasos, o un alias como ``@daily``. ``TAREAS_PERIODICAS``
+cambia el horario de una tarea por nombre, o la deshabilita con ``None``.
+
+Puede haber un programador por host: cada horario se ejecuta una sola vez
+porque, antes de correr, el proceso lo reclama con un ``UPDATE`` condicional
+sobre la fila de la tarea en ``TareaPeriodica`` (sólo si ese horario no se
+tomó todavía y la tarea no está en curso). La fila funciona como un bloqueo
+con vencimiento: si el proceso que la tomó se cae, se libera a los
+``vencimiento`` segundos. En PostgreSQL la ejecución además toma
+``pg_try_advisory_lock``, que el servidor suelta si la conexión se corta.
+"""
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+import zlib
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connections, router
+from django.db.models import Q
+from django.utils import timezone
+
+from rendimiento import metricas
+
+from .cola import purgar
+from .models import TareaPeriodica
+
+logger = logging.getLogger('tareas')
+
+HORARIOS = getattr(settings, 'TAREAS_PERIODICAS', {})
+VENCIMIENTO = getattr(settings, 'TAREAS_VENCIMIENTO', 600)
+
+ALIAS = {
+    '@hourly': '0 * * * *',
+    '@daily': '0 0 * * *',
+    '@weekly': '0 0 * * 0',
+    '@monthly': '0 0 1 * *',
+}
+# minuto, hora, día del mes, mes, día de la semana (0 y 7 son domingo)
+RANGOS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+PERIODICAS = {}
+
+
+def _campo(texto, minimo, maximo):
+    valores = set()
+    for parte in texto.split(','):
+        rango, _, paso = parte.partition('/')
+        if rango == '*':
+            inicio, fin = minimo, maximo
+        elif '-' in rango:
+            inicio, fin = (int(valor) for valor in rango.split('-', 1))
+        else:
+            inicio = int(rango)
+            fin = maximo if paso else inicio
+        paso = int(paso) if paso else 1
+        if not minimo <= inicio <= fin <= maximo or paso < 1:
+            raise ValueError(f'Valor fuera de rango en {parte!r} ({minimo}-{maximo})')
+        valores.update(range(inicio, fin + 1, paso))
+    return valores
+
+
+class Cron:
+    """Expresión de cron de cinco campos"""
+
+    def __init__(self, expresion):
+        self.expresion = expresion
+        campos = ALIAS.get(expresion.strip(), expresion).split()
+        if len(campos) != 5:
+            raise ValueError(f'Se esperaban cinco campos en {expresion!r}')
+        self.minutos, self.horas, self.dias, self.meses, dias_semana = (
+            _campo(texto, minimo, maximo) for texto, (minimo, maximo) in zip(campos, RANGOS)
+        )
+        self.dias_semana = {dia % 7 for dia in dias_semana}
+        # Como en cron: si día del mes y día de la semana están restringidos, alcanza con uno
+        self._ambos_dias = not campos[2].startswith('*') and not campos[4].startswith('*')
+
+    def __str__(self):
+        return self.expresion
+
+    def _coincide_fecha(self, momento):
+        if momento.month not in self.meses:
+            return False
+        dia = momento.day in self.dias
+        semana = momento.isoweekday() % 7 in self.dias_semana
+        return dia or semana if self._ambos_dias else dia and semana
+
+    def anterior(self, momento):
+        """Último horario de la expresión en o antes de ``momento``"""
+        local = timezone.localtime(momento).replace(tzinfo=None, second=0, microsecond=0)
+        limite = local - timedelta(days=366 * 5)
+        while local > limite:
+            if not self._coincide_fecha(local):
+                local = local.replace(hour=23, minute=59) - timedelta(days=1)
+            elif local.hour not in self.horas:
+                local = local.replace(minute=59) - timedelta(hours=1)
+            elif local.minute not in self.minutos:
+                local -= timedelta(minutes=1)
+            else:
+                return timezone.make_aware(local)
+        raise ValueError(f'{self.expresion!r} no tiene horarios')
+
+    def siguiente(self, momento):
+        """Primer horario de la expresión después de ``momento``"""
+        local = timezone.localtime(momento).replace(tzinfo=None, second=0, microsecond=0) + timedelta(minutes=1)
+        limite = local + timedelta(days=366 * 5)
+        while local < limite:
+            if not self._coincide_fecha(local):
+                local = local.replace(hour=0, minute=0) + timedelta(days=1)
+            elif local.hour not in self.horas:
+                local = local.replace(minute=0) + timedelta(hours=1)
+            elif local.minute not in self.minutos:
+                local += timedelta(minutes=1)
+            else:
+                return timezone.make_aware(local)
+        raise ValueError(f'{self.expresion!r} no tiene horarios')
+
+
+def periodica(expresion, *, nombre=None, vencimiento=None):
+    """
+    Registra una función sin argumentos como tarea periódica
+    (``'<app>.<función>'`` si no se da ``nombre``). ``vencimiento`` son los
+    segundos después de los cuales una ejecución sin terminar se da por caída.
+    """
+    def registrar(funcion):
+        funcion.nombre_tarea = nombre or f'{funcion.__module__.split(".")[0]}.{funcion.__name__}'
+        horario = HORARIOS.get(funcion.nombre_tarea, expresion)
+        funcion.cron = Cron(horario) if horario else None
+        funcion.vencimiento = vencimiento or VENCIMIENTO
+        PERIODICAS[funcion.nombre_tarea] = funcion
+        return funcion
+
+    return registrar
+
+
+def reclamar(funcion, programada, ejecutor):
+    """
+    Toma la ejecución del horario ``programada``. Devuelve False si otro
+    proceso ya lo tomó o si la tarea sigue en curso.
+    """
+    ahora = timezone.now()
+    return bool(
+        TareaPeriodica.objects
+        .filter(nombre=funcion.nombre_tarea)
+        .filter(Q(ultima_programada__isnull=True) | Q(ultima_programada__lt=programada))
+        .filter(Q(en_curso_desde__isnull=True) | Q(en_curso_desde__lt=ahora - timedelta(seconds=funcion.vencimiento)))
+        .update(ultima_programada=programada, en_curso_por=ejecutor, en_curso_desde=ahora)
+    )
+
+
+@contextmanager
+def bloqueo_postgres(nombre):
+    """
+    ``pg_try_advisory_lock`` durante la ejecución. Con pgbouncer en modo
+    transacción (``DB_PGBOUNCER``) un bloqueo de sesión no es confiable y
+    queda sólo el de la fila.
+    """
+    conexion = connections[router.db_for_write(TareaPeriodica)]
+    if conexion.vendor != 'postgresql' or conexion.settings_dict.get('DISABLE_SERVER_SIDE_CURSORS'):
+        yield True
+        return
+    clave = zlib.crc32(nombre.encode())
+    with conexion.cursor() as cursor:
+        cursor.execute('SELECT pg_try_advisory_lock(%s)', [clave])
+        tomado = cursor.fetchone()[0]
+    try:
+        yield tomado
+    finally:
+        if tomado:
+            with conexion.cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_unlock(%s)', [clave])
+
+
+def ejecutar(funcion, ejecutor):
+    """Corre una tarea ya reclamada, guarda el resultado y libera la fila; devuelve el estado"""
+    inicio = time.perf_counter()
+    error = ''
+    with bloqueo_postgres(funcion.nombre_tarea) as tomado:
+        if not tomado:
+            estado = 'omitida'
+        else:
+            try:
+                resultado = funcion()
+                estado = 'ok'
+            except Exception as excepcion:
+                estado = 'error'
+                error = ''.join(traceback.format_exception(excepcion))[-4000:]
+                logger.exception(f'Tarea periódica {funcion.nombre_tarea}')
+    duracion = time.perf_counter() - inicio
+
+    campos = {'en_curso_por': '', 'en_curso_desde': None}
+    if estado != 'omitida':
+        campos.update(
+            ultimo_estado=estado, ultima_duracion=duracion, ultimo_fin=timezone.now(), ultimo_error=error,
+        )
+        metricas.duracion_periodicas.observar(duracion, tarea=funcion.nombre_tarea)
+    TareaPeriodica.objects.filter(nombre=funcion.nombre_tarea, en_curso_por=ejecutor).update(**campos)
+    metricas.periodicas_total.inc(tarea=funcion.nombre_tarea, resultado=estado)
+
+    registro = {'tarea': funcion.nombre_tarea, 'estado': estado, 'ms': round(duracion * 1000, 1)}
+    if estado == 'ok' and resultado is not None:
+        registro['resultado'] = resultado if isinstance(resultado, (int, float, str, dict, list)) else str(resultado)
+    logger.info(json.dumps(registro, ensure_ascii=False, default=str))
+    return estado
+
+
+def ejecutar_ahora(nombre, ejecutor):
+    """Ejecuta una tarea fuera de horario (si no está en curso en otro proceso)"""
+    funcion = PERIODICAS[nombre]
+    TareaPeriodica.objects.get_or_create(nombre=nombre)
+    if not reclamar(funcion, timezone.now(), ejecutor):
+        return 'en_curso'
+    return ejecutar(funcion, ejecutor)
+
+
+class Programador:
+    """
+    Revisa las tareas al comienzo de cada minuto y corre las que tienen un
+    horario pendiente, cada una en su hilo para que una lenta no demore al resto.
+    """
+
+    def __init__(self, nombres=None):
+        self.tareas = [
+            funcion for nombre, funcion in sorted(PERIODICAS.items())
+            if funcion.cron and (not nombres or nombre in nombres)
+        ]
+        self.nombre = f'{socket.gethostname()}:{os.getpid()}'
+        self.detener = threading.Event()
+        self.hilos = {}
+
+    def preparar(self):
+        """Crea las filas que falten; una tarea nueva espera a su próximo horario"""
+        ahora = timezone.now()
+        for funcion in self.tareas:
+            TareaPeriodica.objects.get_or_create(
+                nombre=funcion.nombre_tarea, defaults={'ultima_programada': funcion.cron.anterior(ahora)},
+            )
+
+    def revisar(self, ahora=None):
+        ahora = ahora or timezone.now()
+        for funcion in self.tareas:
+            hilo = self.hilos.get(funcion.nombre_tarea)
+            if hilo and hilo.is_alive():
+                continue
+            if reclamar(funcion, funcion.cron.anterior(ahora), self.nombre):
+                hilo = threading.Thread(target=self._correr, args=(funcion,), name=funcion.nombre_tarea)
+                self.hilos[funcion.nombre_tarea] = hilo
+                hilo.start()
+
+    def _correr(self, funcion):
+        try:
+            close_old_connections()
+            ejecutar(funcion, self.nombre)
+        finally:
+            connections.close_all()
+
+    def bucle(self):
+        self.preparar()
+        while not self.detener.is_set():
+            close_old_connections()
+            try:
+                self.revisar()
+            except Exception:
+                # Base caída o similar: se reintenta en el próximo minuto
+                logger.exception('Error revisando las tareas periódicas')
+            metricas.volcar_si_corresponde()
+            self.detener.wait(60 - time.time() % 60)
+
+    def en_curso(self):
+        return [hilo for hilo in self.hilos.values() if hilo.is_alive()]
+
+
+@periodica('45 3 * * *')
+def purgar_trabajos():
+    """Borra los trabajos completados de la cola de más de una semana"""
+    return purgar(dias=7)